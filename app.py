@@ -3,13 +3,20 @@ import dash
 import dash_bootstrap_components as dbc
 from dash import html, dcc
 import logging
+import os
+from flask import request, jsonify, abort
 
 # Import from modules
 from modules.callbacks import register_callbacks
+from modules.scheduler import start_scheduler, get_scheduler
+from modules.rate_limit import login_rate_limit_snapshot
+
+METRICS_ALLOWED_ADDRS = ('127.0.0.1', '::1') # Clients that may read /internal/metrics
 
 # --- Initialize Dash App ---
 app = dash.Dash(__name__, external_stylesheets=[dbc.themes.PULSE], suppress_callback_exceptions=True)
 app.title = "Internal DB Access System"
+server = app.server # WSGI entry point for production servers, e.g. `gunicorn -w 4 app:server`
 
 # Configure logging
 log_format = '%(asctime)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s'
@@ -18,7 +25,7 @@ app.logger.setLevel(logging.INFO) # Set level for Dash app's logger
 
 # Main App Layout (Structure for URL routing and session management)
 app.layout = html.Div([
-    dcc.Store(id='session-store', storage_type='session'),
+    dcc.Store(id='session-store', storage_type='session'), # Login/logout signal only; the session is server-side (modules/sessions.py)
     dcc.Store(id='refresh-trigger-store', data=0),
     dcc.Location(id='url', refresh=False),
     html.Div(id='app-container-wrapper') # Content will be rendered here by render_page_content callback
@@ -27,6 +34,20 @@ app.layout = html.Div([
 # Register all callbacks
 register_callbacks(app)
 
+# Maintenance jobs run in a background thread of each worker process; started on the first request
+# (after any pre-fork) and coordinated across workers through PostgreSQL advisory locks.
+@app.server.before_request
+def ensure_scheduler_started():
+    start_scheduler(app)
+
+# Per-process metrics for monitoring; counters are per worker, so scrape each one (the pid says which).
+@app.server.route('/internal/metrics')
+def internal_metrics():
+    if request.remote_addr not in METRICS_ALLOWED_ADDRS: abort(404)
+    scheduler = get_scheduler()
+    return jsonify({'pid': os.getpid(), 'login_rate_limit': login_rate_limit_snapshot(),
+                    'scheduler': scheduler.snapshot() if scheduler else None})
+
 # --- Main execution ---
 if __name__ == '__main__':
     app.logger.info("Starting Dash application...")
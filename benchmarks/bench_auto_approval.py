@@ -0,0 +1,96 @@
+# benchmarks/bench_auto_approval.py
+"""
+Measures auto-approval rule compilation time and evaluation throughput with
+thousands of synthetic rules, compared with a naive linear scan over all rules.
+No database is needed.
+
+Usage (from the project root):
+    python -m benchmarks.bench_auto_approval --rules 1000 5000 20000 --requests 50000
+"""
+import argparse
+import fnmatch
+import random
+import time
+
+from modules.auto_approval import compile_rules, match_rule
+
+DEPARTMENTS = ['Finance', 'Operations', 'Marketing', 'IT', 'HR', 'Other']
+SCHEMAS = ['public', 'finance_data', 'marketing_data', 'internal', 'reporting', 'staging'] + [f"team_{i:03d}" for i in range(200)]
+TABLE_PREFIXES = ['dim_', 'fact_', 'stg_', 'raw_', 'agg_', 'tmp_']
+ROLE_IDS = [1, 2, 3]
+
+
+def make_rules(count, rng):
+    rules = []
+    for rule_id in range(1, count + 1):
+        rules.append({
+            'rule_id': rule_id,
+            'priority': rng.randint(1, 1000),
+            'description': f"synthetic rule {rule_id}",
+            'department': rng.choice(DEPARTMENTS + [None]),
+            'schema_pattern': rng.choice(SCHEMAS) if rng.random() < 0.8 else rng.choice(['*', 'team_*', 'fin*']),
+            'table_pattern': rng.choice(['*'] + [p + '*' for p in TABLE_PREFIXES]),
+            'role_id': rng.choice(ROLE_IDS + [None]),
+            'requester_is_manager': rng.choice([None, None, True, False]),
+            'enabled': True,
+        })
+    return rules
+
+
+def make_requests(count, rng):
+    return [
+        (rng.choice(DEPARTMENTS), rng.random() < 0.2, rng.choice(SCHEMAS),
+         rng.choice(TABLE_PREFIXES) + f"table_{rng.randint(0, 999)}", rng.choice(ROLE_IDS))
+        for _ in range(count)
+    ]
+
+
+def linear_match(rules, department, is_manager, schema_name, table_name, role_id):
+    best = None
+    for r in rules:
+        if r['department'] is not None and r['department'] != department: continue
+        if r['role_id'] is not None and r['role_id'] != role_id: continue
+        if r['requester_is_manager'] is not None and r['requester_is_manager'] != is_manager: continue
+        if not fnmatch.fnmatchcase(schema_name, r['schema_pattern']): continue
+        if not fnmatch.fnmatchcase(table_name, r['table_pattern']): continue
+        if best is None or (r['priority'], r['rule_id']) < (best['priority'], best['rule_id']):
+            best = r
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rules', type=int, nargs='+', default=[1000, 5000, 20000])
+    parser.add_argument('--requests', type=int, default=50000)
+    parser.add_argument('--linear-requests', type=int, default=2000, help="Requests evaluated by the naive scan (it is slow).")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"{'rules':>8}{'compile ms':>12}{'indexed eval/s':>16}{'linear eval/s':>15}{'matched %':>11}")
+    for rule_count in args.rules:
+        rng = random.Random(args.seed)
+        rules = make_rules(rule_count, rng)
+        requests = make_requests(args.requests, rng)
+
+        start = time.perf_counter()
+        index = compile_rules(rules)
+        compile_ms = (time.perf_counter() - start) * 1000.0
+
+        start = time.perf_counter()
+        matched = sum(1 for req in requests if match_rule(index, *req) is not None)
+        indexed_rate = len(requests) / (time.perf_counter() - start)
+
+        linear_sample = requests[:args.linear_requests]
+        start = time.perf_counter()
+        expected_matches = [linear_match(rules, *req) for req in linear_sample]
+        linear_elapsed = time.perf_counter() - start
+        for req, expected in zip(linear_sample, expected_matches): # The index must agree with the naive scan
+            actual = match_rule(index, *req)
+            assert (expected and expected['rule_id']) == (actual and actual.rule_id), f"Mismatch for {req}"
+        linear_rate = len(linear_sample) / linear_elapsed if linear_elapsed else float('inf')
+
+        print(f"{rule_count:>8}{compile_ms:>12.1f}{indexed_rate:>16,.0f}{linear_rate:>15,.0f}{100.0 * matched / len(requests):>11.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,405 @@
+# benchmarks/bench_callbacks.py
+"""
+Calls the Dash callbacks registered by register_callbacks directly (no HTTP layer) against a
+throwaway PostgreSQL database loaded by scripts/generate_synthetic_data.py at one or more data
+scales. Reports per-callback latency (first call, median, p95, p99), database round trips and
+connections per call, and peak Python memory of a single call. Results are written as JSON;
+--compare flags callbacks that got slower or chattier than a previous run.
+
+Each scale gets a fresh database (--database, recreated from --schema) and runs in its own
+process, so in-process caches (org tree, auto-approval rules, table search) start cold.
+The app's own database is never touched.
+
+Usage (from the project root, against the PostgreSQL server in modules/db.py):
+    python -m benchmarks.bench_callbacks --scales small medium --iterations 20 --output bench_callbacks.json
+    python -m benchmarks.bench_callbacks --scales small --compare bench_callbacks.json
+"""
+import argparse
+import concurrent.futures
+import json
+import logging
+import multiprocessing
+import platform
+import resource
+import statistics
+import subprocess
+import time
+import tracemalloc
+import uuid
+import warnings
+from collections import namedtuple
+from datetime import datetime
+from types import SimpleNamespace
+
+import psycopg2
+import psycopg2.extensions
+from psycopg2 import sql
+
+from modules import rate_limit
+from modules.db import DB_CONFIG, get_db_connection
+from modules.sessions import SESSION_COOKIE_NAME, create_session, sign_session_id
+from scripts.generate_synthetic_data import DEFAULT_PASSWORD, TABLE_WORDS, load_synthetic_data
+
+SCALES = {
+    'small': {'employees': 1_000, 'tables': 500, 'requests': 20_000},
+    'medium': {'employees': 10_000, 'tables': 5_000, 'requests': 500_000},
+    'large': {'employees': 100_000, 'tables': 20_000, 'requests': 5_000_000},
+}
+BULK_DECISION_SIZE = 10 # Requests per bulk-approve call
+SUBMIT_ITEMS = 3 # Tables per new-request submission
+REQUEST_SEARCH_TERMS = ['reconciliation', 'quarterly dashboard', '"audit sample"', 'escalation -customer', 'JIRA', 'migration OR backfill']
+
+# --- Round-trip accounting ---
+# Every connection the app opens goes through get_db_connection -> psycopg2.connect(**DB_CONFIG),
+# so a connection_factory in DB_CONFIG sees all of them. Statements, commits and rollbacks each
+# count as one round trip (fetches from server-side cursors are not counted).
+DB_STATS = {'connections': 0, 'round_trips': 0}
+_counting_cursor_classes = {}
+
+def _counting_cursor(base):
+    cls = _counting_cursor_classes.get(base)
+    if cls is None:
+        class CountingCursor(base):
+            def execute(self, *args, **kwargs):
+                DB_STATS['round_trips'] += 1
+                return super().execute(*args, **kwargs)
+
+            def executemany(self, query, vars_list):
+                vars_list = list(vars_list) # psycopg2 runs one statement per parameter set
+                DB_STATS['round_trips'] += len(vars_list)
+                return super().executemany(query, vars_list)
+
+            def copy_expert(self, *args, **kwargs):
+                DB_STATS['round_trips'] += 1
+                return super().copy_expert(*args, **kwargs)
+
+        cls = _counting_cursor_classes[base] = CountingCursor
+    return cls
+
+class CountingConnection(psycopg2.extensions.connection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        DB_STATS['connections'] += 1
+
+    def cursor(self, *args, cursor_factory=None, **kwargs):
+        base = cursor_factory or self.cursor_factory or psycopg2.extensions.cursor
+        return super().cursor(*args, cursor_factory=_counting_cursor(base), **kwargs)
+
+    def commit(self):
+        DB_STATS['round_trips'] += 1
+        return super().commit()
+
+    def rollback(self):
+        DB_STATS['round_trips'] += 1
+        return super().rollback()
+
+class ErrorCounter(logging.Handler):
+    """Counts ERROR records from app.logger; callbacks report failures by logging and returning an alert."""
+
+    def __init__(self):
+        super().__init__(level=logging.ERROR)
+        self.count = 0
+
+    def emit(self, record):
+        self.count += 1
+
+
+# --- Fixtures ---
+# The manager whose direct reports have the most requests (the heaviest approval queue), one of
+# those reports as the requester, and a second report who owns the Pending rows that the approve,
+# bulk-approve and cancel scenarios consume (so the requester's own tables are not disturbed).
+BUSIEST_MANAGER_QUERY = """
+    SELECT e.manager_id FROM AccessRequests ar JOIN Employees e ON e.employee_id = ar.requester_id
+    WHERE e.manager_id IS NOT NULL GROUP BY e.manager_id ORDER BY COUNT(*) DESC, e.manager_id LIMIT 1;
+"""
+DIRECT_REPORTS_BY_ACTIVITY_QUERY = """
+    SELECT e.employee_id FROM Employees e LEFT JOIN AccessRequests ar ON ar.requester_id = e.employee_id
+    WHERE e.manager_id = %s GROUP BY e.employee_id ORDER BY COUNT(ar.request_id) DESC, e.employee_id LIMIT 2;
+"""
+SESSION_QUERY = """
+    SELECT e.employee_id, e.first_name, e.last_name, e.email, e.is_manager, uc.username
+    FROM Employees e JOIN UserCredentials uc ON uc.employee_id = e.employee_id WHERE e.employee_id = %s;
+"""
+FIXTURE_PENDING_INSERT = """
+    INSERT INTO AccessRequests (requester_id, table_id, requested_role_id, justification, status, access_duration_days)
+    SELECT %(requester_id)s, dt.table_id, r.role_id, 'Benchmark fixture: pending request for decision timings.', 'Pending', 30
+    FROM DatabaseTables dt CROSS JOIN AccessRoles r
+    WHERE dt.is_active AND NOT EXISTS (
+        SELECT 1 FROM AccessRequests ar WHERE ar.requester_id = %(requester_id)s AND ar.table_id = dt.table_id
+          AND ar.requested_role_id = r.role_id AND ar.status = 'Pending')
+    ORDER BY dt.table_id, r.role_id LIMIT %(count)s
+    RETURNING request_id;
+"""
+
+def _session(cur, employee_id):
+    cur.execute(SESSION_QUERY, (employee_id,))
+    employee_id, first_name, last_name, email, is_manager, username = cur.fetchone()
+    return {'logged_in': True, 'employee_id': employee_id, 'first_name': first_name, 'last_name': last_name,
+            'email': email, 'is_manager': is_manager}, username
+
+def _session_cookie(app, session_data):
+    """Creates a server-side session as handle_login does and returns the Cookie header that carries it."""
+    return f"{SESSION_COOKIE_NAME}={sign_session_id(create_session(app, session_data))}"
+
+def load_fixtures(app, pending_needed):
+    conn = get_db_connection(app)
+    try:
+        with conn.cursor() as cur:
+            cur.execute(BUSIEST_MANAGER_QUERY)
+            manager_id = cur.fetchone()[0]
+            cur.execute(DIRECT_REPORTS_BY_ACTIVITY_QUERY, (manager_id,))
+            report_ids = [r[0] for r in cur.fetchall()]
+            requester_id, fixture_requester_id = report_ids[0], report_ids[-1]
+            manager_session, _ = _session(cur, manager_id)
+            requester_session, requester_username = _session(cur, requester_id)
+            fixture_session, _ = _session(cur, fixture_requester_id)
+            cur.execute(FIXTURE_PENDING_INSERT, {'requester_id': fixture_requester_id, 'count': pending_needed})
+            pending_ids = [r[0] for r in cur.fetchall()]
+            cur.execute("SELECT schema_name FROM CatalogSchemaSummary WHERE source_id IS NULL ORDER BY table_count DESC, schema_name LIMIT 1;")
+            largest_schema = cur.fetchone()[0]
+            cur.execute("SELECT COUNT(*) FROM DatabaseTables;")
+            table_count = cur.fetchone()[0]
+            cur.execute("SHOW server_version;")
+            server_version = cur.fetchone()[0]
+        conn.commit()
+    finally:
+        conn.close()
+    return SimpleNamespace(manager=_session_cookie(app, manager_session), requester=_session_cookie(app, requester_session),
+                           fixture_requester=_session_cookie(app, fixture_session), requester_username=requester_username, pending_ids=pending_ids, largest_schema=largest_schema,
+                           table_count=table_count, server_version=server_version)
+
+
+# --- Scenarios ---
+# trigger is the prop_id the callback sees in ctx.triggered; args(i) builds the arguments of call i.
+# session is the Cookie header of the logged-in user (None: anonymous). heavy scenarios (full-table
+# reports) run --heavy-iterations times instead of --iterations.
+Scenario = namedtuple('Scenario', 'name callback trigger args session heavy')
+
+def _pattern_prop_id(component_id, prop):
+    return json.dumps(component_id, sort_keys=True, separators=(',', ':')) + '.' + prop
+
+def build_scenarios(fx, pending_ids):
+    manager, requester = fx.manager, fx.requester
+    scenarios = [
+        Scenario('login', 'handle_login', 'login-button.n_clicks', lambda i: (1, fx.requester_username, DEFAULT_PASSWORD), None, False),
+        Scenario('render_dashboard', 'render_page_content', 'url.pathname', lambda i: ('/dashboard', '', {'logged_in': True}), manager, False),
+        Scenario('my_requests_table', 'update_my_requests_table', 'dashboard-load-trigger.n_intervals', lambda i: (1, i), requester, False),
+        Scenario('approval_table', 'update_approval_requests_table', 'dashboard-load-trigger.n_intervals', lambda i: (1, i, False), manager, False),
+        Scenario('approval_table_org', 'update_approval_requests_table', 'approval-org-scope-switch.value', lambda i: (1, i, True), manager, False),
+        Scenario('analytics_charts', 'update_analytics_charts', 'dashboard-load-trigger.n_intervals', lambda i: (1, i, 'department', 30), manager, False),
+        Scenario('open_new_request_modal', 'toggle_and_populate_new_request_modal', 'open-new-request-modal-button-sidebar.n_clicks',
+                 lambda i: (i + 1, None, False), requester, False),
+        # Distinct terms each call, so the table search cache does not hide the query
+        Scenario('table_search', 'search_new_request_tables', 'new-request-table-search-input.value',
+                 lambda i: (f"{TABLE_WORDS[i % len(TABLE_WORDS)]}_{i}", [], []), requester, False),
+        Scenario('catalog_browser_root', 'toggle_catalog_browser', 'catalog-browser-toggle-button.n_clicks', lambda i: (1, False), requester, False),
+        Scenario('catalog_schema_page', 'expand_catalog_node',
+                 _pattern_prop_id({'type': 'catalog-node', 'node': f"sch|manual|{fx.largest_schema}"}, 'n_clicks'),
+                 lambda i: (1, {'type': 'catalog-node', 'node': f"sch|manual|{fx.largest_schema}"}), requester, False),
+    ]
+    for scope in ('approvals', 'audit'):
+        input_id = {'type': 'request-search-input', 'scope': scope}
+        scenarios.append(Scenario(f"request_search_{scope}", 'search_request_history', _pattern_prop_id(input_id, 'value'),
+                                  lambda i, input_id=input_id: (REQUEST_SEARCH_TERMS[i % len(REQUEST_SEARCH_TERMS)], None, None, None, input_id, False, False), manager, False))
+    for report_type in ('audit_log', 'user_permissions', 'pending_requests', 'approval_latency'):
+        scenarios.append(Scenario(f"report_{report_type}", 'generate_report_download', 'download-report-button.n_clicks',
+                                  lambda i, report_type=report_type: (1, report_type, False), manager, True))
+    # Writes run last so the read scenarios above all see the same data.
+    scenarios += [
+        Scenario('submit_new_request', 'submit_new_request', 'submit-new-request-button.n_clicks',
+                 lambda i: (1, [{'table_id': (i * SUBMIT_ITEMS + k) % fx.table_count + 1, 'table_full_name': '', 'role_id': 1} for k in range(SUBMIT_ITEMS)],
+                            'Benchmark submission: need read access for reconciliation.', 30, str(uuid.uuid4()), i), requester, False),
+        Scenario('approve_request', 'handle_approval_decision', 'approve-request-button.n_clicks',
+                 lambda i: (1, None, pending_ids.pop(), 'Approved by benchmark.', i), manager, False),
+        Scenario('bulk_approve_requests', 'handle_bulk_approval_decision', 'bulk-approve-request-button.n_clicks',
+                 lambda i: (1, None, [pending_ids.pop() for _ in range(BULK_DECISION_SIZE)], 'Bulk approved by benchmark.', i), manager, False),
+        Scenario('cancel_my_request', 'handle_cancel_my_request', 'cancel-my-request-button.n_clicks',
+                 lambda i: (1, pending_ids.pop(), i), fx.fixture_requester, False),
+    ]
+    return scenarios
+
+def pending_needed(iterations):
+    calls = iterations + 2 # Plus the first (cold) call and the memory-tracing call
+    return calls * (2 + BULK_DECISION_SIZE)
+
+
+# --- Measurement ---
+def summarize(timings_ms):
+    ordered = sorted(timings_ms)
+    def percentile(p): return ordered[max(0, int(round(p * len(ordered))) - 1)]
+    return {'median_ms': statistics.median(ordered), 'p95_ms': percentile(0.95), 'p99_ms': percentile(0.99),
+            'min_ms': ordered[0], 'max_ms': ordered[-1]}
+
+def measure(server, callback, trigger, make_args, session, calls, errors):
+    from dash._callback_context import context_value # Callbacks read ctx.triggered from this context variable
+    from dash._utils import AttributeDict
+
+    def invoke(i):
+        args = make_args(i)
+        context_value.set(AttributeDict(triggered_inputs=[{'prop_id': trigger, 'value': 1}], dash_response=server.response_class()))
+        # The session cookie is read from the Flask request, as it would be over HTTP
+        with server.test_request_context(headers={'Cookie': session} if session else None):
+            started = time.perf_counter()
+            callback(*args)
+            return (time.perf_counter() - started) * 1000.0
+
+    first_ms = invoke(0) # Cold: first DB connection for the callback, org tree / rule cache loads
+    stats_before, errors_before = dict(DB_STATS), errors.count
+    timings = [invoke(i) for i in range(1, calls + 1)]
+    result = {'calls': calls, 'first_ms': first_ms, **summarize(timings),
+              'round_trips': (DB_STATS['round_trips'] - stats_before['round_trips']) / calls,
+              'connections': (DB_STATS['connections'] - stats_before['connections']) / calls,
+              'errors': errors.count - errors_before}
+    tracemalloc.start()
+    invoke(calls + 1)
+    result['peak_kib'] = tracemalloc.get_traced_memory()[1] / 1024.0
+    tracemalloc.stop()
+    return result
+
+def run_scale(database, iterations, heavy_iterations, only):
+    """Runs in a fresh process: imports the app against `database` and measures every scenario."""
+    DB_CONFIG['dbname'] = database
+    DB_CONFIG['connection_factory'] = CountingConnection
+    import app as app_module # Imported here so the Dash app and its callbacks only exist in the worker process
+    # The login scenario logs the same user in on every call. Keep the limiter in the measured path, but with
+    # private in-memory buckets too large to throttle it, and without touching a running app's shared store.
+    rate_limit.RATE_LIMIT_STORE_PATH = ''
+    rate_limit.LOGIN_USERNAME_BURST = rate_limit.LOGIN_IP_BURST = 10 ** 9
+    logging.disable(logging.WARNING)
+    warnings.filterwarnings('ignore', message='pandas only supports SQLAlchemy') # Reports use pd.read_sql_query on psycopg2
+    dash_app = app_module.app
+    errors = ErrorCounter()
+    dash_app.logger.addHandler(errors)
+    callbacks = {}
+    for entry in dash_app.callback_map.values():
+        func = entry['callback'].__wrapped__
+        callbacks[func.__name__] = func
+
+    fx = load_fixtures(dash_app, pending_needed(iterations))
+    pending_ids = list(fx.pending_ids)
+    results = {}
+    for scenario in build_scenarios(fx, pending_ids):
+        if only and scenario.name not in only: continue
+        calls = heavy_iterations if scenario.heavy else iterations
+        needs_pending = scenario.callback in ('handle_approval_decision', 'handle_bulk_approval_decision', 'handle_cancel_my_request')
+        if needs_pending and len(pending_ids) < (calls + 2) * (BULK_DECISION_SIZE if 'bulk' in scenario.callback else 1):
+            print(f"  {scenario.name}: skipped, not enough fixture requests")
+            continue
+        results[scenario.name] = measure(dash_app.server, callbacks[scenario.callback], scenario.trigger, scenario.args, scenario.session, calls, errors)
+    return {'server_version': fx.server_version, 'max_rss_kib': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, 'callbacks': results}
+
+
+# --- Database setup ---
+def recreate_database(database, schema_files):
+    conn = psycopg2.connect(**{**DB_CONFIG, 'dbname': 'postgres'})
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            cur.execute(sql.SQL("DROP DATABASE IF EXISTS {}").format(sql.Identifier(database)))
+            cur.execute(sql.SQL("CREATE DATABASE {}").format(sql.Identifier(database)))
+    finally:
+        conn.close()
+    conn = psycopg2.connect(**{**DB_CONFIG, 'dbname': database})
+    try:
+        with conn.cursor() as cur:
+            for path in schema_files:
+                with open(path) as f:
+                    cur.execute(f.read())
+        conn.commit()
+    finally:
+        conn.close()
+
+def drop_database(database):
+    conn = psycopg2.connect(**{**DB_CONFIG, 'dbname': 'postgres'})
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            cur.execute(sql.SQL("DROP DATABASE IF EXISTS {}").format(sql.Identifier(database)))
+    finally:
+        conn.close()
+
+
+# --- Reporting ---
+def print_scale(scale, result):
+    print(f"\n{scale}: {result['sizes']['employees']:,} employees, {result['sizes']['tables']:,} tables, "
+          f"{result['sizes']['requests']:,} requests (loaded in {result['load_seconds']:.1f} s), max RSS {result['max_rss_kib'] / 1024.0:.0f} MiB")
+    print(f"{'callback':<30}{'calls':>6}{'first ms':>10}{'median ms':>11}{'p95 ms':>9}{'p99 ms':>9}{'trips':>7}{'conns':>7}{'peak KiB':>10}{'errors':>8}")
+    for name, r in result['callbacks'].items():
+        print(f"{name:<30}{r['calls']:>6}{r['first_ms']:>10.1f}{r['median_ms']:>11.2f}{r['p95_ms']:>9.2f}{r['p99_ms']:>9.2f}"
+              f"{r['round_trips']:>7.1f}{r['connections']:>7.1f}{r['peak_kib']:>10.0f}{r['errors']:>8}")
+
+def compare_runs(baseline, current, threshold):
+    """Prints callbacks whose median latency grew by more than `threshold`x or that need more round trips. Returns the count."""
+    regressions = 0
+    print(f"\nComparison with baseline {baseline.get('git_commit') or ''} ({baseline['created_at']}), threshold {threshold:.2f}x")
+    print(f"{'scale':<8}{'callback':<30}{'base ms':>10}{'now ms':>10}{'ratio':>8}{'base trips':>12}{'now trips':>11}")
+    for scale, result in current['scales'].items():
+        base_scale = baseline.get('scales', {}).get(scale)
+        if not base_scale: continue
+        for name, r in result['callbacks'].items():
+            b = base_scale['callbacks'].get(name)
+            if not b: continue
+            ratio = r['median_ms'] / b['median_ms'] if b['median_ms'] else float('inf')
+            flagged = ratio > threshold or r['round_trips'] > b['round_trips'] + 0.01
+            regressions += flagged
+            print(f"{scale:<8}{name:<30}{b['median_ms']:>10.2f}{r['median_ms']:>10.2f}{ratio:>8.2f}{b['round_trips']:>12.1f}{r['round_trips']:>11.1f}"
+                  f"{'  <-- regression' if flagged else ''}")
+    return regressions
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', nargs='+', choices=list(SCALES), default=['small'])
+    parser.add_argument('--iterations', type=int, default=20, help="Timed calls per callback.")
+    parser.add_argument('--heavy-iterations', type=int, default=3, help="Timed calls per full-table report.")
+    parser.add_argument('--database', default='access_request_bench', help="Scratch database; dropped and recreated for every scale.")
+    parser.add_argument('--schema', nargs='+', default=['data/schema.sql'], help="SQL files applied, in order, to the fresh database.")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--only', nargs='+', help="Run only these scenarios (e.g. login approval_table).")
+    parser.add_argument('--output', default='bench_callbacks.json')
+    parser.add_argument('--compare', help="Earlier --output file to compare against.")
+    parser.add_argument('--threshold', type=float, default=1.25, help="Median latency ratio above which a callback is flagged.")
+    parser.add_argument('--keep-database', action='store_true')
+    args = parser.parse_args()
+    if args.database == DB_CONFIG['dbname']:
+        raise SystemExit(f"--database must not be the application database ({DB_CONFIG['dbname']}); it is dropped.")
+
+    logging.basicConfig(level=logging.WARNING)
+    app = SimpleNamespace(logger=logging.getLogger('bench_callbacks'))
+    report = {'created_at': datetime.now().isoformat(timespec='seconds'), 'git_commit': _git_commit(),
+              'python': platform.python_version(), 'iterations': args.iterations, 'heavy_iterations': args.heavy_iterations,
+              'seed': args.seed, 'scales': {}}
+    try:
+        for scale in args.scales:
+            sizes = SCALES[scale]
+            print(f"\nPreparing {scale} database {args.database} ...")
+            recreate_database(args.database, args.schema)
+            DB_CONFIG['dbname'] = args.database
+            # Dated up to now: analytics windows and grant expiry are measured against the real clock.
+            load_seconds = load_synthetic_data(app, sizes['employees'], sizes['tables'], sizes['requests'], seed=args.seed, anchor=datetime.now())
+            with concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+                result = pool.submit(run_scale, args.database, args.iterations, args.heavy_iterations, args.only).result()
+            report['scales'][scale] = {'sizes': sizes, 'load_seconds': load_seconds, **result}
+            print_scale(scale, report['scales'][scale])
+    finally:
+        if not args.keep_database:
+            drop_database(args.database)
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare_runs(baseline, report, args.threshold):
+            raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
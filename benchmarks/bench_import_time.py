@@ -0,0 +1,150 @@
+# benchmarks/bench_import_time.py
+"""
+Measures how long it takes to import the app, i.e. the startup cost every new worker process pays
+before it can serve a request. Each run is a fresh interpreter started with `python -X importtime`,
+so nothing is shared between runs; one unrecorded warm-up run compiles .pyc files and fills the
+page cache first. Reports the median import time of each --module and the median wall time of the
+whole process (interpreter startup included), and lists the packages that cost the most.
+
+The run fails (exit code 1) when:
+  * any module in MUST_BE_LAZY is imported at startup (pandas and numpy are loaded on first use,
+    by CSV reports and employee imports only);
+  * the median import time of a module exceeds --budget-ms;
+  * with --compare, a module's median import time grew by more than --threshold.
+Meant to run in CI after the dependency install step; -X importtime adds some overhead of its
+own, so keep the budget well above what a developer machine measures.
+
+Usage (from the project root; no database needed):
+    python -m benchmarks.bench_import_time --runs 10 --output bench_import_time.json
+    python -m benchmarks.bench_import_time --budget-ms 1500 --compare bench_import_time.json
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+from .bench_callbacks import _git_commit
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+MUST_BE_LAZY = ('pandas', 'numpy')
+DEFAULT_BUDGET_MS = 1500.0
+
+
+def parse_importtime(stderr):
+    """
+    Parses `-X importtime` output into a list of (module, depth, self_us, cumulative_us), in the
+    order Python printed them (a module comes after everything it imported).
+    """
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        if not self_us.strip().isdigit():
+            continue # Header line
+        module = name.strip()
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((module, depth, int(self_us), int(cumulative_us)))
+    return entries
+
+def run_import(module):
+    """Imports `module` in a fresh interpreter. Returns (wall_ms, importtime entries)."""
+    started = time.perf_counter()
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                          cwd=PROJECT_ROOT, capture_output=True, text=True)
+    wall_ms = (time.perf_counter() - started) * 1000.0
+    if proc.returncode != 0:
+        tail = proc.stderr.strip().splitlines()[-1:] or ['no output']
+        raise RuntimeError(f"import {module} failed with exit code {proc.returncode}: {tail[0]}")
+    return wall_ms, parse_importtime(proc.stderr)
+
+def measure_module(module, runs):
+    run_import(module) # Warm-up: .pyc compilation and cold page cache are not startup costs we can fix
+    wall, total, packages, lazy_violations = [], [], {}, set()
+    for _ in range(runs):
+        wall_ms, entries = run_import(module)
+        wall.append(wall_ms)
+        total.append(next((c for name, depth, _, c in entries if name == module and depth == 0), 0) / 1000.0)
+        for name, depth, _, cumulative_us in entries:
+            top_level = name.split('.')[0]
+            if top_level in MUST_BE_LAZY:
+                lazy_violations.add(top_level)
+            if '.' not in name and name != module: # Top-level packages; nested ones are included in their importer's cumulative time
+                packages.setdefault(name, []).append(cumulative_us / 1000.0)
+    return {
+        'import_ms': statistics.median(total), 'import_min_ms': min(total), 'wall_ms': statistics.median(wall),
+        'modules_imported': len(entries),
+        'packages': {name: statistics.median(t) for name, t in packages.items()},
+        'lazy_violations': sorted(lazy_violations),
+    }
+
+
+def check_budget(current, budget_ms):
+    """Prints modules that load a MUST_BE_LAZY package or are over budget. Returns the count."""
+    failures = 0
+    for module, r in current['modules'].items():
+        if r['lazy_violations']:
+            failures += 1
+            print(f"FAIL {module}: imports {', '.join(r['lazy_violations'])} at startup; import them inside the functions that need them")
+        if r['import_ms'] > budget_ms:
+            failures += 1
+            print(f"FAIL {module}: median import time {r['import_ms']:.0f} ms is over the {budget_ms:.0f} ms budget")
+    return failures
+
+def compare_runs(baseline, current, threshold):
+    """Prints modules whose median import time grew by more than `threshold`x. Returns the count."""
+    regressions = 0
+    print(f"\nComparison with baseline {baseline.get('git_commit') or ''} ({baseline['created_at']}), threshold {threshold:.2f}x")
+    print(f"{'module':<24}{'base ms':>10}{'now ms':>10}{'ratio':>8}")
+    for module, r in current['modules'].items():
+        b = baseline['modules'].get(module)
+        if not b: continue
+        ratio = r['import_ms'] / b['import_ms'] if b['import_ms'] > 0 else 1.0
+        regressions += ratio > threshold
+        print(f"{module:<24}{b['import_ms']:>10.0f}{r['import_ms']:>10.0f}{ratio:>8.2f}{'  <-- regression' if ratio > threshold else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--module', nargs='+', default=['app'], help="Modules to import, e.g. app modules.callbacks.")
+    parser.add_argument('--runs', type=int, default=5, help="Measured interpreter starts per module.")
+    parser.add_argument('--top', type=int, default=10, help="Heaviest top-level packages to list.")
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS, help="Maximum median import time per module.")
+    parser.add_argument('--output', help="Write the results as JSON.")
+    parser.add_argument('--compare', help="Earlier --output file to compare against.")
+    parser.add_argument('--threshold', type=float, default=1.25, help="Import time ratio above which a module is flagged.")
+    args = parser.parse_args()
+
+    report = {'created_at': datetime.now().isoformat(timespec='seconds'), 'git_commit': _git_commit(),
+              'python': platform.python_version(), 'runs': args.runs, 'modules': {}}
+    for module in args.module:
+        r = measure_module(module, args.runs)
+        report['modules'][module] = r
+        print(f"\n{module}: import {r['import_ms']:.0f} ms median ({r['import_min_ms']:.0f} ms min), "
+              f"process wall time {r['wall_ms']:.0f} ms, {r['modules_imported']:,} modules imported")
+        print(f"  {'package':<32}{'cumulative ms':>14}")
+        heaviest = sorted(r['packages'].items(), key=lambda item: item[1], reverse=True)[:args.top]
+        for name, ms in heaviest:
+            print(f"  {name:<32}{ms:>14.1f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    failures = check_budget(report, args.budget_ms)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        failures += compare_runs(baseline, report, args.threshold)
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+# benchmarks/bench_layouts.py
+"""
+Measures how long the page layouts in modules/layouts.py take to build and to serialize, and how
+big their JSON is. render_page_content returns one of these trees on every URL or session change,
+and Dash serializes the whole tree into the response. No database is needed.
+
+For each layout it reports:
+  * cold build: first render in a process, with the layout caches cleared before every call;
+  * warm build: repeat renders served from the memoized trees (is_manager / first_name);
+  * serialize: Dash's to_json of the returned tree, which is paid on every render;
+  * JSON bytes and component count.
+The dashboard_new_user row gives each call a first name not seen before, so only the sidebar is rebuilt.
+
+The run fails when a memoized layout's warm build costs more than WARM_CEILING of a cold one
+(memoization broken). With --compare it also fails when cold build or serialize time grew by more
+than --threshold, or the JSON got bigger. Warm timings are too small to compare between runs.
+
+Usage (from the project root):
+    python -m benchmarks.bench_layouts --iterations 500 --output bench_layouts.json
+    python -m benchmarks.bench_layouts --compare bench_layouts.json
+"""
+import argparse
+import itertools
+import json
+import logging
+import platform
+import statistics
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+from dash import html
+from dash._utils import to_json
+
+from modules.layouts import login_layout, create_signup_layout, create_sidebar, create_main_content_area, clear_layout_caches
+from .bench_callbacks import _git_commit
+
+EMPLOYEE_SESSION = {'logged_in': True, 'employee_id': 2, 'first_name': 'Bob', 'last_name': 'Jones', 'is_manager': False}
+MANAGER_SESSION = {'logged_in': True, 'employee_id': 1, 'first_name': 'Alice', 'last_name': 'Smith', 'is_manager': True}
+MEMOIZED_LAYOUTS = ('sidebar_employee', 'sidebar_manager', 'main_employee', 'main_manager', 'dashboard_employee', 'dashboard_manager')
+WARM_CEILING = 0.1 # A repeat render must cost under 10% of a cold one
+
+
+def dashboard(app, session_data, section=None):
+    """The logged-in page exactly as render_page_content assembles it."""
+    return html.Div([
+        create_sidebar(app, session_data),
+        create_main_content_area(app, session_data, section=section)
+    ], id="app-container", className="d-flex vh-100")
+
+def build_cases(app):
+    """name -> function(i) returning the layout for call i."""
+    new_names = itertools.count()
+    return {
+        'login': lambda i: login_layout,
+        'signup': lambda i: create_signup_layout(app),
+        'signup_invited': lambda i: create_signup_layout(app, 'alice.smith@example.com', 'Alice Smith'),
+        'sidebar_employee': lambda i: create_sidebar(app, EMPLOYEE_SESSION),
+        'sidebar_manager': lambda i: create_sidebar(app, MANAGER_SESSION),
+        'main_employee': lambda i: create_main_content_area(app, EMPLOYEE_SESSION),
+        'main_manager': lambda i: create_main_content_area(app, MANAGER_SESSION, section='approvals'),
+        'dashboard_employee': lambda i: dashboard(app, EMPLOYEE_SESSION),
+        'dashboard_manager': lambda i: dashboard(app, MANAGER_SESSION, section='approvals'),
+        'dashboard_new_user': lambda i: dashboard(app, {**MANAGER_SESSION, 'first_name': f"User{next(new_names):06d}"}),
+    }
+
+
+def summarize(timings_ms):
+    ordered = sorted(timings_ms)
+    p95_index = max(0, int(round(0.95 * len(ordered))) - 1)
+    return {'median_ms': statistics.median(ordered), 'p95_ms': ordered[p95_index]}
+
+def time_calls(func, iterations, before=None):
+    timings = []
+    for i in range(iterations):
+        if before: before()
+        started = time.perf_counter()
+        func(i)
+        timings.append((time.perf_counter() - started) * 1000.0)
+    return summarize(timings)
+
+def measure(build, iterations):
+    cold = time_calls(build, iterations, before=clear_layout_caches)
+    build(0) # Make sure the warm runs start from a populated cache
+    warm = time_calls(build, iterations)
+    layout = build(0)
+    serialize = time_calls(lambda i: to_json(layout), iterations)
+    return {'cold_ms': cold['median_ms'], 'warm_ms': warm['median_ms'], 'warm_p95_ms': warm['p95_ms'],
+            'serialize_ms': serialize['median_ms'], 'json_bytes': len(to_json(layout)),
+            'components': 1 + sum(1 for _ in layout._traverse())}
+
+def check_memoization(current):
+    """Prints memoized layouts whose warm build is not much cheaper than a cold one. Returns the count."""
+    failures = 0
+    for name in MEMOIZED_LAYOUTS:
+        r = current['layouts'][name]
+        if r['warm_ms'] > WARM_CEILING * r['cold_ms']:
+            failures += 1
+            print(f"FAIL {name}: warm build {r['warm_ms']:.3f} ms is over {WARM_CEILING:.0%} of the cold build ({r['cold_ms']:.3f} ms); is the layout still memoized?")
+    return failures
+
+def compare_runs(baseline, current, threshold):
+    """Prints layouts whose cold build or serialize time grew by more than `threshold`x, or whose JSON grew. Returns the count."""
+    regressions = 0
+    print(f"\nComparison with baseline {baseline.get('git_commit') or ''} ({baseline['created_at']}), threshold {threshold:.2f}x")
+    print(f"{'layout':<22}{'cold':>8}{'serialize':>11}{'base bytes':>12}{'now bytes':>11}")
+    for name, r in current['layouts'].items():
+        b = baseline['layouts'].get(name)
+        if not b: continue
+        ratios = {key: r[key] / b[key] if b[key] > 0 else 1.0 for key in ('cold_ms', 'serialize_ms')}
+        flagged = any(ratio > threshold for ratio in ratios.values()) or r['json_bytes'] > b['json_bytes']
+        regressions += flagged
+        print(f"{name:<22}{ratios['cold_ms']:>8.2f}{ratios['serialize_ms']:>11.2f}{b['json_bytes']:>12,}{r['json_bytes']:>11,}"
+              f"{'  <-- regression' if flagged else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=200, help="Timed calls per layout and measurement.")
+    parser.add_argument('--output', help="Write the results as JSON.")
+    parser.add_argument('--compare', help="Earlier --output file to compare against.")
+    parser.add_argument('--threshold', type=float, default=1.5, help="Time ratio above which a layout is flagged.")
+    args = parser.parse_args()
+
+    app = SimpleNamespace(logger=logging.getLogger('bench_layouts')) # Layout functions log at INFO; left unconfigured
+    report = {'created_at': datetime.now().isoformat(timespec='seconds'), 'git_commit': _git_commit(),
+              'python': platform.python_version(), 'iterations': args.iterations, 'layouts': {}}
+
+    print(f"{'layout':<22}{'cold ms':>9}{'warm ms':>9}{'warm p95':>10}{'serialize ms':>14}{'JSON bytes':>12}{'components':>12}")
+    for name, build in build_cases(app).items():
+        r = measure(build, args.iterations)
+        report['layouts'][name] = r
+        print(f"{name:<22}{r['cold_ms']:>9.3f}{r['warm_ms']:>9.3f}{r['warm_p95_ms']:>10.3f}{r['serialize_ms']:>14.3f}{r['json_bytes']:>12,}{r['components']:>12}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    failures = check_memoization(report)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        failures += compare_runs(baseline, report, args.threshold)
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
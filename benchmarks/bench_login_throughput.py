@@ -0,0 +1,179 @@
+# benchmarks/bench_login_throughput.py
+"""
+Measures what password hashing costs logins at each scrypt work factor (N), and whether it stalls the
+rest of the app. No database is needed: the benchmark drives modules/passwords.py directly.
+
+For each N it reports:
+  * hash ms: one hash in the calling thread, and the memory it needs (128 * N * r bytes);
+  * logins/s and login p50/p95: --clients threads verifying passwords back to back for --duration
+    seconds, through the bounded hashing pool (mode "pool", as handle_login does) and, for comparison,
+    each in its own thread (mode "inline"); "busy" counts logins turned away by a saturated pool;
+  * bystander p95: latency of a cheap callback-sized task (serializing the login layout) running
+    alongside, against its latency on an idle process. This is what other users feel during a login burst.
+
+Login latency under load is mostly queueing (clients / CPUs), so the budget applies to the hash itself:
+the run fails if one hash at the default N (PASSWORD_SCRYPT_N) takes longer than --max-hash-ms, or with
+--compare when logins/s at some N dropped by more than --threshold. The pool's main gain is bounded
+memory and CPU: at most PASSWORD_HASH_WORKERS hashes run at once, however many users log in together.
+
+Usage (from the project root):
+    python -m benchmarks.bench_login_throughput --work-factors 12 14 15 16 --output bench_login.json
+    python -m benchmarks.bench_login_throughput --clients 16 --duration 10 --compare bench_login.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import threading
+import time
+from datetime import datetime
+
+from dash._utils import to_json
+
+from modules.layouts import login_layout
+from modules.passwords import (PASSWORD_SCRYPT_N, PASSWORD_SCRYPT_R, PASSWORD_HASH_WORKERS, PasswordHashingBusy,
+                               hash_password_sync, verify_password, verify_password_sync)
+from .bench_callbacks import _git_commit
+
+BENCH_PASSWORD = 'correct horse battery staple'
+
+
+def summarize(timings_ms):
+    ordered = sorted(timings_ms)
+    if not ordered: return {'p50_ms': None, 'p95_ms': None}
+    return {'p50_ms': statistics.median(ordered), 'p95_ms': ordered[max(0, int(round(0.95 * len(ordered))) - 1)]}
+
+def bystander_task():
+    to_json(login_layout)
+
+def measure_bystander(stop):
+    """Runs bystander_task back to back until stop is set. Returns its timings in ms."""
+    timings = []
+    while not stop.is_set():
+        started = time.perf_counter()
+        bystander_task()
+        timings.append((time.perf_counter() - started) * 1000.0)
+        time.sleep(0.001) # A request arriving now and then, not a busy loop competing for the GIL
+    return timings
+
+def idle_bystander(duration):
+    stop = threading.Event()
+    threading.Timer(duration, stop.set).start()
+    return summarize(measure_bystander(stop))
+
+def run_logins(password_hash, mode, clients, duration):
+    """--clients threads log in back to back for `duration` seconds, alongside one bystander thread."""
+    verify = verify_password if mode == 'pool' else verify_password_sync
+    timings, busy, lock = [], [0], threading.Lock()
+    stop = threading.Event()
+
+    def client():
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                ok, _ = verify(BENCH_PASSWORD, password_hash)
+                assert ok
+            except PasswordHashingBusy:
+                with lock: busy[0] += 1
+                time.sleep(0.01) # The user retries a moment later
+                continue
+            elapsed = (time.perf_counter() - started) * 1000.0
+            with lock: timings.append(elapsed)
+
+    bystander_timings = []
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    threads.append(threading.Thread(target=lambda: bystander_timings.extend(measure_bystander(stop))))
+    started = time.perf_counter()
+    for t in threads: t.start()
+    time.sleep(duration)
+    stop.set()
+    for t in threads: t.join()
+    elapsed = time.perf_counter() - started
+    login = summarize(timings)
+    return {'logins_per_s': len(timings) / elapsed, 'login_p50_ms': login['p50_ms'], 'login_p95_ms': login['p95_ms'],
+            'busy': busy[0], 'bystander_p95_ms': summarize(bystander_timings)['p95_ms']}
+
+def measure_work_factor(n, modes, clients, duration, samples):
+    hash_timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        password_hash = hash_password_sync(BENCH_PASSWORD, n=n)
+        hash_timings.append((time.perf_counter() - started) * 1000.0)
+    result = {'n': n, 'hash_ms': statistics.median(hash_timings), 'memory_mib': 128 * n * PASSWORD_SCRYPT_R / (1024.0 * 1024.0), 'modes': {}}
+    for mode in modes:
+        result['modes'][mode] = run_logins(password_hash, mode, clients, duration)
+    return result
+
+
+def check_budget(current, max_hash_ms):
+    """Prints a failure if one hash at the default work factor is over budget. Returns the count."""
+    r = current['work_factors'].get(str(PASSWORD_SCRYPT_N))
+    if r and r['hash_ms'] > max_hash_ms:
+        print(f"FAIL N={PASSWORD_SCRYPT_N} (default): one hash takes {r['hash_ms']:.0f} ms, over the {max_hash_ms:.0f} ms budget")
+        return 1
+    return 0
+
+def compare_runs(baseline, current, threshold):
+    """Prints work factors and modes whose logins/s dropped by more than `threshold`x. Returns the count."""
+    regressions = 0
+    print(f"\nComparison with baseline {baseline.get('git_commit') or ''} ({baseline['created_at']}), threshold {threshold:.2f}x")
+    print(f"{'N':>8}{'mode':>8}{'base/s':>9}{'now/s':>9}{'slowdown':>10}")
+    for key, r in current['work_factors'].items():
+        b = baseline['work_factors'].get(key)
+        if not b: continue
+        for mode, m in r['modes'].items():
+            bm = b['modes'].get(mode)
+            if not bm: continue
+            slowdown = bm['logins_per_s'] / m['logins_per_s'] if m['logins_per_s'] > 0 else float('inf')
+            regressions += slowdown > threshold
+            print(f"{r['n']:>8}{mode:>8}{bm['logins_per_s']:>9.1f}{m['logins_per_s']:>9.1f}{slowdown:>10.2f}"
+                  f"{'  <-- regression' if slowdown > threshold else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--work-factors', type=int, nargs='+', default=[12, 14, 15, 16], help="log2 of each scrypt N to measure.")
+    parser.add_argument('--modes', nargs='+', choices=['pool', 'inline'], default=['pool', 'inline'])
+    parser.add_argument('--clients', type=int, default=8, help="Concurrent login threads.")
+    parser.add_argument('--duration', type=float, default=5.0, help="Seconds per work factor and mode.")
+    parser.add_argument('--samples', type=int, default=5, help="Single-thread hashes timed per work factor.")
+    parser.add_argument('--max-hash-ms', type=float, default=250.0, help="Budget for one hash at the default N.")
+    parser.add_argument('--output', help="Write the results as JSON.")
+    parser.add_argument('--compare', help="Earlier --output file to compare against.")
+    parser.add_argument('--threshold', type=float, default=1.5, help="Throughput drop above which a work factor is flagged.")
+    args = parser.parse_args()
+
+    bystander_task() # Warm up the serializer before timing it
+    report = {'created_at': datetime.now().isoformat(timespec='seconds'), 'git_commit': _git_commit(),
+              'python': platform.python_version(), 'cpus': os.cpu_count(), 'clients': args.clients,
+              'hash_workers': PASSWORD_HASH_WORKERS, 'default_n': PASSWORD_SCRYPT_N,
+              'bystander_idle': idle_bystander(min(args.duration, 2.0)), 'work_factors': {}}
+    print(f"{os.cpu_count()} CPU(s), {args.clients} login clients, {PASSWORD_HASH_WORKERS} hashing threads, "
+          f"default N={PASSWORD_SCRYPT_N}; idle bystander p95 {report['bystander_idle']['p95_ms']:.2f} ms")
+    print(f"{'N':>8}{'MiB':>6}{'hash ms':>9}{'mode':>8}{'logins/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'busy':>7}{'bystander p95':>15}")
+    for exponent in args.work_factors:
+        n = 2 ** exponent
+        r = measure_work_factor(n, args.modes, args.clients, args.duration, args.samples)
+        report['work_factors'][str(n)] = r
+        for mode, m in r['modes'].items():
+            print(f"{n:>8}{r['memory_mib']:>6.0f}{r['hash_ms']:>9.1f}{mode:>8}{m['logins_per_s']:>10.1f}{m['login_p50_ms'] or 0:>9.1f}"
+                  f"{m['login_p95_ms'] or 0:>9.1f}{m['busy']:>7}{m['bystander_p95_ms'] or 0:>12.2f} ms"
+                  f"{'  (default)' if n == PASSWORD_SCRYPT_N and mode == 'pool' else ''}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    failures = check_budget(report, args.max_hash_ms)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        failures += compare_runs(baseline, report, args.threshold)
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
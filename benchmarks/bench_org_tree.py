@@ -0,0 +1,77 @@
+# benchmarks/bench_org_tree.py
+"""
+Measures the memory footprint, build time and lookup throughput of the in-process
+org tree snapshot (modules/org_tree.py) for a synthetic org of N employees.
+No database is needed.
+
+Usage (from the project root):
+    python -m benchmarks.bench_org_tree --employees 10000 100000 --lookups 200000
+"""
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+
+from modules.org_tree import OrgTree
+
+FIRST_NAMES = ['Alice', 'Bob', 'Carol', 'David', 'Eve', 'Frank', 'Grace', 'Heidi', 'Ivan', 'Judy', 'Mallory', 'Oscar']
+LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Santos', 'Wilson']
+
+
+def make_rows(count, span, rng):
+    """Rows shaped like EMPLOYEE_SNAPSHOT_QUERY for a complete tree where each manager has `span` direct reports."""
+    rows = []
+    for employee_id in range(1, count + 1):
+        manager_id = None if employee_id == 1 else (employee_id - 2) // span + 1
+        is_manager = (employee_id - 1) * span + 2 <= count # Has at least one report
+        rows.append((employee_id, manager_id, is_manager, f"employee{employee_id}@example.com",
+                     rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--employees', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--span', type=int, default=8, help="Average direct reports per manager.")
+    parser.add_argument('--lookups', type=int, default=200000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"{'employees':>10}{'build ms':>10}{'memory MB':>11}{'bytes/emp':>11}{'email->mgr/s':>14}{'name/s':>12}{'approver/s':>12}")
+    for count in args.employees:
+        rng = random.Random(args.seed)
+        rows = make_rows(count, args.span, rng)
+        emails = [f"employee{rng.randint(1, count)}@example.com" for _ in range(args.lookups)]
+        ids = [rng.randint(1, count) for _ in range(args.lookups)]
+
+        gc.collect()
+        tracemalloc.start()
+        start = time.perf_counter()
+        tree = OrgTree()
+        tree.apply_rows(rows)
+        build_ms = (time.perf_counter() - start) * 1000.0
+        memory_bytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        start = time.perf_counter()
+        for email in emails:
+            tree.find_manager_by_email(email)
+        email_rate = len(emails) / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for employee_id in ids:
+            tree.display_name(tree.manager_id(employee_id))
+        name_rate = len(ids) / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for employee_id in ids:
+            tree.approver_display_name(employee_id)
+        approver_rate = len(ids) / (time.perf_counter() - start)
+
+        print(f"{count:>10,}{build_ms:>10.1f}{memory_bytes / 2**20:>11.1f}{memory_bytes / count:>11.0f}"
+              f"{email_rate:>14,.0f}{name_rate:>12,.0f}{approver_rate:>12,.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,242 @@
+# benchmarks/bench_report_memory.py
+"""
+Memory profile of generate_report_download, the CSV report callback. Each report type is run
+against a throwaway PostgreSQL database loaded by scripts/generate_synthetic_data.py with 10k,
+1M or 10M access requests. The report reads the whole result into a DataFrame, formats datetime
+columns and renders the CSV string, so its memory grows with the data.
+
+Every measurement runs in a fresh process that imports the app and makes one call, so nothing
+is cached between reports. Two numbers are recorded, from separate processes:
+
+  * peak RSS growth during the call, which includes libpq's copy of the result set and other
+    allocations Python does not see. On Linux the kernel's peak-RSS mark is reset just before the
+    call; elsewhere the process-lifetime maximum is reported.
+  * peak traced allocations from tracemalloc (Python objects, pandas/numpy buffers), taken in a
+    separate process because tracing slows the call down and inflates RSS.
+
+The Dash response is serialized to JSON as part of the call, as the server would do.
+--budget-mib fails the run when any report's peak RSS growth goes over the budget. --compare
+flags reports whose peak RSS growth or traced peak grew by more than --threshold over a
+previous run. A worker killed by the OS (out of memory) is reported and counts as a failure.
+
+Usage (from the project root, against the PostgreSQL server in modules/db.py):
+    python -m benchmarks.bench_report_memory --rows 10k 1m --output bench_report_memory.json
+    python -m benchmarks.bench_report_memory --rows 10k 1m --budget-mib 2048 --compare bench_report_memory.json
+    python -m benchmarks.bench_report_memory --database access_request_db --reuse
+"""
+import argparse
+import concurrent.futures
+import json
+import logging
+import multiprocessing
+import platform
+import resource
+import time
+import tracemalloc
+import warnings
+from datetime import datetime
+from types import SimpleNamespace
+
+from modules.db import DB_CONFIG, get_db_connection
+from modules.callbacks import REPORT_QUERIES
+from scripts.generate_synthetic_data import load_synthetic_data
+from .bench_callbacks import recreate_database, drop_database, _git_commit, _session, _session_cookie
+
+ROW_SCALES = {
+    '10k': {'employees': 1_000, 'tables': 500, 'requests': 10_000},
+    '1m': {'employees': 50_000, 'tables': 5_000, 'requests': 1_000_000},
+    '10m': {'employees': 200_000, 'tables': 20_000, 'requests': 10_000_000},
+}
+
+
+# --- Memory probes ---
+def _reset_peak_rss():
+    """Resets the kernel's peak RSS mark (VmHWM) for this process. Linux only; returns False elsewhere."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+def _proc_status_kib(field):
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(field + ':'):
+                return int(line.split()[1])
+    return None
+
+def measure_report(database, report_type, traced):
+    """Runs in a fresh process: imports the app against `database` and makes one report call."""
+    DB_CONFIG['dbname'] = database
+    import app as app_module # Imported here so the Dash app and its callbacks only exist in the worker process
+    from dash._callback_context import context_value
+    from dash._utils import AttributeDict, to_json
+    logging.disable(logging.WARNING)
+    warnings.filterwarnings('ignore', message='pandas only supports SQLAlchemy') # Reports use pd.read_sql_query on psycopg2
+    callback = next(entry['callback'].__wrapped__ for entry in app_module.app.callback_map.values()
+                    if entry['callback'].__wrapped__.__name__ == 'generate_report_download')
+    context_value.set(AttributeDict(triggered_inputs=[{'prop_id': 'download-report-button.n_clicks', 'value': 1}], dash_response=None))
+    # Reports are for managers only; company-wide ones do not depend on which manager asks.
+    conn = get_db_connection(app_module.app)
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT MIN(employee_id) FROM Employees WHERE is_manager;")
+            manager_session, _ = _session(cur, cur.fetchone()[0])
+    finally:
+        conn.close()
+    cookie = _session_cookie(app_module.app, manager_session)
+
+    if traced:
+        tracemalloc.start()
+    peak_reset = _reset_peak_rss()
+    rss_before_kib = _proc_status_kib('VmRSS') if peak_reset else resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    with app_module.app.server.test_request_context(headers={'Cookie': cookie}):
+        download, feedback = callback(1, report_type, False)
+    response = to_json({'download-csv': {'data': download}, 'report-generation-feedback': {'children': feedback}})
+    seconds = time.perf_counter() - started
+    peak_kib = _proc_status_kib('VmHWM') if peak_reset else resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    result = {'seconds': seconds, 'rss_before_mib': rss_before_kib / 1024.0, 'peak_rss_mib': peak_kib / 1024.0,
+              'peak_growth_mib': (peak_kib - rss_before_kib) / 1024.0, 'peak_reset': peak_reset}
+    if traced:
+        result['traced_peak_mib'] = tracemalloc.get_traced_memory()[1] / (1024.0 * 1024.0)
+        tracemalloc.stop()
+    if not isinstance(download, dict):
+        result['error'] = str(getattr(feedback, 'children', feedback))
+        return result
+    result['rows'] = download['content'].count('\n') - 1 # Minus the header line
+    result['csv_mib'] = len(download['content']) / (1024.0 * 1024.0)
+    result['response_mib'] = len(response) / (1024.0 * 1024.0)
+    return result
+
+def run_in_worker(database, report_type, traced):
+    with concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+        try:
+            return pool.submit(measure_report, database, report_type, traced).result()
+        except concurrent.futures.process.BrokenProcessPool:
+            return {'error': "worker process died (killed by the OS, likely out of memory)"}
+
+def run_scale(database, report_types, traced):
+    results = {}
+    for report_type in report_types:
+        result = run_in_worker(database, report_type, traced=False)
+        if traced and 'error' not in result:
+            result['traced_peak_mib'] = run_in_worker(database, report_type, traced=True).get('traced_peak_mib')
+        results[report_type] = result
+        summary = f"error: {result['error']}" if 'error' in result else f"{result['peak_growth_mib']:.0f} MiB peak RSS growth"
+        print(f"  {report_type}: {summary}")
+    return results
+
+def count_requests(app):
+    conn = get_db_connection(app)
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT (SELECT COUNT(*) FROM AccessRequests), (SELECT COUNT(*) FROM Employees), (SELECT COUNT(*) FROM DatabaseTables);")
+            requests, employees, tables = cur.fetchone()
+    finally:
+        conn.close()
+    return {'employees': employees, 'tables': tables, 'requests': requests}
+
+
+# --- Reporting ---
+def print_scale(scale, result):
+    print(f"\n{scale}: {result['sizes']['employees']:,} employees, {result['sizes']['tables']:,} tables, {result['sizes']['requests']:,} requests")
+    print(f"{'report':<20}{'rows':>11}{'CSV MiB':>9}{'seconds':>9}{'RSS before':>12}{'peak RSS':>10}{'growth':>9}{'traced':>9}{'B/row':>8}")
+    for report_type, r in result['reports'].items():
+        if 'error' in r:
+            print(f"{report_type:<20}  FAILED: {r['error']}")
+            continue
+        traced = f"{r['traced_peak_mib']:>9.0f}" if r.get('traced_peak_mib') is not None else f"{'-':>9}"
+        per_row = r['peak_growth_mib'] * 1024 * 1024 / r['rows'] if r['rows'] else 0.0
+        print(f"{report_type:<20}{r['rows']:>11,}{r['csv_mib']:>9.1f}{r['seconds']:>9.2f}{r['rss_before_mib']:>12.0f}{r['peak_rss_mib']:>10.0f}"
+              f"{r['peak_growth_mib']:>9.0f}{traced}{per_row:>8.0f}")
+    print("(MiB unless noted; growth = peak RSS during the call minus RSS before it; B/row = growth per report row)")
+
+def check_budget(report, budget_mib):
+    """Prints reports over the peak RSS growth budget, or that failed outright. Returns the count."""
+    failures = 0
+    for scale, result in report['scales'].items():
+        for report_type, r in result['reports'].items():
+            if 'error' in r or (budget_mib is not None and r['peak_growth_mib'] > budget_mib):
+                failures += 1
+                reason = r['error'] if 'error' in r else f"peak RSS growth {r['peak_growth_mib']:.0f} MiB over budget {budget_mib:.0f} MiB"
+                print(f"FAIL {scale} {report_type}: {reason}")
+    return failures
+
+def compare_runs(baseline, current, threshold):
+    """Prints reports whose peak RSS growth or traced peak grew by more than `threshold`x. Returns the count."""
+    regressions = 0
+    print(f"\nComparison with baseline {baseline.get('git_commit') or ''} ({baseline['created_at']}), threshold {threshold:.2f}x")
+    print(f"{'scale':<6}{'report':<20}{'base growth':>13}{'now growth':>12}{'ratio':>8}{'base traced':>13}{'now traced':>12}{'ratio':>8}")
+    for scale, result in current['scales'].items():
+        base_scale = baseline.get('scales', {}).get(scale)
+        if not base_scale: continue
+        for report_type, r in result['reports'].items():
+            b = base_scale['reports'].get(report_type)
+            if not b or 'error' in b or 'error' in r: continue
+            growth_ratio = r['peak_growth_mib'] / b['peak_growth_mib'] if b['peak_growth_mib'] > 0 else 1.0
+            traced_ratio = (r['traced_peak_mib'] / b['traced_peak_mib']
+                            if r.get('traced_peak_mib') is not None and b.get('traced_peak_mib') else 1.0)
+            flagged = growth_ratio > threshold or traced_ratio > threshold
+            regressions += flagged
+            print(f"{scale:<6}{report_type:<20}{b['peak_growth_mib']:>13.0f}{r['peak_growth_mib']:>12.0f}{growth_ratio:>8.2f}"
+                  f"{b.get('traced_peak_mib') or 0:>13.0f}{r.get('traced_peak_mib') or 0:>12.0f}{traced_ratio:>8.2f}"
+                  f"{'  <-- regression' if flagged else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', nargs='+', choices=list(ROW_SCALES), default=['10k', '1m'], help="Access request counts to load.")
+    parser.add_argument('--reports', nargs='+', choices=list(REPORT_QUERIES), default=list(REPORT_QUERIES))
+    parser.add_argument('--database', default='access_request_bench', help="Scratch database; dropped and recreated for every scale unless --reuse.")
+    parser.add_argument('--reuse', action='store_true', help="Measure --database as it is (already loaded) instead of loading --rows.")
+    parser.add_argument('--schema', nargs='+', default=['data/schema.sql'], help="SQL files applied, in order, to the fresh database.")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--no-trace', action='store_true', help="Skip the tracemalloc runs (halves the run time).")
+    parser.add_argument('--budget-mib', type=float, help="Fail when a report's peak RSS growth exceeds this.")
+    parser.add_argument('--output', default='bench_report_memory.json')
+    parser.add_argument('--compare', help="Earlier --output file to compare against.")
+    parser.add_argument('--threshold', type=float, default=1.2, help="Memory ratio above which a report is flagged.")
+    parser.add_argument('--keep-database', action='store_true')
+    args = parser.parse_args()
+    if not args.reuse and args.database == DB_CONFIG['dbname']:
+        raise SystemExit(f"--database must not be the application database ({DB_CONFIG['dbname']}) unless --reuse is given; it is dropped.")
+
+    logging.basicConfig(level=logging.WARNING)
+    app = SimpleNamespace(logger=logging.getLogger('bench_report_memory'))
+    report = {'created_at': datetime.now().isoformat(timespec='seconds'), 'git_commit': _git_commit(),
+              'python': platform.python_version(), 'seed': args.seed, 'scales': {}}
+    scales = ['existing'] if args.reuse else args.rows
+    try:
+        for scale in scales:
+            if not args.reuse:
+                sizes = ROW_SCALES[scale]
+                print(f"\nPreparing {scale} database {args.database} ...")
+                recreate_database(args.database, args.schema)
+            DB_CONFIG['dbname'] = args.database
+            if not args.reuse:
+                # Dated up to now: analytics windows and grant expiry are measured against the real clock.
+                load_synthetic_data(app, sizes['employees'], sizes['tables'], sizes['requests'], seed=args.seed, anchor=datetime.now())
+            print(f"Measuring reports on {args.database} ...")
+            report['scales'][scale] = {'sizes': count_requests(app), 'reports': run_scale(args.database, args.reports, not args.no_trace)}
+            print_scale(scale, report['scales'][scale])
+    finally:
+        if not args.reuse and not args.keep_database:
+            drop_database(args.database)
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+    failures = check_budget(report, args.budget_mib)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        failures += compare_runs(baseline, report, args.threshold)
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+# benchmarks/bench_rollup.py
+"""
+Compares analytics trend reads from DailyRequestRollup against the same
+aggregation computed from raw AccessRequests.
+
+Usage (from the project root, against the database in modules/db.py):
+    python -m benchmarks.bench_rollup --iterations 20 --days 365 --rebuild
+"""
+import argparse
+import logging
+import statistics
+import time
+from types import SimpleNamespace
+
+import psycopg2.extras
+
+from modules.db import get_db_connection
+from modules.rollups import build_trend_query, rebuild_daily_rollup, ROLLUP_GROUP_EXPRESSIONS
+
+
+def time_query(conn, query, params, iterations):
+    timings_ms, row_count = [], 0
+    with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
+        for _ in range(iterations):
+            start = time.perf_counter()
+            cur.execute(query, params)
+            row_count = len(cur.fetchall())
+            timings_ms.append((time.perf_counter() - start) * 1000.0)
+    return timings_ms, row_count
+
+
+def summarize(timings_ms):
+    ordered = sorted(timings_ms)
+    p95_index = max(0, int(round(0.95 * len(ordered))) - 1)
+    return {'median_ms': statistics.median(ordered), 'p95_ms': ordered[p95_index], 'min_ms': ordered[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--days', type=int, default=365, help="Trend window in days.")
+    parser.add_argument('--rebuild', action='store_true', help="Rebuild the rollup before timing.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    app = SimpleNamespace(logger=logging.getLogger('bench_rollup'))
+
+    if args.rebuild:
+        start = time.perf_counter()
+        rebuild_daily_rollup(app)
+        print(f"Rollup rebuild: {(time.perf_counter() - start) * 1000.0:.1f} ms")
+
+    conn = get_db_connection(app)
+    if not conn:
+        raise SystemExit("Could not connect to the database.")
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT COUNT(*) FROM AccessRequests;")
+            raw_rows = cur.fetchone()[0]
+            cur.execute("SELECT COUNT(*) FROM DailyRequestRollup;")
+            rollup_rows = cur.fetchone()[0]
+        print(f"AccessRequests rows: {raw_rows:,}  DailyRequestRollup rows: {rollup_rows:,}  window: {args.days} days\n")
+        print(f"{'group_by':<12}{'source':<8}{'rows':>8}{'median ms':>12}{'p95 ms':>10}{'min ms':>10}")
+
+        params = {'days': args.days}
+        for group_by in ROLLUP_GROUP_EXPRESSIONS:
+            medians = {}
+            for source, use_rollup in (('rollup', True), ('raw', False)):
+                timings, row_count = time_query(conn, build_trend_query(group_by, use_rollup), params, args.iterations)
+                stats = summarize(timings)
+                medians[source] = stats['median_ms']
+                print(f"{group_by:<12}{source:<8}{row_count:>8}{stats['median_ms']:>12.2f}{stats['p95_ms']:>10.2f}{stats['min_ms']:>10.2f}")
+            speedup = medians['raw'] / medians['rollup'] if medians['rollup'] else float('inf')
+            print(f"{'':<12}speedup: {speedup:.1f}x\n")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,265 @@
+# benchmarks/check_query_plans.py
+"""
+Query plan regression check for every SQL statement in modules/callbacks.py. Each statement is
+run through EXPLAIN (FORMAT JSON) with representative parameters against a large database
+loaded by scripts/generate_synthetic_data.py, and the plan is checked for:
+
+  * no sequential scan on the tables that grow with the organisation (AccessRequests,
+    Employees, EmployeeHierarchy, UserCredentials), except in the company-wide reports,
+    which read most of AccessRequests by design;
+  * an estimated total cost under the statement's budget.
+
+It also fails when callbacks.py runs SQL that is not a module-level constant, or defines a
+statement this script has no check for, so new queries cannot skip the check. Exits 1 on any
+failure, for use as a CI step after schema or query changes.
+
+Plain EXPLAIN only plans; nothing is executed and the session is read-only, so --reuse is safe
+against any database. Budgets are calibrated for the medium and large scales; the small
+scale is too small for the planner to prefer indexes and is only useful as a smoke test.
+
+Usage (from the project root, against the PostgreSQL server in modules/db.py):
+    python -m benchmarks.check_query_plans --scale medium
+    python -m benchmarks.check_query_plans --database access_request_db --reuse --verbose
+"""
+import argparse
+import ast
+import json
+import logging
+import re
+import uuid
+from collections import namedtuple
+from datetime import datetime
+from types import SimpleNamespace
+
+from psycopg2.extensions import AsIs
+
+from modules import callbacks
+from modules.callbacks import ORG_SCOPE_REPORT_JOIN, REPORT_QUERIES, REQUEST_ROW_TEMPLATE
+from modules.db import DB_CONFIG, get_db_connection
+from scripts.generate_synthetic_data import load_synthetic_data
+from .bench_callbacks import (SCALES, BULK_DECISION_SIZE, SUBMIT_ITEMS, BUSIEST_MANAGER_QUERY, DIRECT_REPORTS_BY_ACTIVITY_QUERY,
+                              recreate_database, drop_database, _git_commit)
+
+# Tables whose row count grows with the organisation; a sequential scan on one of these in an
+# interactive statement means a missing or unusable index.
+GROWING_TABLES = ('accessrequests', 'employees', 'employeehierarchy', 'usercredentials')
+SQL_STATEMENT = re.compile(r'^\s*(SELECT|INSERT|UPDATE|DELETE|WITH)\b')
+
+# source is the callbacks.py constant the statement comes from (REPORT_QUERIES entries as 'REPORT_QUERIES[key]').
+# no_seq_scan lists tables that must not be read with a Seq Scan; max_cost is the planner's total cost budget.
+PlanCheck = namedtuple('PlanCheck', 'name source sql params no_seq_scan max_cost')
+
+
+# --- Fixtures ---
+# The manager whose direct reports have the most requests (the heaviest approval queue) and the
+# most active of those reports; the same employees bench_callbacks.py times.
+REQUESTER_QUERY = """
+    SELECT e.employee_id, e.email, uc.username FROM Employees e JOIN UserCredentials uc ON uc.employee_id = e.employee_id
+    WHERE e.employee_id = %s;
+"""
+REQUESTER_REQUESTS_QUERY = "SELECT request_id FROM AccessRequests WHERE requester_id = %s ORDER BY request_id LIMIT %s;"
+ACTIVE_TABLES_QUERY = "SELECT table_id FROM DatabaseTables WHERE is_active ORDER BY table_id LIMIT %s;"
+
+def load_fixtures(app):
+    conn = get_db_connection(app)
+    try:
+        with conn.cursor() as cur:
+            cur.execute(BUSIEST_MANAGER_QUERY)
+            manager_id = cur.fetchone()[0]
+            cur.execute(DIRECT_REPORTS_BY_ACTIVITY_QUERY, (manager_id,))
+            requester_id = cur.fetchone()[0]
+            cur.execute(REQUESTER_QUERY, (requester_id,))
+            _, email, username = cur.fetchone()
+            cur.execute(REQUESTER_REQUESTS_QUERY, (requester_id, BULK_DECISION_SIZE))
+            request_ids = [r[0] for r in cur.fetchall()]
+            cur.execute(ACTIVE_TABLES_QUERY, (SUBMIT_ITEMS,))
+            table_ids = [r[0] for r in cur.fetchall()]
+            cur.execute("SELECT (SELECT COUNT(*) FROM AccessRequests), (SELECT COUNT(*) FROM Employees), (SELECT COUNT(*) FROM DatabaseTables);")
+            requests, employees, tables = cur.fetchone()
+            cur.execute("SHOW server_version;")
+            server_version = cur.fetchone()[0]
+    finally:
+        conn.close()
+    return SimpleNamespace(manager_id=manager_id, requester_id=requester_id, email=email, username=username,
+                           request_ids=request_ids, table_ids=table_ids, server_version=server_version,
+                           sizes={'requests': requests, 'employees': employees, 'tables': tables})
+
+
+# --- Checks ---
+def build_checks(cur, fx):
+    """One PlanCheck per statement (and per org-scope variant of each report)."""
+    request_id, role_ids = fx.request_ids[0], [1, 2, 3][:len(fx.table_ids)]
+    key = str(uuid.uuid4())
+    rows = [(fx.requester_id, t, r, 'Plan check', 'Pending', None, False, None, 30, False, None) for t, r in zip(fx.table_ids, role_ids)]
+    values = AsIs(','.join(cur.mogrify(REQUEST_ROW_TEMPLATE, row).decode() for row in rows))
+    interactive = GROWING_TABLES
+    checks = [
+        PlanCheck('login', 'LOGIN_QUERY', callbacks.LOGIN_QUERY, (fx.username,), interactive, 50),
+        PlanCheck('password_upgrade', 'PASSWORD_UPGRADE_UPDATE', callbacks.PASSWORD_UPGRADE_UPDATE,
+                  ('scrypt$16384$8$1$c2FsdA==$aGFzaA==', fx.requester_id), interactive, 50),
+        PlanCheck('my_requests', 'MY_REQUESTS_QUERY', callbacks.MY_REQUESTS_QUERY, (fx.requester_id,), interactive, 2_000),
+        PlanCheck('approval_queue', 'APPROVAL_QUEUE_QUERY', callbacks.APPROVAL_QUEUE_QUERY, (fx.manager_id,), interactive, 10_000),
+        PlanCheck('approval_queue_org', 'ORG_APPROVAL_QUEUE_QUERY', callbacks.ORG_APPROVAL_QUEUE_QUERY, (fx.manager_id,), interactive, 5_000),
+        PlanCheck('decision_details', 'DECISION_DETAILS_QUERY', callbacks.DECISION_DETAILS_QUERY, (request_id,), interactive, 50),
+        PlanCheck('signup_lookup', 'SIGNUP_EMPLOYEE_QUERY', callbacks.SIGNUP_EMPLOYEE_QUERY, (fx.email,), interactive, 50),
+        PlanCheck('signup_employee', 'EMPLOYEE_INSERT', callbacks.EMPLOYEE_INSERT,
+                  ('Plan', 'Check', f'plan.check.{key}@example.com', 'Engineering', fx.manager_id, False), interactive, 50),
+        PlanCheck('signup_credentials', 'CREDENTIALS_INSERT', callbacks.CREDENTIALS_INSERT,
+                  (fx.requester_id, f'plan.check.{key}@example.com', 'scrypt$16384$8$1$c2FsdA==$aGFzaA=='), interactive, 50),
+        PlanCheck('activation_lookup', 'ACTIVATION_TOKEN_LOOKUP_QUERY', callbacks.ACTIVATION_TOKEN_LOOKUP_QUERY, ('0' * 64,), interactive, 50),
+        PlanCheck('activation_consume', 'ACTIVATION_TOKEN_CONSUME', callbacks.ACTIVATION_TOKEN_CONSUME, ('0' * 64,), interactive, 50),
+        PlanCheck('cancel_request', 'CANCEL_REQUEST_UPDATE', callbacks.CANCEL_REQUEST_UPDATE,
+                  (fx.requester_id, request_id, fx.requester_id), interactive, 50),
+        PlanCheck('approval_decision', 'APPROVAL_DECISION_UPDATE', callbacks.APPROVAL_DECISION_UPDATE,
+                  ('Approved', fx.manager_id, 'Plan check', True, request_id, fx.manager_id), interactive, 50),
+        PlanCheck('bulk_decision', 'BULK_APPROVAL_DECISION_UPDATE', callbacks.BULK_APPROVAL_DECISION_UPDATE,
+                  ('Approved', fx.manager_id, 'Plan check', True, fx.request_ids, fx.manager_id), interactive, 200),
+        PlanCheck('bulk_decision_failures', 'BULK_DECISION_FAILURES_QUERY', callbacks.BULK_DECISION_FAILURES_QUERY,
+                  (fx.manager_id, fx.request_ids), interactive, 200),
+        PlanCheck('role_options', 'ROLE_OPTIONS_QUERY', callbacks.ROLE_OPTIONS_QUERY, None, interactive, 200),
+        PlanCheck('submission_claim', 'SUBMISSION_CLAIM_INSERT', callbacks.SUBMISSION_CLAIM_INSERT, (key, fx.requester_id), interactive, 50),
+        PlanCheck('submission_replay', 'SUBMISSION_REPLAY_QUERY', callbacks.SUBMISSION_REPLAY_QUERY, (key,), interactive, 50),
+        PlanCheck('removed_tables', 'REMOVED_TABLES_QUERY', callbacks.REMOVED_TABLES_QUERY, (fx.table_ids,), interactive, 50),
+        PlanCheck('auto_approval_attributes', 'AUTO_APPROVAL_ATTRIBUTES_QUERY', callbacks.AUTO_APPROVAL_ATTRIBUTES_QUERY,
+                  (fx.table_ids, fx.requester_id), interactive, 50),
+        PlanCheck('submit_requests', 'REQUESTS_INSERT', callbacks.REQUESTS_INSERT, (values,), interactive, 50),
+        PlanCheck('existing_pending', 'EXISTING_PENDING_QUERY', callbacks.EXISTING_PENDING_QUERY,
+                  (fx.table_ids, role_ids, fx.requester_id), interactive, 200),
+        PlanCheck('submission_record', 'SUBMISSION_RECORD_UPDATE', callbacks.SUBMISSION_RECORD_UPDATE, (fx.request_ids, key), interactive, 50),
+    ]
+    # Company-wide reports read most of AccessRequests, so a Seq Scan there is the right plan and the
+    # cost grows with the data; "my org" reports must go through the closure table and stay small.
+    company_wide = {'pending_requests': ('accessrequests',)}
+    for report_type, (_, query) in REPORT_QUERIES.items():
+        checks.append(PlanCheck(f'report_{report_type}', f'REPORT_QUERIES[{report_type!r}]', query.format(scope_join=''),
+                                None, company_wide.get(report_type, ()), None))
+        checks.append(PlanCheck(f'report_{report_type}_my_org', f'REPORT_QUERIES[{report_type!r}]',
+                                query.format(scope_join=ORG_SCOPE_REPORT_JOIN), {'scope_manager_id': fx.manager_id}, interactive, 5_000))
+    return checks
+
+def plan_nodes(node, depth=0):
+    yield depth, node
+    for child in node.get('Plans', []):
+        yield from plan_nodes(child, depth + 1)
+
+def format_plan(plan):
+    lines = []
+    for depth, node in plan_nodes(plan):
+        target = node.get('Relation Name') or node.get('Index Name') or ''
+        if node.get('Index Name') and node.get('Relation Name'):
+            target = f"{node['Relation Name']} using {node['Index Name']}"
+        lines.append(f"{'  ' * depth}-> {node['Node Type']} {target}  (cost={node['Total Cost']:.0f} rows={node['Plan Rows']})")
+    return '\n'.join(lines)
+
+def run_check(cur, check):
+    """EXPLAINs one statement; returns its result dict with a list of problems (empty when it passes)."""
+    cur.execute('EXPLAIN (FORMAT JSON) ' + check.sql, check.params)
+    plan = cur.fetchone()[0][0]['Plan']
+    seq_scans = sorted({n['Relation Name'].lower() for _, n in plan_nodes(plan) if n['Node Type'] == 'Seq Scan'})
+    problems = [f"Seq Scan on {t}" for t in seq_scans if t in check.no_seq_scan]
+    if check.max_cost is not None and plan['Total Cost'] > check.max_cost:
+        problems.append(f"cost {plan['Total Cost']:.0f} over budget {check.max_cost:,}")
+    return {'source': check.source, 'total_cost': plan['Total Cost'], 'max_cost': check.max_cost, 'plan_rows': plan['Plan Rows'],
+            'seq_scans': seq_scans, 'problems': problems, 'plan': format_plan(plan)}
+
+
+# --- Coverage ---
+def _sql_constants(tree):
+    """Module-level SQL statements in callbacks.py, by constant name."""
+    names = []
+    for stmt in tree.body:
+        if not isinstance(stmt, ast.Assign) or not isinstance(stmt.targets[0], ast.Name): continue
+        name, value = stmt.targets[0].id, stmt.value
+        if isinstance(value, ast.Dict):
+            names += [f"{name}[{k.value!r}]" for k, v in zip(value.keys, value.values)
+                      if any(isinstance(c, ast.Constant) and isinstance(c.value, str) and SQL_STATEMENT.match(c.value) for c in ast.walk(v))]
+        elif any(isinstance(c, ast.Constant) and isinstance(c.value, str) and SQL_STATEMENT.match(c.value) for c in ast.walk(value)):
+            names.append(name)
+    return names
+
+def check_coverage(checks):
+    """Returns problems for inline SQL in callbacks.py functions and SQL constants without a PlanCheck."""
+    with open(callbacks.__file__) as f:
+        tree = ast.parse(f.read())
+    inline = {} # SQL literal -> innermost enclosing function (ast.walk visits outer functions first)
+    for func in (n for n in ast.walk(tree) if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef))):
+        for node in ast.walk(func):
+            if isinstance(node, ast.Constant) and isinstance(node.value, str) and SQL_STATEMENT.match(node.value):
+                inline[node] = func.name
+    problems = [f"modules/callbacks.py:{node.lineno}: inline SQL in {name}(); move it to a module-level constant and add a check"
+                for node, name in inline.items()]
+    covered = {c.source for c in checks}
+    problems += [f"{name} has no plan check" for name in _sql_constants(tree) if name not in covered]
+    return sorted(set(problems))
+
+
+# --- Reporting ---
+def print_results(results, verbose):
+    print(f"{'statement':<32}{'cost':>12}{'budget':>10}{'rows':>10}  seq scans / problems")
+    for name, r in results.items():
+        budget = f"{r['max_cost']:,}" if r['max_cost'] is not None else '-'
+        detail = '; '.join(r['problems']) if r['problems'] else ', '.join(r['seq_scans'])
+        print(f"{name:<32}{r['total_cost']:>12.0f}{budget:>10}{r['plan_rows']:>10}  {'FAIL ' if r['problems'] else ''}{detail}")
+        if verbose or r['problems']:
+            print('\n'.join('      ' + line for line in r['plan'].split('\n')))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', choices=list(SCALES), default='medium', help="Data scale loaded into the scratch database.")
+    parser.add_argument('--database', default='access_request_plans', help="Scratch database; dropped and recreated unless --reuse.")
+    parser.add_argument('--reuse', action='store_true', help="Check --database as it is (already loaded) instead of recreating it.")
+    parser.add_argument('--schema', nargs='+', default=['data/schema.sql'], help="SQL files applied, in order, to the fresh database.")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--verbose', action='store_true', help="Print every plan, not just the failing ones.")
+    parser.add_argument('--output', help="Write the plans and costs as JSON.")
+    parser.add_argument('--keep-database', action='store_true')
+    args = parser.parse_args()
+    if not args.reuse and args.database == DB_CONFIG['dbname']:
+        raise SystemExit(f"--database must not be the application database ({DB_CONFIG['dbname']}) unless --reuse is given; it is dropped.")
+
+    logging.basicConfig(level=logging.WARNING)
+    app = SimpleNamespace(logger=logging.getLogger('check_query_plans'))
+    if not args.reuse:
+        sizes = SCALES[args.scale]
+        print(f"Preparing {args.scale} database {args.database} ...")
+        recreate_database(args.database, args.schema)
+    DB_CONFIG['dbname'] = args.database
+    try:
+        if not args.reuse:
+            # Dated up to now: analytics windows and grant expiry are measured against the real clock.
+            load_synthetic_data(app, sizes['employees'], sizes['tables'], sizes['requests'], seed=args.seed, anchor=datetime.now())
+        fx = load_fixtures(app)
+        conn = get_db_connection(app)
+        conn.set_session(readonly=True)
+        try:
+            with conn.cursor() as cur:
+                checks = build_checks(cur, fx)
+                results = {check.name: run_check(cur, check) for check in checks}
+        finally:
+            conn.rollback()
+            conn.close()
+    finally:
+        if not args.reuse and not args.keep_database:
+            drop_database(args.database)
+
+    print(f"\n{args.database}: {fx.sizes['employees']:,} employees, {fx.sizes['tables']:,} tables, {fx.sizes['requests']:,} requests "
+          f"(PostgreSQL {fx.server_version}); manager {fx.manager_id}, requester {fx.requester_id}\n")
+    print_results(results, args.verbose)
+    coverage_problems = check_coverage(checks)
+    for problem in coverage_problems:
+        print(f"FAIL {problem}")
+    failures = sum(bool(r['problems']) for r in results.values()) + len(coverage_problems)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'created_at': datetime.now().isoformat(timespec='seconds'), 'git_commit': _git_commit(),
+                       'server_version': fx.server_version, 'sizes': fx.sizes, 'statements': results}, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    print(f"\n{len(results)} statements checked, {failures} failure(s).")
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
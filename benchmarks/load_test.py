@@ -0,0 +1,332 @@
+# benchmarks/load_test.py
+"""
+HTTP load test for a running app. Virtual users replay realistic sessions by posting callback
+payloads to Dash's /_dash-update-component endpoint, exactly as the browser does: log in, load the
+dashboard (page layout, request tables, analytics), open the new-request form, search tables,
+submit a request and log out. Manager users also open, approve and search their approval queue
+and download a report. Callbacks are looked up in /_dash-dependencies, so payloads always match
+the server's callback definitions.
+
+Reports throughput, per-callback p50/p95/p99 latency, response size and error rate (HTTP errors,
+timeouts and failed logins/submissions). Users and passwords come from the database in
+modules/db.py, loaded by scripts/generate_synthetic_data.py.
+
+Every virtual user logs in from the same address, so start the app with LOGIN_RATE_LIMIT_ENABLED=0;
+otherwise the per-IP login limit (modules/rate_limit.py) turns most logins away.
+
+Usage (from the project root, with the app running, e.g. `python app.py` or `gunicorn -w 4 app:server`):
+    python -m benchmarks.load_test --url http://127.0.0.1:8050 --users 20 --duration 60 --think-time 1.0
+"""
+import argparse
+import json
+import logging
+import random
+import statistics
+import threading
+import time
+from collections import defaultdict
+from types import SimpleNamespace
+
+import requests
+
+from modules.db import get_db_connection
+from scripts.generate_synthetic_data import DEFAULT_PASSWORD, TABLE_WORDS
+
+UPDATE_COMPONENT_PATH = '/_dash-update-component'
+DEPENDENCIES_PATH = '/_dash-dependencies'
+REPORT_TYPES = ['audit_log', 'user_permissions', 'pending_requests', 'approval_latency']
+SEARCH_TERMS = ['reconciliation', 'dashboard', '"audit sample"', 'escalation', 'JIRA', 'migration OR backfill']
+
+# Managers are drawn from approvers with Pending requests below them, requesters from individual contributors.
+MANAGER_USERS_QUERY = """
+    SELECT uc.username FROM UserCredentials uc
+    WHERE uc.employee_id IN (SELECT e.manager_id FROM AccessRequests ar JOIN Employees e ON e.employee_id = ar.requester_id
+                             WHERE ar.status = 'Pending' AND e.manager_id IS NOT NULL)
+    ORDER BY md5(uc.username || %(seed)s) LIMIT %(limit)s;
+"""
+REQUESTER_USERS_QUERY = """
+    SELECT uc.username FROM UserCredentials uc JOIN Employees e ON e.employee_id = uc.employee_id
+    WHERE e.manager_id IS NOT NULL AND NOT e.is_manager
+    ORDER BY md5(uc.username || %(seed)s) LIMIT %(limit)s;
+"""
+
+
+def _stringify_id(component_id):
+    """Same form as Dash's stringify_id: dict ids become JSON with sorted keys."""
+    return json.dumps(component_id, sort_keys=True, separators=(',', ':')) if isinstance(component_id, dict) else component_id
+
+def _split_outputs(output):
+    """Parses a callback output key ('..a.x...b.y@hash..' or 'a.x') into [(id, property)]."""
+    parts = output[2:-2].split('...') if output.startswith('..') else [output]
+    return [tuple(part.rsplit('.', 1)) for part in parts]
+
+
+class DashCallbackClient:
+    """Builds /_dash-update-component payloads from the server's callback list."""
+
+    def __init__(self, base_url, timeout):
+        self.base_url, self.timeout = base_url.rstrip('/'), timeout
+        self.callbacks = requests.get(self.base_url + DEPENDENCIES_PATH, timeout=timeout).json()
+
+    def _resolve(self, id_str, match):
+        # Pattern-matching ids arrive as JSON with ["MATCH"] wildcards; fill them from `match`.
+        if not id_str.startswith('{'): return id_str
+        component_id = json.loads(id_str)
+        return {k: (match[k] if v == ['MATCH'] and k in match else v) for k, v in component_id.items()}
+
+    def find(self, trigger, output, match=None):
+        """Returns the callback whose inputs include `trigger` and whose outputs include `output` ('id.prop', concrete ids)."""
+        match = match or {}
+        for cb in self.callbacks:
+            inputs = {f"{_stringify_id(self._resolve(i['id'], match))}.{i['property']}" for i in cb['inputs']}
+            outputs = {f"{_stringify_id(self._resolve(o_id, match))}.{prop.split('@')[0]}" for o_id, prop in _split_outputs(cb['output'])}
+            if trigger in inputs and output in outputs:
+                return cb
+        raise LookupError(f"No callback with input {trigger} and output {output}")
+
+    def payload(self, cb, trigger, values, match=None):
+        match = match or {}
+        def props(deps):
+            resolved = []
+            for dep in deps:
+                component_id = self._resolve(dep['id'], match)
+                resolved.append({'id': component_id, 'property': dep['property'],
+                                 'value': values.get(f"{_stringify_id(component_id)}.{dep['property']}")})
+            return resolved
+        outputs = [{'id': self._resolve(o_id, match), 'property': prop} for o_id, prop in _split_outputs(cb['output'])]
+        return {'output': cb['output'], 'outputs': outputs if cb['output'].startswith('..') else outputs[0],
+                'inputs': props(cb['inputs']), 'state': props(cb['state']), 'changedPropIds': [trigger]}
+
+
+class LoadStats:
+    """Thread-safe per-label latency, size and error accounting."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.timings_ms = defaultdict(list)
+        self.response_bytes = defaultdict(int)
+        self.errors = defaultdict(int)
+        self.error_samples = {}
+        self.sessions = 0
+
+    def record(self, label, elapsed_ms, size, error=None):
+        with self._lock:
+            self.timings_ms[label].append(elapsed_ms)
+            self.response_bytes[label] += size
+            if error:
+                self.errors[label] += 1
+                self.error_samples.setdefault(label, error)
+
+    def fail(self, label, reason):
+        """An application-level failure of a call that already succeeded at the HTTP level."""
+        with self._lock:
+            self.errors[label] += 1
+            self.error_samples.setdefault(label, reason)
+
+    def session_done(self):
+        with self._lock:
+            self.sessions += 1
+
+
+class VirtualUser:
+    """One simulated browser: a requests.Session replaying user sessions until `deadline`."""
+
+    def __init__(self, client, stats, username, password, is_manager, args, rng):
+        self.client, self.stats, self.args, self.rng = client, stats, args, rng
+        self.username, self.password, self.is_manager = username, password, is_manager
+        self.http = requests.Session()
+        self._callbacks = {}
+
+    def call(self, label, trigger, output, values, match=None):
+        """Posts one callback. Returns the response's component dict ({} for no update), or None on errors."""
+        key = (trigger, output)
+        if key not in self._callbacks:
+            self._callbacks[key] = self.client.find(trigger, output, match)
+        body = self.client.payload(self._callbacks[key], trigger, values, match)
+        started = time.perf_counter()
+        try:
+            resp = self.http.post(self.client.base_url + UPDATE_COMPONENT_PATH, json=body, timeout=self.client.timeout)
+            content = resp.content
+        except requests.RequestException as e:
+            self.stats.record(label, (time.perf_counter() - started) * 1000.0, 0, error=type(e).__name__)
+            return None
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+        if resp.status_code == 204: # PreventUpdate
+            self.stats.record(label, elapsed_ms, 0)
+            return {}
+        if resp.status_code != 200:
+            self.stats.record(label, elapsed_ms, len(content), error=f"HTTP {resp.status_code}")
+            return None
+        self.stats.record(label, elapsed_ms, len(content))
+        return resp.json().get('response', {})
+
+    def think(self):
+        if self.args.think_time > 0:
+            time.sleep(self.rng.expovariate(1.0 / self.args.think_time))
+
+    def run(self, deadline):
+        while time.monotonic() < deadline:
+            try:
+                self.run_session()
+            except Exception as e: # Keep the virtual user alive; the failure is counted and reported
+                self.stats.fail('session', f"{type(e).__name__}: {e}")
+            self.stats.session_done()
+            self.think()
+
+    def run_session(self):
+        resp = self.call('login', 'login-button.n_clicks', 'login-status-message.children',
+                         {'login-button.n_clicks': 1, 'username-input.value': self.username, 'password-input.value': self.password})
+        session = (resp or {}).get('session-store', {}).get('data') # Login signal only; the session cookie stays in self.http
+        if not session or not session.get('logged_in'):
+            if resp is not None: self.stats.fail('login', 'login rejected')
+            return
+        base = {'session-store.data': session, 'refresh-trigger-store.data': 0, 'dashboard-load-trigger.n_intervals': 1}
+        self.think()
+
+        # Dashboard: page layout, then the callbacks fired by the dashboard load trigger
+        self.call('render_page_content', 'url.pathname', 'app-container-wrapper.children',
+                  {**base, 'url.pathname': '/dashboard', 'url.search': ''})
+        self.call('update_my_requests_table', 'dashboard-load-trigger.n_intervals', 'my-requests-table.data', base)
+        approval_rows = []
+        if self.is_manager:
+            resp = self.call('update_approval_requests_table', 'dashboard-load-trigger.n_intervals', 'approval-requests-table.data',
+                             {**base, 'approval-org-scope-switch.value': False})
+            approval_rows = (resp or {}).get('approval-requests-table', {}).get('data') or []
+            self.call('update_analytics_charts', 'dashboard-load-trigger.n_intervals', 'analytics-volume-graph.figure',
+                      {**base, 'analytics-groupby-dropdown.value': 'department', 'analytics-range-dropdown.value': 30})
+        self.think()
+
+        # New request: open the form, search the catalog, submit
+        resp = self.call('toggle_and_populate_new_request_modal', 'open-new-request-modal-button-sidebar.n_clicks', 'new-request-modal.is_open',
+                         {**base, 'open-new-request-modal-button-sidebar.n_clicks': 1, 'new-request-modal.is_open': False})
+        idempotency_key = (resp or {}).get('new-request-idempotency-store', {}).get('data')
+        term = self.rng.choice(TABLE_WORDS)[:self.rng.randint(3, 6)]
+        resp = self.call('search_new_request_tables', 'new-request-table-search-input.value', 'new-request-table-dropdown.options',
+                         {**base, 'new-request-table-search-input.value': term})
+        options = (resp or {}).get('new-request-table-dropdown', {}).get('options') or []
+        self.think()
+        if idempotency_key and options:
+            picked = self.rng.sample(options, min(len(options), self.rng.randint(1, 3)))
+            items = [{'table_id': opt['value'], 'table_full_name': opt['label'], 'role_id': self.rng.choice([1, 1, 1, 3])} for opt in picked]
+            resp = self.call('submit_new_request', 'submit-new-request-button.n_clicks', 'new-request-form-feedback.children',
+                             {**base, 'submit-new-request-button.n_clicks': 1, 'new-request-items-table.data': items,
+                              'new-request-justification-textarea.value': f"Load test: read access for the {term} reconciliation.",
+                              'new-request-duration-dropdown.value': 30, 'new-request-idempotency-store.data': idempotency_key})
+            if resp is not None and resp.get('new-request-modal', {}).get('is_open') is not False:
+                self.stats.fail('submit_new_request', 'submission not accepted')
+            self.think()
+
+        if self.is_manager:
+            self.manager_actions(base, approval_rows)
+
+        self.call('handle_logout_sidebar', 'sidebar-logout-button.n_clicks', 'session-store.data', {'sidebar-logout-button.n_clicks': 1})
+
+    def manager_actions(self, base, approval_rows):
+        pending = [i for i, row in enumerate(approval_rows) if row.get('status', 'Pending') == 'Pending']
+        if pending:
+            index = self.rng.choice(pending)
+            resp = self.call('update_approval_action_panel', 'approval-requests-table.selected_rows', 'approval-action-panel.children',
+                             {**base, 'approval-requests-table.selected_rows': [index], 'approval-requests-table.data': approval_rows})
+            request_id = (resp or {}).get('selected-approval-request-id-store', {}).get('data')
+            self.think()
+            if request_id:
+                self.call('handle_approval_decision', 'approve-request-button.n_clicks', 'refresh-trigger-store.data',
+                          {**base, 'approve-request-button.n_clicks': 1, 'selected-approval-request-id-store.data': request_id,
+                           'approver-comment-input.value': 'Approved (load test).'})
+                self.think()
+        input_id = {'type': 'request-search-input', 'scope': 'approvals'}
+        self.call('search_request_history', f"{_stringify_id(input_id)}.value",
+                  _stringify_id({'type': 'request-search-results', 'scope': 'approvals'}) + '.data',
+                  {**base, f"{_stringify_id(input_id)}.value": self.rng.choice(SEARCH_TERMS), f"{_stringify_id(input_id)}.id": input_id,
+                   'approval-org-scope-switch.value': False, 'report-org-scope-switch.value': False}, match={'scope': 'approvals'})
+        self.think()
+        if self.args.report:
+            self.call(f"generate_report_download ({self.args.report})", 'download-report-button.n_clicks', 'download-csv.data',
+                      {**base, 'download-report-button.n_clicks': 1, 'report-type-dropdown.value': self.args.report,
+                       'report-org-scope-switch.value': False})
+            self.think()
+
+
+def load_users(manager_count, requester_count, seed):
+    app = SimpleNamespace(logger=logging.getLogger('load_test'))
+    conn = get_db_connection(app)
+    if not conn:
+        raise SystemExit("Could not connect to the database to pick users.")
+    try:
+        with conn.cursor() as cur:
+            cur.execute(MANAGER_USERS_QUERY, {'seed': str(seed), 'limit': manager_count})
+            managers = [r[0] for r in cur.fetchall()]
+            cur.execute(REQUESTER_USERS_QUERY, {'seed': str(seed), 'limit': requester_count})
+            requesters = [r[0] for r in cur.fetchall()]
+    finally:
+        conn.close()
+    if len(managers) < manager_count or len(requesters) < requester_count:
+        raise SystemExit(f"Need {manager_count} managers and {requester_count} requesters; found {len(managers)} and {len(requesters)}.")
+    return managers, requesters
+
+
+def percentile(ordered, p):
+    return ordered[max(0, int(round(p * len(ordered))) - 1)]
+
+def print_report(stats, elapsed, users):
+    total = sum(len(t) for t in stats.timings_ms.values())
+    total_errors = sum(stats.errors.values())
+    print(f"\n{users} virtual users, {elapsed:.1f} s, {stats.sessions} sessions, {total} callbacks "
+          f"({total / elapsed:.1f}/s), errors: {total_errors} ({100.0 * total_errors / max(total, 1):.2f}%)\n")
+    print(f"{'callback':<46}{'count':>7}{'rate/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'mean KiB':>10}{'errors':>8}")
+    summary = {}
+    for label in sorted(stats.timings_ms):
+        ordered = sorted(stats.timings_ms[label])
+        count, errors = len(ordered), stats.errors[label]
+        row = {'count': count, 'rate_per_s': count / elapsed, 'p50_ms': statistics.median(ordered), 'p95_ms': percentile(ordered, 0.95),
+               'p99_ms': percentile(ordered, 0.99), 'mean_kib': stats.response_bytes[label] / count / 1024.0, 'errors': errors}
+        summary[label] = row
+        print(f"{label:<46}{count:>7}{row['rate_per_s']:>8.1f}{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}"
+              f"{row['mean_kib']:>10.1f}{errors:>8}")
+    for label, sample in stats.error_samples.items():
+        print(f"  {label}: first error: {sample}")
+    return {'users': users, 'elapsed_s': elapsed, 'sessions': stats.sessions, 'callbacks': total,
+            'throughput_per_s': total / elapsed, 'errors': total_errors, 'per_callback': summary}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:8050')
+    parser.add_argument('--users', type=int, default=10, help="Concurrent virtual users.")
+    parser.add_argument('--manager-share', type=float, default=0.3, help="Fraction of virtual users who are approvers.")
+    parser.add_argument('--duration', type=float, default=60.0, help="Seconds to run after ramp-up starts.")
+    parser.add_argument('--ramp-up', type=float, default=5.0, help="Seconds over which virtual users are started.")
+    parser.add_argument('--think-time', type=float, default=1.0, help="Mean seconds between a user's actions (exponential); 0 = none.")
+    parser.add_argument('--report', choices=REPORT_TYPES + [''], default='pending_requests', help="Report managers download each session ('' = none).")
+    parser.add_argument('--password', default=DEFAULT_PASSWORD)
+    parser.add_argument('--timeout', type=float, default=30.0, help="Per-request timeout in seconds.")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Write the summary as JSON to this file.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    manager_count = round(args.users * args.manager_share)
+    managers, requesters = load_users(manager_count, args.users - manager_count, args.seed)
+    client = DashCallbackClient(args.url, args.timeout)
+    stats = LoadStats()
+    started = time.monotonic()
+    deadline = started + args.duration
+    threads = []
+    for n, (username, is_manager) in enumerate([(u, True) for u in managers] + [(u, False) for u in requesters]):
+        user = VirtualUser(client, stats, username, args.password, is_manager, args, random.Random(args.seed * 100003 + n))
+        thread = threading.Thread(target=user.run, args=(deadline,), daemon=True)
+        threads.append((thread, args.ramp_up * n / max(args.users, 1)))
+    print(f"Running {args.users} virtual users ({manager_count} managers) against {args.url} for {args.duration:.0f} s ...")
+    for thread, delay in threads:
+        time.sleep(max(0.0, started + delay - time.monotonic()))
+        thread.start()
+    for thread, _ in threads:
+        thread.join()
+    summary = print_report(stats, time.monotonic() - started, args.users)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'url': args.url, 'think_time': args.think_time, 'report': args.report, **summary}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
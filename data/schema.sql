@@ -1,10 +1,27 @@
 -- 01_schema_setup.sql
 
+-- Trigram matching for the new-request table search (modules/catalog_search.py)
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
 -- Drop tables in reverse order of dependency to avoid FK constraint errors
+DROP TABLE IF EXISTS ScheduledJobRuns CASCADE;
+DROP TABLE IF EXISTS ScheduledJobs CASCADE;
+DROP TABLE IF EXISTS AccessRevocationEvents CASCADE;
+DROP TABLE IF EXISTS CatalogSyncEvents CASCADE;
+DROP TABLE IF EXISTS CatalogSchemaSummary CASCADE;
+DROP TABLE IF EXISTS UserSessions CASCADE;
+DROP TABLE IF EXISTS EmployeeActivationTokens CASCADE;
+DROP TABLE IF EXISTS RequestSubmissions CASCADE;
+DROP TABLE IF EXISTS RollupWatermarks CASCADE;
+DROP TABLE IF EXISTS DailyRequestRollup CASCADE;
+DROP TABLE IF EXISTS EmployeeHierarchy CASCADE;
 DROP TABLE IF EXISTS UserCredentials CASCADE;
 DROP TABLE IF EXISTS AccessRequests CASCADE;
+DROP TABLE IF EXISTS AutoApprovalRulesVersion CASCADE;
+DROP TABLE IF EXISTS AutoApprovalRules CASCADE;
 DROP TABLE IF EXISTS AccessRoles CASCADE;
 DROP TABLE IF EXISTS DatabaseTables CASCADE;
+DROP TABLE IF EXISTS CatalogSources CASCADE;
 DROP TABLE IF EXISTS Employees CASCADE;
 
 -- Table: Employees
@@ -25,34 +42,240 @@ COMMENT ON TABLE Employees IS 'Stores information about company employees.';
 COMMENT ON COLUMN Employees.manager_id IS 'Self-referencing FK to the employee_id of the manager.';
 COMMENT ON COLUMN Employees.is_manager IS 'Flag indicating if the employee has approval capabilities.';
 
+-- Table: EmployeeHierarchy (closure table over Employees.manager_id)
+CREATE TABLE EmployeeHierarchy (
+    ancestor_id INT NOT NULL,
+    descendant_id INT NOT NULL,
+    depth INT NOT NULL, -- 0 = self, 1 = direct report, 2 = skip-level, ...
+    PRIMARY KEY (ancestor_id, descendant_id),
+    CONSTRAINT fk_hierarchy_ancestor
+        FOREIGN KEY(ancestor_id)
+        REFERENCES Employees(employee_id)
+        ON DELETE CASCADE,
+    CONSTRAINT fk_hierarchy_descendant
+        FOREIGN KEY(descendant_id)
+        REFERENCES Employees(employee_id)
+        ON DELETE CASCADE
+);
+CREATE INDEX idx_employeehierarchy_descendant ON EmployeeHierarchy(descendant_id);
+COMMENT ON TABLE EmployeeHierarchy IS 'Every (ancestor, descendant) pair in the org tree with its distance; maintained by triggers on Employees.';
+
+-- New employees (statement level, so bulk inserts stay set-based): self rows, plus one row per ancestor
+-- found by walking up through managers inserted in the same statement until reaching an existing employee.
+CREATE OR REPLACE FUNCTION employee_hierarchy_on_insert() RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO EmployeeHierarchy (ancestor_id, descendant_id, depth)
+    WITH RECURSIVE chain AS (
+        SELECT n.employee_id AS descendant_id, n.employee_id AS ancestor_id, 0 AS depth, n.manager_id AS next_manager_id
+        FROM new_employees n
+        UNION ALL
+        SELECT c.descendant_id, n.employee_id, c.depth + 1, n.manager_id
+        FROM chain c JOIN new_employees n ON n.employee_id = c.next_manager_id
+    )
+    SELECT ancestor_id, descendant_id, depth FROM chain
+    UNION ALL
+    SELECT h.ancestor_id, c.descendant_id, c.depth + 1 + h.depth
+    FROM chain c JOIN EmployeeHierarchy h ON h.descendant_id = c.next_manager_id
+    WHERE NOT EXISTS (SELECT 1 FROM new_employees n WHERE n.employee_id = c.next_manager_id);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Re-parent: detach the moved subtree from its old ancestors, then attach it under the new manager
+CREATE OR REPLACE FUNCTION employee_hierarchy_on_reparent() RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.manager_id IS NOT NULL AND EXISTS (
+        SELECT 1 FROM EmployeeHierarchy WHERE ancestor_id = NEW.employee_id AND descendant_id = NEW.manager_id
+    ) THEN
+        RAISE EXCEPTION 'Employee % cannot report to % (would create a cycle)', NEW.employee_id, NEW.manager_id;
+    END IF;
+
+    DELETE FROM EmployeeHierarchy
+    WHERE descendant_id IN (SELECT descendant_id FROM EmployeeHierarchy WHERE ancestor_id = NEW.employee_id)
+      AND ancestor_id IN (SELECT ancestor_id FROM EmployeeHierarchy WHERE descendant_id = NEW.employee_id AND ancestor_id <> NEW.employee_id);
+
+    IF NEW.manager_id IS NOT NULL THEN
+        INSERT INTO EmployeeHierarchy (ancestor_id, descendant_id, depth)
+        SELECT sup.ancestor_id, sub.descendant_id, sup.depth + sub.depth + 1
+        FROM EmployeeHierarchy sup
+        CROSS JOIN EmployeeHierarchy sub
+        WHERE sup.descendant_id = NEW.manager_id AND sub.ancestor_id = NEW.employee_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_employee_hierarchy_insert
+    AFTER INSERT ON Employees
+    REFERENCING NEW TABLE AS new_employees
+    FOR EACH STATEMENT EXECUTE FUNCTION employee_hierarchy_on_insert();
+
+CREATE TRIGGER trg_employee_hierarchy_reparent
+    AFTER UPDATE OF manager_id ON Employees
+    FOR EACH ROW WHEN (OLD.manager_id IS DISTINCT FROM NEW.manager_id)
+    EXECUTE FUNCTION employee_hierarchy_on_reparent();
+
+-- Full rebuild from Employees.manager_id (e.g. after bulk loads with triggers disabled)
+CREATE OR REPLACE FUNCTION rebuild_employee_hierarchy() RETURNS VOID AS $$
+BEGIN
+    TRUNCATE EmployeeHierarchy;
+    INSERT INTO EmployeeHierarchy (ancestor_id, descendant_id, depth)
+    WITH RECURSIVE tree AS (
+        SELECT employee_id AS ancestor_id, employee_id AS descendant_id, 0 AS depth FROM Employees
+        UNION ALL
+        SELECT t.ancestor_id, e.employee_id, t.depth + 1
+        FROM tree t JOIN Employees e ON e.manager_id = t.descendant_id
+    )
+    SELECT ancestor_id, descendant_id, depth FROM tree;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Change events for the in-process org tree snapshot (modules/org_tree.py); payload is the employee_id,
+-- or '*' (reload everything) when one statement touches more rows than are worth sending one by one.
+-- Delivered on commit, so listeners never see uncommitted rows.
+CREATE OR REPLACE FUNCTION employees_notify_change() RETURNS TRIGGER AS $$
+BEGIN
+    IF (SELECT COUNT(*) FROM changed_employees) > 1000 THEN
+        PERFORM pg_notify('employees_changed', '*');
+    ELSE
+        PERFORM pg_notify('employees_changed', employee_id::TEXT) FROM changed_employees;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Transition tables allow only one event per trigger, hence three triggers sharing the function.
+CREATE TRIGGER trg_employees_notify_insert
+    AFTER INSERT ON Employees REFERENCING NEW TABLE AS changed_employees
+    FOR EACH STATEMENT EXECUTE FUNCTION employees_notify_change();
+CREATE TRIGGER trg_employees_notify_update
+    AFTER UPDATE ON Employees REFERENCING NEW TABLE AS changed_employees
+    FOR EACH STATEMENT EXECUTE FUNCTION employees_notify_change();
+CREATE TRIGGER trg_employees_notify_delete
+    AFTER DELETE ON Employees REFERENCING OLD TABLE AS changed_employees
+    FOR EACH STATEMENT EXECUTE FUNCTION employees_notify_change();
+
 -- Table: UserCredentials
 CREATE TABLE UserCredentials (
     credential_id SERIAL PRIMARY KEY,
     employee_id INT UNIQUE NOT NULL, -- Ensures one credential set per employee
     username VARCHAR(100) UNIQUE NOT NULL, -- Typically the email
-    password_text VARCHAR(255) NOT NULL, -- Storing password in plain text (NOT FOR PRODUCTION)
+    password_hash VARCHAR(255) NULL, -- scrypt$N$r$p$salt$hash, see modules/passwords.py
+    password_text VARCHAR(255) NULL, -- Legacy plain-text password; replaced by password_hash on the user's next login
+    CONSTRAINT chk_credentials_password CHECK (password_hash IS NOT NULL OR password_text IS NOT NULL),
     CONSTRAINT fk_employee_credentials
         FOREIGN KEY(employee_id)
         REFERENCES Employees(employee_id)
         ON DELETE CASCADE -- If an employee is deleted, their credentials are also deleted
 );
-COMMENT ON TABLE UserCredentials IS 'Stores login credentials for employees. Password stored in plain text for MVP purposes ONLY.';
+COMMENT ON TABLE UserCredentials IS 'Stores login credentials for employees. Passwords are stored as scrypt hashes.';
 COMMENT ON COLUMN UserCredentials.username IS 'Username for login, typically the employee''s email.';
-COMMENT ON COLUMN UserCredentials.password_text IS 'Plain text password (DEVELOPMENT/MVP ONLY).';
+COMMENT ON COLUMN UserCredentials.password_hash IS 'scrypt hash with its work factor and salt; rehashed on login when the work factor changes.';
+COMMENT ON COLUMN UserCredentials.password_text IS 'Legacy plain-text password (e.g. data/synthetic_data.sql); cleared when the user next logs in.';
 
+-- Table: EmployeeActivationTokens (imported employees have no credentials; signing up for one requires its token, see modules/employee_import.py)
+CREATE TABLE EmployeeActivationTokens (
+    employee_id INT PRIMARY KEY, -- One outstanding token per employee; reissuing replaces it
+    token_hash CHAR(64) UNIQUE NOT NULL, -- sha256 of the token; the token itself is only in the activation link
+    issued_by INT NULL, -- Importing manager
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    expires_at TIMESTAMP NOT NULL,
+    CONSTRAINT fk_activation_employee
+        FOREIGN KEY(employee_id)
+        REFERENCES Employees(employee_id)
+        ON DELETE CASCADE,
+    CONSTRAINT fk_activation_issued_by
+        FOREIGN KEY(issued_by)
+        REFERENCES Employees(employee_id)
+        ON DELETE SET NULL
+);
+COMMENT ON TABLE EmployeeActivationTokens IS 'Single-use proof that whoever signs up for an imported employee received that employee''s activation link; deleted on use.';
+
+
+-- Table: CatalogSources (target databases synced into DatabaseTables; see CATALOG_SOURCES in modules/db.py)
+CREATE TABLE CatalogSources (
+    source_id SERIAL PRIMARY KEY,
+    source_name VARCHAR(100) UNIQUE NOT NULL, -- Matches the "name" key in CATALOG_SOURCES
+    server_name VARCHAR(255) NOT NULL,
+    database_name VARCHAR(63) NOT NULL,
+    catalog_fingerprint TEXT, -- md5 over the source's table list; unchanged fingerprint = nothing to merge
+    table_count INT NOT NULL DEFAULT 0,
+    last_checked_at TIMESTAMP,
+    last_changed_at TIMESTAMP
+);
+COMMENT ON TABLE CatalogSources IS 'Target databases whose catalogs are synced into DatabaseTables.';
 
 -- Table: DatabaseTables
 CREATE TABLE DatabaseTables (
     table_id SERIAL PRIMARY KEY,
+    source_id INT NULL, -- NULL for tables entered by hand
     schema_name VARCHAR(63) NOT NULL DEFAULT 'public', -- PostgreSQL default schema name max length
     table_name VARCHAR(63) NOT NULL,
     description TEXT,
-    UNIQUE (schema_name, table_name) -- Ensure table uniqueness within a schema
+    is_active BOOLEAN NOT NULL DEFAULT TRUE, -- FALSE once the table disappears from its source (rows are kept for history)
+    first_seen_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    removed_at TIMESTAMP NULL,
+    CONSTRAINT fk_catalog_source
+        FOREIGN KEY(source_id)
+        REFERENCES CatalogSources(source_id)
+        ON DELETE SET NULL
 );
+-- Ensure table uniqueness within a schema, per source (hand-entered tables share one namespace)
+CREATE UNIQUE INDEX ux_databasetables_source_table ON DatabaseTables (source_id, schema_name, table_name) WHERE source_id IS NOT NULL;
+CREATE UNIQUE INDEX ux_databasetables_manual_table ON DatabaseTables (schema_name, table_name) WHERE source_id IS NULL;
+-- Typeahead search: ILIKE prefix and word-similarity (<%) lookups on the displayed name
+CREATE INDEX idx_databasetables_full_name_trgm ON DatabaseTables USING GIN ((schema_name || '.' || table_name) gin_trgm_ops) WHERE is_active;
 COMMENT ON TABLE DatabaseTables IS 'Represents specific database tables to which access can be requested.';
 COMMENT ON COLUMN DatabaseTables.schema_name IS 'Name of the database schema (e.g., ''public'').';
 COMMENT ON COLUMN DatabaseTables.table_name IS 'Name of the database table.';
 
+-- Table: CatalogSchemaSummary (active table count per source and schema, for the catalog browser)
+CREATE TABLE CatalogSchemaSummary (
+    source_id INT NULL REFERENCES CatalogSources(source_id) ON DELETE CASCADE, -- NULL = hand-entered tables
+    schema_name VARCHAR(63) NOT NULL,
+    table_count INT NOT NULL,
+    refreshed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE UNIQUE INDEX ux_catalogschemasummary_source_schema ON CatalogSchemaSummary ((COALESCE(source_id, 0)), schema_name);
+COMMENT ON TABLE CatalogSchemaSummary IS 'Precomputed per-schema table counts; maintained by statement triggers on DatabaseTables.';
+
+-- Recount only the (source, schema) pairs touched by the statement; one pass over DatabaseTables
+-- however many rows a catalog sync merged.
+CREATE OR REPLACE FUNCTION catalog_schema_summary_refresh() RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO CatalogSchemaSummary (source_id, schema_name, table_count)
+    SELECT t.source_id, t.schema_name, COUNT(dt.table_id) FILTER (WHERE dt.is_active)
+    FROM (SELECT DISTINCT source_id, schema_name FROM changed_tables) t
+    LEFT JOIN DatabaseTables dt ON COALESCE(dt.source_id, 0) = COALESCE(t.source_id, 0) AND dt.schema_name = t.schema_name
+    GROUP BY t.source_id, t.schema_name
+    ON CONFLICT ((COALESCE(source_id, 0)), schema_name)
+    DO UPDATE SET table_count = EXCLUDED.table_count, refreshed_at = CURRENT_TIMESTAMP;
+    DELETE FROM CatalogSchemaSummary WHERE table_count = 0;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_catalog_summary_insert
+    AFTER INSERT ON DatabaseTables REFERENCING NEW TABLE AS changed_tables
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_schema_summary_refresh();
+CREATE TRIGGER trg_catalog_summary_update
+    AFTER UPDATE ON DatabaseTables REFERENCING NEW TABLE AS changed_tables
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_schema_summary_refresh();
+CREATE TRIGGER trg_catalog_summary_delete
+    AFTER DELETE ON DatabaseTables REFERENCING OLD TABLE AS changed_tables
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_schema_summary_refresh();
+
+-- Table: CatalogSyncEvents (tables added, removed or reappearing, per sync run)
+CREATE TABLE CatalogSyncEvents (
+    event_id BIGSERIAL PRIMARY KEY,
+    source_id INT NOT NULL REFERENCES CatalogSources(source_id) ON DELETE CASCADE,
+    table_id INT NOT NULL REFERENCES DatabaseTables(table_id) ON DELETE CASCADE,
+    event_type VARCHAR(20) NOT NULL CHECK (event_type IN ('added', 'removed', 'reactivated')),
+    event_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX idx_catalogsyncevents_source_event_at ON CatalogSyncEvents (source_id, event_at);
+COMMENT ON TABLE CatalogSyncEvents IS 'Audit trail of catalog changes detected by the sync job.';
+
 -- Table: AccessRoles
 CREATE TABLE AccessRoles (
     role_id SERIAL PRIMARY KEY,
@@ -62,6 +285,43 @@ CREATE TABLE AccessRoles (
 COMMENT ON TABLE AccessRoles IS 'Defines the types of access levels that can be requested (e.g., Read, Write).';
 COMMENT ON COLUMN AccessRoles.role_name IS 'Name of the access role (e.g., ''Read'', ''Write'', ''Read-Write'').';
 
+-- Table: AutoApprovalRules
+CREATE TABLE AutoApprovalRules (
+    rule_id SERIAL PRIMARY KEY,
+    priority INT NOT NULL DEFAULT 100, -- Lower value wins when several rules match
+    description TEXT,
+    department VARCHAR(50) NULL, -- NULL matches any requester department
+    schema_pattern VARCHAR(63) NOT NULL DEFAULT '*', -- Glob pattern, e.g. 'public' or 'report_*'
+    table_pattern VARCHAR(63) NOT NULL DEFAULT '*', -- Glob pattern, e.g. '*' or 'dim_*'
+    role_id INT NULL, -- NULL matches any requested role
+    requester_is_manager BOOLEAN NULL, -- NULL matches both managers and non-managers
+    enabled BOOLEAN NOT NULL DEFAULT TRUE,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT fk_rule_role
+        FOREIGN KEY(role_id)
+        REFERENCES AccessRoles(role_id)
+        ON DELETE CASCADE
+);
+COMMENT ON TABLE AutoApprovalRules IS 'Declarative rules; a matching request is approved at submit time without entering the approval queue.';
+
+-- Table: AutoApprovalRulesVersion (single row, bumped on any rule change so app workers can hot-reload)
+CREATE TABLE AutoApprovalRulesVersion (
+    singleton BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (singleton),
+    version BIGINT NOT NULL DEFAULT 1
+);
+INSERT INTO AutoApprovalRulesVersion (singleton, version) VALUES (TRUE, 1);
+
+CREATE OR REPLACE FUNCTION bump_auto_approval_rules_version() RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE AutoApprovalRulesVersion SET version = version + 1;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_auto_approval_rules_changed
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON AutoApprovalRules
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_auto_approval_rules_version();
+
 -- Table: AccessRequests
 CREATE TABLE AccessRequests (
     request_id SERIAL PRIMARY KEY,
@@ -70,10 +330,19 @@ CREATE TABLE AccessRequests (
     requested_role_id INT NOT NULL,
     justification TEXT NOT NULL,
     request_date TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
-    status VARCHAR(10) NOT NULL DEFAULT 'Pending' CHECK (status IN ('Pending', 'Approved', 'Rejected')),
+    status VARCHAR(10) NOT NULL DEFAULT 'Pending' CHECK (status IN ('Pending', 'Approved', 'Rejected', 'Revoked')),
     approver_id INT NULL, -- Filled when approved/rejected
     decision_date TIMESTAMP NULL, -- When the decision was made
     approver_comments TEXT NULL, -- Comments from the approver
+    auto_approval_rule_id INT NULL, -- Set when approved by an AutoApprovalRules rule instead of a person
+    access_duration_days INT NULL CHECK (access_duration_days > 0), -- Requested grant length; NULL = no expiry
+    access_expires_at TIMESTAMP NULL, -- decision_date + access_duration_days, set on approval
+    revoked_at TIMESTAMP NULL, -- When the expiry sweeper revoked the grant
+    -- Full-text search document: justification ranks above approver comments
+    search_document TSVECTOR GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', justification), 'A') ||
+        setweight(to_tsvector('english', COALESCE(approver_comments, '')), 'B')
+    ) STORED,
 
     CONSTRAINT fk_requester
         FOREIGN KEY(requester_id)
@@ -93,21 +362,144 @@ CREATE TABLE AccessRequests (
     CONSTRAINT fk_approver
         FOREIGN KEY(approver_id)
         REFERENCES Employees(employee_id)
-        ON DELETE SET NULL -- If an approver leaves, keep the record but nullify the approver link
+        ON DELETE SET NULL, -- If an approver leaves, keep the record but nullify the approver link
+
+    CONSTRAINT fk_auto_approval_rule
+        FOREIGN KEY(auto_approval_rule_id)
+        REFERENCES AutoApprovalRules(rule_id)
+        ON DELETE SET NULL
 );
 COMMENT ON TABLE AccessRequests IS 'Captures details of each database access request, its status, and approval information.';
 COMMENT ON COLUMN AccessRequests.requester_id IS 'FK to Employees: The employee who made the request.';
 COMMENT ON COLUMN AccessRequests.table_id IS 'FK to DatabaseTables: The table access is requested for.';
 COMMENT ON COLUMN AccessRequests.requested_role_id IS 'FK to AccessRoles: The type of access requested.';
-COMMENT ON COLUMN AccessRequests.status IS 'Current status of the request (Pending, Approved, Rejected).';
+COMMENT ON COLUMN AccessRequests.status IS 'Current status of the request (Pending, Approved, Rejected, Revoked). Revoked = approved grant that has expired.';
 COMMENT ON COLUMN AccessRequests.approver_id IS 'FK to Employees: The manager who approved/rejected the request.';
+COMMENT ON COLUMN AccessRequests.auto_approval_rule_id IS 'FK to AutoApprovalRules: machine approver marker for auto-approved requests (approver_id is NULL).';
+COMMENT ON COLUMN AccessRequests.access_expires_at IS 'End of a time-bound grant; modules/access_expiry.py revokes Approved rows once it passes.';
+COMMENT ON COLUMN AccessRequests.search_document IS 'Generated tsvector over justification (weight A) and approver_comments (weight B) for audit search.';
 
 -- Indexing for performance on frequently queried columns
 CREATE INDEX idx_accessrequests_requester_id ON AccessRequests(requester_id);
 CREATE INDEX idx_accessrequests_approver_id ON AccessRequests(approver_id);
 CREATE INDEX idx_accessrequests_status ON AccessRequests(status);
 CREATE INDEX idx_employees_email ON Employees(email);
+-- Direct-report lookups (approval queue, signup invitations); also backs the ON DELETE SET NULL on manager_id
+CREATE INDEX idx_employees_manager_id ON Employees(manager_id);
 CREATE INDEX idx_usercredentials_username ON UserCredentials(username);
+-- Used by the incremental rollup refresh to find requests created or decided since the watermark
+CREATE INDEX idx_accessrequests_request_date ON AccessRequests(request_date);
+CREATE INDEX idx_accessrequests_decision_date ON AccessRequests(decision_date);
+-- Full-text search over justifications and approver comments (ticket numbers, keywords)
+CREATE INDEX idx_accessrequests_search_document ON AccessRequests USING GIN (search_document);
+
+-- A requester can have only one Pending request per (table, role); duplicates are returned instead of inserted
+CREATE UNIQUE INDEX ux_accessrequests_one_pending_per_table_role ON AccessRequests(requester_id, table_id, requested_role_id) WHERE status = 'Pending';
+
+-- Expiry sweeper: only live time-bound grants are indexed, so finding due grants never scans the table
+CREATE INDEX idx_accessrequests_access_expires_at ON AccessRequests(access_expires_at) WHERE status = 'Approved' AND access_expires_at IS NOT NULL;
+
+-- Table: AccessRevocationEvents (one row per grant revoked by the expiry sweeper; also sent as NOTIFY access_revoked)
+CREATE TABLE AccessRevocationEvents (
+    event_id BIGSERIAL PRIMARY KEY,
+    request_id INT NOT NULL,
+    requester_id INT NOT NULL,
+    table_id INT NOT NULL,
+    requested_role_id INT NOT NULL,
+    access_expires_at TIMESTAMP NOT NULL,
+    revoked_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    reason VARCHAR(20) NOT NULL DEFAULT 'expired',
+    CONSTRAINT fk_revocation_request
+        FOREIGN KEY(request_id)
+        REFERENCES AccessRequests(request_id)
+        ON DELETE CASCADE
+);
+CREATE INDEX idx_accessrevocationevents_revoked_at ON AccessRevocationEvents (revoked_at);
+COMMENT ON TABLE AccessRevocationEvents IS 'Audit trail of expired grants revoked by the expiry sweeper, for downstream permission removal.';
+
+-- Table: RequestSubmissions
+CREATE TABLE RequestSubmissions (
+    idempotency_key UUID PRIMARY KEY, -- Generated each time the new-request modal is opened
+    requester_id INT NOT NULL,
+    request_ids INT[] NOT NULL DEFAULT '{}', -- Requests created or matched by this submission
+    submitted_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT fk_submission_requester
+        FOREIGN KEY(requester_id)
+        REFERENCES Employees(employee_id)
+        ON DELETE CASCADE
+);
+COMMENT ON TABLE RequestSubmissions IS 'Idempotency keys for new-request submissions, so retries and double-clicks return the original requests.';
+
+-- Table: UserSessions (server-side login sessions; the browser only holds a signed session ID cookie, see modules/sessions.py)
+CREATE TABLE UserSessions (
+    session_key CHAR(64) PRIMARY KEY, -- sha256 of the session ID, so reading this table does not yield usable sessions
+    employee_id INT NOT NULL,
+    session_data JSONB NOT NULL, -- Snapshot taken at login: name, email, is_manager
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    expires_at TIMESTAMP NOT NULL,
+    CONSTRAINT fk_session_employee
+        FOREIGN KEY(employee_id)
+        REFERENCES Employees(employee_id)
+        ON DELETE CASCADE
+);
+CREATE INDEX idx_usersessions_employee_id ON UserSessions(employee_id); -- Log an employee out everywhere
+CREATE INDEX idx_usersessions_expires_at ON UserSessions(expires_at); -- Expired session cleanup
+COMMENT ON TABLE UserSessions IS 'Login sessions looked up by the signed session cookie; deleting a row revokes the session.';
+
+-- Table: ScheduledJobs (one row per job of modules/scheduler.py; last_scheduled_for makes each cron slot run once across workers)
+CREATE TABLE ScheduledJobs (
+    job_name VARCHAR(100) PRIMARY KEY,
+    last_scheduled_for TIMESTAMP NULL, -- Most recent slot claimed by any worker
+    last_started_at TIMESTAMP NULL,
+    last_finished_at TIMESTAMP NULL,
+    last_status VARCHAR(10) NULL,
+    last_duration_ms DOUBLE PRECISION NULL,
+    run_count INT NOT NULL DEFAULT 0,
+    failure_count INT NOT NULL DEFAULT 0,
+    total_duration_ms DOUBLE PRECISION NOT NULL DEFAULT 0,
+    max_duration_ms DOUBLE PRECISION NOT NULL DEFAULT 0
+);
+COMMENT ON TABLE ScheduledJobs IS 'Slot claims and cumulative timing for in-app scheduled maintenance jobs.';
+
+-- Table: ScheduledJobRuns (run history; trimmed by the maintenance_cleanup job)
+CREATE TABLE ScheduledJobRuns (
+    run_id BIGSERIAL PRIMARY KEY,
+    job_name VARCHAR(100) NOT NULL REFERENCES ScheduledJobs(job_name) ON DELETE CASCADE,
+    scheduled_for TIMESTAMP NOT NULL,
+    worker VARCHAR(100) NOT NULL, -- hostname:pid of the process that ran the slot
+    started_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    finished_at TIMESTAMP NULL,
+    status VARCHAR(10) NOT NULL DEFAULT 'running' CHECK (status IN ('running', 'succeeded', 'failed')),
+    duration_ms DOUBLE PRECISION NULL,
+    result TEXT NULL -- Job return value or error, truncated
+);
+CREATE INDEX idx_scheduledjobruns_job_started ON ScheduledJobRuns (job_name, started_at);
+CREATE INDEX idx_scheduledjobruns_started_at ON ScheduledJobRuns (started_at);
+
+-- Table: DailyRequestRollup
+CREATE TABLE DailyRequestRollup (
+    bucket_date DATE NOT NULL, -- Day the requests were submitted
+    department VARCHAR(50) NOT NULL, -- Requester department ('Unassigned' when NULL)
+    table_id INT NOT NULL,
+    requested_role_id INT NOT NULL,
+    requests_submitted INT NOT NULL DEFAULT 0,
+    requests_approved INT NOT NULL DEFAULT 0,
+    requests_rejected INT NOT NULL DEFAULT 0,
+    requests_pending INT NOT NULL DEFAULT 0,
+    decision_seconds_total DOUBLE PRECISION NOT NULL DEFAULT 0, -- Sum of time-to-decision over decided requests
+    decision_seconds_max DOUBLE PRECISION NULL,
+    PRIMARY KEY (bucket_date, department, table_id, requested_role_id)
+);
+COMMENT ON TABLE DailyRequestRollup IS 'Pre-aggregated daily request volume and decision latency, bucketed by day, department, table and role.';
+COMMENT ON COLUMN DailyRequestRollup.decision_seconds_total IS 'Divide by (requests_approved + requests_rejected) for the mean time-to-decision.';
+
+-- Table: RollupWatermarks
+CREATE TABLE RollupWatermarks (
+    rollup_name VARCHAR(50) PRIMARY KEY,
+    watermark TIMESTAMP NOT NULL, -- Latest request_date/decision_date folded into the rollup
+    refreshed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+COMMENT ON TABLE RollupWatermarks IS 'Tracks how far each incremental rollup has been refreshed.';
 
 -- Initial roles
 INSERT INTO AccessRoles (role_name, description) VALUES
@@ -16,7 +16,12 @@ INSERT INTO DatabaseTables (schema_name, table_name, description) VALUES
 ('finance_data', 'gl_entries', 'General ledger entries for accounting.'),
 ('marketing_data', 'campaign_results', 'Results from marketing campaigns.'),
 ('internal', 'employee_performance', 'HR data on employee performance reviews (Highly Sensitive).')
-ON CONFLICT (schema_name, table_name) DO NOTHING;
+ON CONFLICT (schema_name, table_name) WHERE source_id IS NULL DO NOTHING;
+
+
+-- Auto-approval rules (Read on any public.* table is approved at submit time)
+INSERT INTO AutoApprovalRules (priority, description, department, schema_pattern, table_pattern, role_id, requester_is_manager) VALUES
+(100, 'Read access to non-sensitive public tables', NULL, 'public', '*', 1, NULL);
 
 
 -- Populate Employees (Managers first, then Requestors)
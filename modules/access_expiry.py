@@ -0,0 +1,97 @@
+# modules/access_expiry.py
+import argparse
+import logging
+import time
+from types import SimpleNamespace
+
+import psycopg2
+
+from .db import get_db_connection
+
+ACCESS_EXPIRY_BATCH_SIZE = 500 # Grants revoked per transaction; keeps row locks short-lived
+ACCESS_REVOKED_CHANNEL = 'access_revoked' # NOTIFY payload: comma-separated request_ids of one batch
+ACCESS_REVOKED_PAYLOAD_MAX_BYTES = 7900 # PostgreSQL rejects NOTIFY payloads of 8000 bytes or more; larger batches are split
+ACCESS_DURATION_OPTIONS = [7, 30, 90, 180, 365] # Days offered on the new-request form
+
+# Due grants come off idx_accessrequests_access_expires_at (partial: Approved rows with an expiry),
+# oldest first. SKIP LOCKED lets concurrent sweepers, and approvers touching the same rows, proceed
+# without waiting on each other.
+REVOKE_EXPIRED_BATCH = """
+    WITH due AS (
+        SELECT request_id FROM AccessRequests
+        WHERE status = 'Approved' AND access_expires_at IS NOT NULL AND access_expires_at <= CURRENT_TIMESTAMP
+        ORDER BY access_expires_at
+        LIMIT %(batch_size)s
+        FOR UPDATE SKIP LOCKED
+    ),
+    revoked AS (
+        UPDATE AccessRequests ar SET status = 'Revoked', revoked_at = CURRENT_TIMESTAMP
+        FROM due WHERE ar.request_id = due.request_id
+        RETURNING ar.request_id, ar.requester_id, ar.table_id, ar.requested_role_id, ar.access_expires_at
+    )
+    INSERT INTO AccessRevocationEvents (request_id, requester_id, table_id, requested_role_id, access_expires_at, reason)
+    SELECT request_id, requester_id, table_id, requested_role_id, access_expires_at, 'expired' FROM revoked
+    RETURNING request_id;
+"""
+ACCESS_REVOKED_NOTIFY = "SELECT pg_notify(%s, payload) FROM unnest(%s::TEXT[]) AS payload;"
+
+
+def format_access_duration(days):
+    return f"{days} days" if days else "No expiry"
+
+def _notify_payloads(request_ids):
+    """Splits request_ids into comma-separated payloads of at most ACCESS_REVOKED_PAYLOAD_MAX_BYTES."""
+    payloads, current = [], ''
+    for request_id in request_ids:
+        part = str(request_id)
+        if current and len(current) + 1 + len(part) > ACCESS_REVOKED_PAYLOAD_MAX_BYTES:
+            payloads.append(current)
+            current = ''
+        current = f"{current},{part}" if current else part
+    if current: payloads.append(current)
+    return payloads
+
+def sweep_expired_grants(app, batch_size=ACCESS_EXPIRY_BATCH_SIZE, max_batches=None):
+    """
+    Revokes Approved grants whose access_expires_at has passed, batch_size rows per committed
+    transaction, until no due grants remain (or max_batches is reached). Each batch records
+    AccessRevocationEvents and NOTIFYs its request_ids on ACCESS_REVOKED_CHANNEL (several payloads
+    if they would not fit in one).
+    Returns the number of grants revoked, or None if the first batch fails.
+    """
+    conn = get_db_connection(app)
+    if not conn: return None
+    started, revoked_total, batches = time.perf_counter(), 0, 0
+    try:
+        with conn.cursor() as cur:
+            while max_batches is None or batches < max_batches:
+                cur.execute(REVOKE_EXPIRED_BATCH, {'batch_size': batch_size})
+                request_ids = [r[0] for r in cur.fetchall()]
+                if request_ids:
+                    cur.execute(ACCESS_REVOKED_NOTIFY, (ACCESS_REVOKED_CHANNEL, _notify_payloads(request_ids)))
+                conn.commit()
+                batches += 1
+                revoked_total += len(request_ids)
+                if len(request_ids) < batch_size: break
+        if revoked_total:
+            app.logger.info(f"sweep_expired_grants: Revoked {revoked_total} expired grant(s) in {batches} batch(es), {(time.perf_counter() - started) * 1000.0:.1f} ms.")
+        return revoked_total
+    except psycopg2.Error as e:
+        conn.rollback()
+        app.logger.error(f"sweep_expired_grants: Database error after revoking {revoked_total} grant(s): {e}")
+        return revoked_total if batches else None
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Revoke access grants whose expiry has passed.")
+    parser.add_argument('--batch-size', type=int, default=ACCESS_EXPIRY_BATCH_SIZE)
+    parser.add_argument('--interval', type=float, default=0, help="Keep sweeping every INTERVAL seconds instead of running once.")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    sweeper_app = SimpleNamespace(logger=logging.getLogger('access_expiry'))
+    while True:
+        print(f"Revoked: {sweep_expired_grants(sweeper_app, batch_size=args.batch_size)}")
+        if args.interval <= 0: break
+        time.sleep(args.interval)
@@ -0,0 +1,105 @@
+# modules/auto_approval.py
+import fnmatch
+import re
+import threading
+import time
+from collections import namedtuple
+
+# How often (seconds) submit_new_request re-checks AutoApprovalRulesVersion for rule changes.
+RULES_VERSION_CHECK_INTERVAL = 5.0
+# Text stored in approver_comments for auto-approved requests (approver_id stays NULL).
+AUTO_APPROVAL_COMMENT = "Auto-approved by rule #{rule_id}: {description}"
+
+CompiledRule = namedtuple('CompiledRule', [
+    'priority', 'rule_id', 'description', 'department', 'schema_pattern', 'schema_regex',
+    'table_regex', 'role_id', 'requester_is_manager'
+])
+
+_GLOB_CHARS = re.compile(r'[*?\[]')
+_rule_cache = {'version': None, 'index': None, 'checked_at': 0.0}
+_rule_cache_lock = threading.Lock()
+
+
+# --- Rule Compilation ---
+def _compile_glob(pattern):
+    return re.compile(fnmatch.translate(pattern or '*'))
+
+def compile_rules(rule_rows):
+    """
+    Compiles enabled rule rows (dicts shaped like AutoApprovalRules) into an index:
+    {role_id|None: {department|None: {schema_name|'*': [CompiledRule, ...]}}}.
+    A literal schema pattern gets its own bucket so evaluation only looks at rules that
+    can possibly match; each bucket is sorted by (priority, rule_id).
+    """
+    index = {}
+    for row in rule_rows:
+        if not row.get('enabled', True):
+            continue
+        schema_pattern = row.get('schema_pattern') or '*'
+        rule = CompiledRule(
+            priority=row.get('priority', 100), rule_id=row['rule_id'], description=row.get('description') or '',
+            department=row.get('department'), schema_pattern=schema_pattern,
+            schema_regex=_compile_glob(schema_pattern), table_regex=_compile_glob(row.get('table_pattern')),
+            role_id=row.get('role_id'), requester_is_manager=row.get('requester_is_manager'),
+        )
+        schema_key = '*' if _GLOB_CHARS.search(schema_pattern) else schema_pattern
+        index.setdefault(rule.role_id, {}).setdefault(rule.department, {}).setdefault(schema_key, []).append(rule)
+    for by_department in index.values():
+        for by_schema in by_department.values():
+            for bucket in by_schema.values():
+                bucket.sort()
+    return index
+
+def match_rule(index, department, requester_is_manager, schema_name, table_name, role_id):
+    """Returns the highest-priority CompiledRule matching the request, or None."""
+    best = None
+    for role_key in (role_id, None):
+        by_department = index.get(role_key)
+        if not by_department: continue
+        for department_key in (department, None):
+            by_schema = by_department.get(department_key)
+            if not by_schema: continue
+            for schema_key in (schema_name, '*'):
+                for rule in by_schema.get(schema_key, ()):
+                    if best is not None and (rule.priority, rule.rule_id) >= (best.priority, best.rule_id):
+                        break # Buckets are sorted; nothing further here can beat the current best
+                    if rule.requester_is_manager is not None and rule.requester_is_manager != requester_is_manager:
+                        continue
+                    if schema_key == '*' and not rule.schema_regex.match(schema_name):
+                        continue
+                    if not rule.table_regex.match(table_name):
+                        continue
+                    best = rule
+                    break
+    return best
+
+
+# --- Hot Reload ---
+def load_rule_rows(cur):
+    cur.execute("""
+        SELECT rule_id, priority, description, department, schema_pattern, table_pattern,
+               role_id, requester_is_manager, enabled
+        FROM AutoApprovalRules WHERE enabled = TRUE;
+    """)
+    return [dict(zip([d[0] for d in cur.description], r)) for r in cur.fetchall()]
+
+def get_rule_index(app, cur, force_check=False):
+    """
+    Returns the compiled rule index, recompiling it when AutoApprovalRulesVersion has moved.
+    The version is looked up with the caller's cursor at most every RULES_VERSION_CHECK_INTERVAL seconds.
+    """
+    now = time.monotonic()
+    if not force_check and _rule_cache['index'] is not None and now - _rule_cache['checked_at'] < RULES_VERSION_CHECK_INTERVAL:
+        return _rule_cache['index']
+    cur.execute("SELECT version FROM AutoApprovalRulesVersion;")
+    row = cur.fetchone()
+    version = row[0] if row else 0
+    with _rule_cache_lock:
+        if _rule_cache['index'] is None or version != _rule_cache['version']:
+            rule_rows = load_rule_rows(cur)
+            started = time.perf_counter()
+            _rule_cache['index'] = compile_rules(rule_rows)
+            _rule_cache['version'] = version
+            app.logger.info(f"Auto-approval rules reloaded: {len(rule_rows)} rule(s), version {version}, compiled in {(time.perf_counter() - started) * 1000.0:.1f} ms.")
+        _rule_cache['checked_at'] = now
+        return _rule_cache['index']
@@ -1,39 +1,318 @@
 # modules/callbacks.py
 import dash
 import dash_bootstrap_components as dbc
-from dash import html, dcc, Input, Output, State, ctx, dash_table, ALL, no_update
+from dash import html, dcc, Input, Output, State, ctx, dash_table, ALL, MATCH, no_update
 import psycopg2
 import psycopg2.extras # For dictionary cursor
 from datetime import datetime # For formatting dates
-import pandas as pd # For CSV generation
+import plotly.graph_objects as go # For analytics charts
 import urllib.parse # For parsing query strings
 import re # For email validation
+import math # For the login retry wait
+import uuid # For submission idempotency tokens
 
 # Import helpers from other modules
 from .db import get_db_connection
-from .layouts import login_layout, create_sidebar, create_main_content_area, create_signup_layout
-
+from .passwords import hash_password, verify_password, PasswordHashingBusy
+from .sessions import get_current_session, create_session, set_session_cookie, end_current_session
+from .rate_limit import check_login_attempt
+from .layouts import login_layout, create_sidebar, create_main_content_area, create_signup_layout, create_catalog_children
+from .rollups import fetch_daily_trends
+from .auto_approval import get_rule_index, match_rule, AUTO_APPROVAL_COMMENT
+from .org_tree import get_org_tree
+from .catalog_search import search_tables
+from .catalog_browser import fetch_catalog_children, CATALOG_ROOT_NODE
+from .request_search import search_requests
+from .access_expiry import format_access_duration
+from .employee_import import (decode_upload, validate_employee_frame, import_employees, activation_token_hash, activation_path,
+                              IMPORT_MAX_ERRORS_SHOWN, ACTIVATION_TOKEN_TTL_DAYS)
+
+
+# Joined into report queries when "Include my whole org" is on; one indexed lookup on the closure table.
+ORG_SCOPE_REPORT_JOIN = "JOIN EmployeeHierarchy scope_h ON scope_h.descendant_id = ar.requester_id AND scope_h.ancestor_id = %(scope_manager_id)s AND scope_h.depth >= 1"
+
+# --- SQL ---
+# Every statement the callbacks run lives here, so benchmarks/check_query_plans.py can EXPLAIN it.
+
+# Login, dashboard tables and the approval panel
+LOGIN_QUERY = "SELECT uc.employee_id, e.first_name, e.last_name, uc.password_hash, uc.password_text, e.is_manager, e.email FROM UserCredentials uc JOIN Employees e ON uc.employee_id = e.employee_id WHERE uc.username = %s;"
+# Replaces a legacy plain-text password, or a hash made with an old work factor, after a successful login
+PASSWORD_UPGRADE_UPDATE = "UPDATE UserCredentials SET password_hash = %s, password_text = NULL WHERE employee_id = %s;"
+MY_REQUESTS_QUERY = """
+    SELECT ar.request_id, ar.requester_id, dt.schema_name || '.' || dt.table_name AS table_full_name,
+           aro.role_name AS requested_role, ar.justification, ar.request_date, ar.status,
+           ar.decision_date, ar.approver_comments, ar.approver_id, ar.auto_approval_rule_id,
+           ar.access_duration_days, ar.access_expires_at
+    FROM AccessRequests ar
+    JOIN DatabaseTables dt ON ar.table_id = dt.table_id
+    JOIN AccessRoles aro ON ar.requested_role_id = aro.role_id
+    WHERE ar.requester_id = %s ORDER BY ar.request_date DESC;
+"""
+ORG_APPROVAL_QUEUE_QUERY = """
+    SELECT ar.request_id, req_emp.first_name || ' ' || req_emp.last_name AS requester_name,
+           req_emp.email AS requester_email, dt.schema_name || '.' || dt.table_name AS table_full_name,
+           aro.role_name AS requested_role, ar.justification, ar.request_date, ar.status,
+           ar.access_duration_days, h.depth AS org_depth
+    FROM EmployeeHierarchy h
+    JOIN AccessRequests ar ON ar.requester_id = h.descendant_id
+    JOIN Employees req_emp ON ar.requester_id = req_emp.employee_id
+    JOIN DatabaseTables dt ON ar.table_id = dt.table_id
+    JOIN AccessRoles aro ON ar.requested_role_id = aro.role_id
+    WHERE h.ancestor_id = %s AND h.depth >= 1
+    ORDER BY CASE ar.status WHEN 'Pending' THEN 0 ELSE 1 END, ar.request_date DESC;
+"""
+APPROVAL_QUEUE_QUERY = """
+    SELECT ar.request_id, req_emp.first_name || ' ' || req_emp.last_name AS requester_name,
+           req_emp.email AS requester_email, dt.schema_name || '.' || dt.table_name AS table_full_name,
+           aro.role_name AS requested_role, ar.justification, ar.request_date, ar.status,
+           ar.access_duration_days
+    FROM AccessRequests ar
+    JOIN Employees req_emp ON ar.requester_id = req_emp.employee_id
+    JOIN DatabaseTables dt ON ar.table_id = dt.table_id
+    JOIN AccessRoles aro ON ar.requested_role_id = aro.role_id
+    WHERE req_emp.manager_id = %s      -- Requester is managed by the current manager
+      AND req_emp.is_manager = FALSE -- Requester is a non-manager
+      -- AND ar.status = 'Pending' -- Consider if you want to show history here or only pending
+    ORDER BY CASE ar.status WHEN 'Pending' THEN 0 ELSE 1 END, ar.request_date DESC;
+"""
+DECISION_DETAILS_QUERY = """
+    SELECT ar.approver_id, ar.auto_approval_rule_id, ar.decision_date, ar.approver_comments
+    FROM AccessRequests ar
+    WHERE ar.request_id = %s
+"""
+
+# Signup
+SIGNUP_EMPLOYEE_QUERY = """
+    SELECT e.employee_id, uc.credential_id FROM Employees e
+    LEFT JOIN UserCredentials uc ON uc.employee_id = e.employee_id
+    WHERE e.email = %s
+"""
+CREDENTIALS_INSERT = "INSERT INTO UserCredentials (employee_id, username, password_hash) VALUES (%s, %s, %s)"
+# Imported employees sign up through an activation link; the token is checked on page load and consumed on signup.
+ACTIVATION_TOKEN_LOOKUP_QUERY = """
+    SELECT e.first_name, e.last_name, e.email, e.department FROM EmployeeActivationTokens t
+    JOIN Employees e ON e.employee_id = t.employee_id
+    WHERE t.token_hash = %s AND t.expires_at > CURRENT_TIMESTAMP;
+"""
+ACTIVATION_TOKEN_CONSUME = """
+    DELETE FROM EmployeeActivationTokens t USING Employees e
+    WHERE t.token_hash = %s AND t.expires_at > CURRENT_TIMESTAMP AND e.employee_id = t.employee_id
+    RETURNING e.employee_id, e.email;
+"""
+EMPLOYEE_INSERT = "INSERT INTO Employees (first_name, last_name, email, department, manager_id, is_manager) VALUES (%s, %s, %s, %s, %s, %s) RETURNING employee_id"
+
+# Cancellations and approval decisions
+CANCEL_REQUEST_UPDATE = "UPDATE AccessRequests SET status = 'Rejected', approver_id = %s, decision_date = CURRENT_TIMESTAMP, approver_comments = 'Cancelled by requester.' WHERE request_id = %s AND requester_id = %s AND status = 'Pending';"
+APPROVAL_DECISION_UPDATE = """
+    UPDATE AccessRequests ar
+    SET status = %s, approver_id = %s, decision_date = CURRENT_TIMESTAMP, approver_comments = %s,
+        access_expires_at = CASE WHEN %s THEN CURRENT_TIMESTAMP + make_interval(days => ar.access_duration_days) END
+    FROM EmployeeHierarchy h
+    WHERE ar.request_id = %s AND ar.status = 'Pending'
+      AND h.descendant_id = ar.requester_id
+      AND h.ancestor_id = %s AND h.depth >= 1; -- Requester is anywhere below the approver (skip-level allowed)
+"""
+BULK_APPROVAL_DECISION_UPDATE = """
+    UPDATE AccessRequests ar
+    SET status = %s, approver_id = %s, decision_date = CURRENT_TIMESTAMP, approver_comments = %s,
+        access_expires_at = CASE WHEN %s THEN CURRENT_TIMESTAMP + make_interval(days => ar.access_duration_days) END
+    FROM EmployeeHierarchy h
+    WHERE ar.request_id = ANY(%s) AND ar.status = 'Pending'
+      AND h.descendant_id = ar.requester_id
+      AND h.ancestor_id = %s AND h.depth >= 1
+    RETURNING ar.request_id;
+"""
+BULK_DECISION_FAILURES_QUERY = """
+    SELECT ar.request_id, ar.status, h.depth IS NOT NULL AS in_org
+    FROM AccessRequests ar
+    LEFT JOIN EmployeeHierarchy h
+      ON h.descendant_id = ar.requester_id AND h.ancestor_id = %s AND h.depth >= 1
+    WHERE ar.request_id = ANY(%s);
+"""
+
+# New request submission
+ROLE_OPTIONS_QUERY = "SELECT role_id, role_name FROM AccessRoles ORDER BY role_name;"
+SUBMISSION_CLAIM_INSERT = "INSERT INTO RequestSubmissions (idempotency_key, requester_id) VALUES (%s, %s) ON CONFLICT (idempotency_key) DO NOTHING RETURNING idempotency_key;"
+SUBMISSION_REPLAY_QUERY = "SELECT requester_id, request_ids FROM RequestSubmissions WHERE idempotency_key = %s;"
+REMOVED_TABLES_QUERY = "SELECT schema_name || '.' || table_name FROM DatabaseTables WHERE table_id = ANY(%s) AND NOT is_active;"
+AUTO_APPROVAL_ATTRIBUTES_QUERY = """
+    SELECT dt.table_id, dt.schema_name, dt.table_name, e.department, e.is_manager
+    FROM DatabaseTables dt CROSS JOIN Employees e
+    WHERE dt.table_id = ANY(%s) AND e.employee_id = %s;
+"""
+REQUESTS_INSERT = """
+    INSERT INTO AccessRequests (requester_id, table_id, requested_role_id, justification, request_date, status,
+                                auto_approval_rule_id, decision_date, approver_comments, access_duration_days, access_expires_at) VALUES %s
+    ON CONFLICT (requester_id, table_id, requested_role_id) WHERE status = 'Pending' DO NOTHING
+    RETURNING request_id, table_id, requested_role_id, status;
+"""
+REQUEST_ROW_TEMPLATE = ("(%s, %s, %s, %s, CURRENT_TIMESTAMP, %s, %s, CASE WHEN %s THEN CURRENT_TIMESTAMP END, %s, %s, "
+                        "CASE WHEN %s THEN CURRENT_TIMESTAMP + make_interval(days => %s::INT) END)")
+EXISTING_PENDING_QUERY = """
+    SELECT ar.request_id FROM AccessRequests ar
+    JOIN unnest(%s::int[], %s::int[]) AS s(table_id, role_id)
+      ON ar.table_id = s.table_id AND ar.requested_role_id = s.role_id
+    WHERE ar.requester_id = %s AND ar.status = 'Pending'
+    ORDER BY ar.request_id;
+"""
+SUBMISSION_RECORD_UPDATE = "UPDATE RequestSubmissions SET request_ids = %s WHERE idempotency_key = %s;"
+
+# Reports, keyed by report type: (CSV filename prefix, query). {scope_join} is ORG_SCOPE_REPORT_JOIN or empty.
+REPORT_QUERIES = {
+    'audit_log': ("access_request_audit_log", """
+        SELECT ar.request_id AS "Request ID",
+               req_emp_details.first_name || ' ' || req_emp_details.last_name AS "Requester Name",
+               req_emp_details.department AS "Requester Department",
+               dt.schema_name || '.' || dt.table_name AS "Target Table",
+               aro.role_name AS "Requested Role",
+               ar.justification AS "Justification",
+               ar.request_date AS "Request Date",
+               ar.status AS "Status",
+               CASE
+                   WHEN ar.status = 'Pending' THEN
+                       CASE
+                           WHEN req_emp_details.is_manager = TRUE AND req_emp_details.manager_id IS NULL THEN 'System Admin'
+                           WHEN req_emp_details.manager_id IS NOT NULL THEN manager_of_requester.first_name || ' ' || manager_of_requester.last_name
+                           ELSE 'N/A (Pending Config)'
+                       END
+                   WHEN ar.auto_approval_rule_id IS NOT NULL THEN 'Auto-Approval (Rule #' || ar.auto_approval_rule_id || ')'
+                   WHEN ar.approver_id IS NOT NULL THEN actual_approver_emp.first_name || ' ' || actual_approver_emp.last_name
+                   ELSE 'N/A'
+               END AS "Approver Name",
+               ar.decision_date AS "Decision Date",
+               ar.approver_comments AS "Approver Comments"
+        FROM AccessRequests ar
+        {scope_join}
+        JOIN Employees req_emp_details ON ar.requester_id = req_emp_details.employee_id
+        JOIN DatabaseTables dt ON ar.table_id = dt.table_id
+        JOIN AccessRoles aro ON ar.requested_role_id = aro.role_id
+        LEFT JOIN Employees manager_of_requester ON req_emp_details.manager_id = manager_of_requester.employee_id
+        LEFT JOIN Employees actual_approver_emp ON ar.approver_id = actual_approver_emp.employee_id
+        ORDER BY ar.request_id DESC;
+    """),
+    'user_permissions': ("user_access_permissions_report", """
+        SELECT e.first_name || ' ' || e.last_name AS "Employee Name",
+               e.email AS "Employee Email",
+               e.department AS "Employee Department",
+               dt.schema_name || '.' || dt.table_name AS "Target Table",
+               aro.role_name AS "Approved Role",
+               ar.decision_date AS "Approval Date",
+               ar.access_expires_at AS "Access Expires",
+               CASE
+                   WHEN ar.auto_approval_rule_id IS NOT NULL THEN 'Auto-Approval (Rule #' || ar.auto_approval_rule_id || ')'
+                   ELSE COALESCE(app_mgr.first_name || ' ' || app_mgr.last_name, 'System Admin/N/A')
+               END AS "Approved By Name"
+        FROM AccessRequests ar
+        {scope_join}
+        JOIN Employees e ON ar.requester_id = e.employee_id
+        JOIN DatabaseTables dt ON ar.table_id = dt.table_id
+        JOIN AccessRoles aro ON ar.requested_role_id = aro.role_id
+        LEFT JOIN Employees app_mgr ON ar.approver_id = app_mgr.employee_id
+        WHERE ar.status = 'Approved'
+          AND (ar.access_expires_at IS NULL OR ar.access_expires_at > CURRENT_TIMESTAMP) -- Expired but not yet swept
+        ORDER BY "Employee Name", "Target Table";
+    """),
+    'pending_requests': ("pending_access_requests_report", """
+        SELECT ar.request_id AS "Request ID",
+               req_emp.first_name || ' ' || req_emp.last_name AS "Requester Name",
+               dt.schema_name || '.' || dt.table_name AS "Target Table",
+               aro.role_name AS "Requested Role", ar.request_date AS "Request Date",
+               ROUND(EXTRACT(EPOCH FROM (NOW() - ar.request_date)) / (60*60*24), 2) AS "Days Pending",
+               CASE
+                   WHEN req_emp.is_manager = TRUE AND req_emp.manager_id IS NULL THEN 'System Admin'
+                   WHEN req_emp.manager_id IS NOT NULL THEN mgr_emp.first_name || ' ' || mgr_emp.last_name
+                   ELSE 'N/A (Error in Hierarchy)'
+               END AS "Assigned Approver"
+        FROM AccessRequests ar
+        {scope_join}
+        JOIN Employees req_emp ON ar.requester_id = req_emp.employee_id
+        JOIN DatabaseTables dt ON ar.table_id = dt.table_id
+        JOIN AccessRoles aro ON ar.requested_role_id = aro.role_id
+        LEFT JOIN Employees mgr_emp ON req_emp.manager_id = mgr_emp.employee_id
+        WHERE ar.status = 'Pending'
+        ORDER BY ar.request_date ASC;
+    """),
+    # Percentiles are computed in PostgreSQL so only one row per approver/department leaves the database.
+    # Requester self-cancellations are not approver decisions and are excluded.
+    'approval_latency': ("approval_latency_percentiles_report", """
+        WITH decided AS (
+            SELECT CASE
+                       WHEN ar.auto_approval_rule_id IS NOT NULL THEN 'Auto-Approval'
+                       ELSE COALESCE(approver_emp.first_name || ' ' || approver_emp.last_name, 'N/A (Removed Approver)')
+                   END AS approver_name,
+                   COALESCE(req_emp.department, 'Unassigned') AS department,
+                   EXTRACT(EPOCH FROM (ar.decision_date - ar.request_date))::double precision / 3600.0 AS hours_to_decision
+            FROM AccessRequests ar
+            {scope_join}
+            JOIN Employees req_emp ON ar.requester_id = req_emp.employee_id
+            LEFT JOIN Employees approver_emp ON ar.approver_id = approver_emp.employee_id
+            WHERE ar.status IN ('Approved', 'Rejected', 'Revoked')
+              AND ar.decision_date IS NOT NULL
+              AND ar.approver_id IS DISTINCT FROM ar.requester_id
+        )
+        SELECT CASE WHEN GROUPING(approver_name) = 0 THEN 'Approver' ELSE 'Department' END AS "Dimension",
+               CASE WHEN GROUPING(approver_name) = 0 THEN approver_name ELSE department END AS "Group",
+               COUNT(*) AS "Decisions",
+               ROUND((percentile_cont(0.5) WITHIN GROUP (ORDER BY hours_to_decision))::numeric, 2) AS "P50 Hours",
+               ROUND((percentile_cont(0.9) WITHIN GROUP (ORDER BY hours_to_decision))::numeric, 2) AS "P90 Hours",
+               ROUND((percentile_cont(0.99) WITHIN GROUP (ORDER BY hours_to_decision))::numeric, 2) AS "P99 Hours",
+               ROUND(AVG(hours_to_decision)::numeric, 2) AS "Mean Hours",
+               ROUND(MAX(hours_to_decision)::numeric, 2) AS "Max Hours"
+        FROM decided
+        GROUP BY GROUPING SETS ((approver_name), (department))
+        ORDER BY "Dimension", "P90 Hours" DESC;
+    """),
+}
 
 def format_datetime_column(dt_obj):
     return dt_obj.strftime('%Y-%m-%d %H:%M:%S') if isinstance(dt_obj, datetime) else dt_obj
 
-def generate_tooltip_data(df):
-    if df.empty:
-        return []
+def generate_tooltip_data(rows):
     return [
         {
-            column: {'value': str(value), 'type': 'markdown'}
+            column: {'value': '' if value is None else str(value), 'type': 'markdown'}
             for column, value in row.items()
-        } for row in df.to_dict('records')
+        } for row in rows
     ]
 
+def build_analytics_figures(trend_rows, group_by):
+    """Builds the volume, approval-rate and time-to-decision figures from rollup trend rows."""
+    group_title = {'department': 'Department', 'table': 'Table', 'role': 'Role'}.get(group_by, group_by)
+    per_group_daily, totals = {}, {}
+    for row in trend_rows:
+        label = row['group_label']
+        per_group_daily.setdefault(label, ([], []))
+        per_group_daily[label][0].append(row['bucket_date'])
+        per_group_daily[label][1].append(int(row['submitted']))
+        t = totals.setdefault(label, {'approved': 0, 'rejected': 0, 'decision_seconds_total': 0.0})
+        t['approved'] += int(row['approved'])
+        t['rejected'] += int(row['rejected'])
+        t['decision_seconds_total'] += float(row['decision_seconds_total'] or 0)
+
+    volume_fig = go.Figure([go.Bar(name=label, x=dates, y=counts) for label, (dates, counts) in per_group_daily.items()])
+    volume_fig.update_layout(barmode='stack', title=f"Requests per Day by {group_title}", margin={'t': 40, 'b': 30}, legend={'orientation': 'h'})
+
+    labels = sorted(totals)
+    approval_rates, mean_hours = [], []
+    for label in labels:
+        decided = totals[label]['approved'] + totals[label]['rejected']
+        approval_rates.append(round(100.0 * totals[label]['approved'] / decided, 1) if decided else None)
+        mean_hours.append(round(totals[label]['decision_seconds_total'] / decided / 3600.0, 2) if decided else None)
+
+    approval_fig = go.Figure([go.Bar(x=labels, y=approval_rates, marker_color='#28a745')])
+    approval_fig.update_layout(title="Approval Rate (%)", yaxis={'range': [0, 100]}, margin={'t': 40, 'b': 30})
+    decision_fig = go.Figure([go.Bar(x=labels, y=mean_hours, marker_color='#6f42c1')])
+    decision_fig.update_layout(title="Mean Time to Decision (hours)", margin={'t': 40, 'b': 30})
+    return volume_fig, approval_fig, decision_fig
+
 def register_callbacks(app):
     @app.callback(
         Output('app-container-wrapper', 'children'),
         [Input('url', 'pathname'), Input('url', 'search'), Input('session-store', 'data')]
     )
-    def render_page_content(pathname, search, session_data):
-        session_data = session_data or {}
+    def render_page_content(pathname, search, session_changed):
+        # session-store only signals login/logout; who is logged in comes from the server-side session.
+        session_data = get_current_session(app)
         is_logged_in = session_data.get('logged_in', False)
         app.logger.info(f"render_page_content: pathname={pathname}, search={search}, is_logged_in={is_logged_in}")
 
@@ -42,25 +321,19 @@ def register_callbacks(app):
             manager_name = "N/A" # Default if manager not found or direct signup
             if search:
                 query_params = urllib.parse.parse_qs(search.lstrip('?'))
+                activation_token = query_params.get('activation_token', [None])[0]
+                if activation_token:
+                    return create_signup_layout(app, activation=load_activation(activation_token))
                 manager_email = query_params.get('manager_email', [None])[0]
                 if manager_email:
                     app.logger.info(f"Signup page requested with manager_email: {manager_email}")
-                    conn = get_db_connection(app)
-                    if conn:
-                        try:
-                            with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
-                                cur.execute("SELECT first_name, last_name FROM Employees WHERE email = %s AND is_manager = TRUE", (manager_email,))
-                                manager_record = cur.fetchone()
-                                if manager_record:
-                                    manager_name = f"{manager_record['first_name']} {manager_record['last_name']}"
-                                else: # Manager not found or not a manager
-                                    app.logger.warning(f"Inviting manager {manager_email} not found/not a manager. Proceeding as direct manager signup.")
-                                    manager_email = None # Invalidate for subordinate signup logic
-                        except Exception as e:
-                            app.logger.error(f"Error fetching manager details for signup: {e}")
-                            manager_email = None
-                        finally:
-                            if conn: conn.close()
+                    org_tree = get_org_tree(app)
+                    inviting_manager_id = org_tree.find_manager_by_email(manager_email) if org_tree else None
+                    if inviting_manager_id is not None:
+                        manager_name = org_tree.display_name(inviting_manager_id)
+                    else: # Manager not found, not a manager, or org tree unavailable
+                        app.logger.warning(f"Inviting manager {manager_email} not found/not a manager. Proceeding as direct manager signup.")
+                        manager_email = None # Invalidate for subordinate signup logic
             return create_signup_layout(app, manager_email, manager_name)
 
         if is_logged_in:
@@ -95,6 +368,9 @@ def register_callbacks(app):
         app.logger.info(f"handle_login: n_clicks={n_clicks}, username={username}")
         if not n_clicks: return dash.no_update, "", dash.no_update
         if not username or not password: return {}, dbc.Alert("Username and password are required.", color="warning"), dash.no_update
+        allowed, retry_after = check_login_attempt(app, username) # Before any database work, so throttled attempts cost no queries
+        if not allowed:
+            return {}, dbc.Alert(f"Too many login attempts. Please try again in {math.ceil(retry_after)} seconds.", color="warning"), dash.no_update
 
         conn = get_db_connection(app)
         if not conn: return {}, dbc.Alert("Database connection error. Please try again later.", color="danger"), dash.no_update
@@ -102,17 +378,36 @@ def register_callbacks(app):
         session_data_to_set, login_message, redirect_path = {}, "", dash.no_update
         try:
             with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
-                cur.execute("SELECT uc.employee_id, e.first_name, e.last_name, uc.password_text, e.is_manager, e.email FROM UserCredentials uc JOIN Employees e ON uc.employee_id = e.employee_id WHERE uc.username = %s;", (username,))
+                cur.execute(LOGIN_QUERY, (username,))
                 user_record = cur.fetchone()
+                # Unknown usernames are checked against a dummy hash, so they take as long as a wrong password.
+                password_ok, needs_rehash = verify_password(password, user_record['password_hash'] if user_record else None,
+                                                            user_record['password_text'] if user_record else None)
                 if user_record:
-                    if user_record['password_text'] == password: # Insecure, for MVP only
-                        session_data_to_set = {'logged_in': True, 'employee_id': user_record['employee_id'], 'first_name': user_record['first_name'], 'last_name': user_record['last_name'], 'email': user_record['email'], 'is_manager': user_record['is_manager']}
-                        app.logger.info(f"Login successful for user: {username}, employee_id: {user_record['employee_id']}")
-                        redirect_path = '/dashboard' # Default redirect
+                    if password_ok:
+                        if needs_rehash: # Transparent upgrade of a plain-text password or an outdated work factor
+                            try:
+                                cur.execute(PASSWORD_UPGRADE_UPDATE, (hash_password(password), user_record['employee_id']))
+                                conn.commit()
+                                app.logger.info(f"handle_login: Upgraded stored password for employee_id: {user_record['employee_id']}")
+                            except (psycopg2.Error, PasswordHashingBusy) as e: # Retried on the next login
+                                conn.rollback()
+                                app.logger.warning(f"handle_login: Could not upgrade stored password for employee_id {user_record['employee_id']}: {e}")
+                        session_id = create_session(app, {'logged_in': True, 'employee_id': user_record['employee_id'], 'first_name': user_record['first_name'], 'last_name': user_record['last_name'], 'email': user_record['email'], 'is_manager': user_record['is_manager']})
+                        if session_id:
+                            set_session_cookie(ctx.response, session_id)
+                            session_data_to_set = {'logged_in': True} # The browser only learns that a login happened
+                            app.logger.info(f"Login successful for user: {username}, employee_id: {user_record['employee_id']}")
+                            redirect_path = '/dashboard' # Default redirect
+                        else:
+                            login_message = dbc.Alert("An error occurred during login. Please try again.", color="danger")
                     else:
                         app.logger.warning(f"Invalid password for user: {username}"); login_message = dbc.Alert("Invalid username or password.", color="danger")
                 else:
                     app.logger.warning(f"User not found: {username}"); login_message = dbc.Alert("Invalid username or password.", color="danger")
+        except PasswordHashingBusy:
+            app.logger.warning(f"handle_login: Password hashing pool saturated; login for {username} turned away.")
+            login_message = dbc.Alert("The server is busy. Please try again in a moment.", color="warning")
         except psycopg2.Error as e:
             app.logger.error(f"Database query error during login: {e}"); login_message = dbc.Alert("An error occurred during login. Please try again.", color="danger")
         finally:
@@ -128,6 +423,7 @@ def register_callbacks(app):
         app.logger.info(f"handle_logout_sidebar: n_clicks_logout={n_clicks_logout}")
         if n_clicks_logout and n_clicks_logout > 0:
             app.logger.info("User logged out via sidebar button.")
+            end_current_session(app, ctx.response) # Revoke the server-side session and clear its cookie
             return {}, '/login' # Clear session, redirect to login
         return dash.no_update, dash.no_update
 
@@ -136,13 +432,12 @@ def register_callbacks(app):
          Output('my-requests-table', 'tooltip_data'),
          Output('my-requests-table', 'selected_rows', allow_duplicate=True)],
         [Input('dashboard-load-trigger', 'n_intervals'), Input('refresh-trigger-store', 'data')],
-        [State('session-store', 'data')],
         prevent_initial_call=True
     )
-    def update_my_requests_table(n_intervals_load, refresh_trigger, session_data):
+    def update_my_requests_table(n_intervals_load, refresh_trigger):
         triggered_input = ctx.triggered_id
         app.logger.info(f"update_my_requests_table triggered by: {triggered_input}")
-        session_data = session_data or {}
+        session_data = get_current_session(app)
         if not (session_data.get('logged_in')):
             app.logger.info(f"update_my_requests_table: Conditions not met (not logged in).")
             return [], [], [], []
@@ -157,52 +452,42 @@ def register_callbacks(app):
             ("Req ID", "request_id"), ("Table", "table_full_name"), ("Role", "requested_role"),
             ("Justification", "justification"), ("Requested", "request_date_str"), ("Status", "status"),
             ("Approver", "approver_display_name"), # Simplified to one "Approver" column
-            ("Decided", "decision_date_str"), ("Comments", "approver_comments")
+            ("Decided", "decision_date_str"), ("Access Expires", "access_expires_str"), ("Comments", "approver_comments")
         ]]
-        df_for_tooltip = pd.DataFrame()
 
         try:
             with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
-                cur.execute("""
-                    SELECT ar.request_id, ar.requester_id, dt.schema_name || '.' || dt.table_name AS table_full_name,
-                           aro.role_name AS requested_role, ar.justification, ar.request_date, ar.status,
-                           ar.decision_date, ar.approver_comments,
-                           CASE
-                               WHEN ar.status = 'Pending' THEN
-                                   CASE
-                                       WHEN req_emp_details.is_manager = TRUE AND req_emp_details.manager_id IS NULL THEN 'System Admin'
-                                       WHEN req_emp_details.manager_id IS NOT NULL THEN manager_of_requester.first_name || ' ' || manager_of_requester.last_name
-                                       ELSE 'N/A (Pending Config)'
-                                   END
-                               WHEN ar.approver_id IS NOT NULL THEN actual_approver_emp.first_name || ' ' || actual_approver_emp.last_name
-                               ELSE 'N/A'
-                           END AS approver_display_name
-                    FROM AccessRequests ar
-                    JOIN DatabaseTables dt ON ar.table_id = dt.table_id
-                    JOIN AccessRoles aro ON ar.requested_role_id = aro.role_id
-                    JOIN Employees req_emp_details ON ar.requester_id = req_emp_details.employee_id
-                    LEFT JOIN Employees manager_of_requester ON req_emp_details.manager_id = manager_of_requester.employee_id
-                    LEFT JOIN Employees actual_approver_emp ON ar.approver_id = actual_approver_emp.employee_id
-                    WHERE ar.requester_id = %s ORDER BY ar.request_date DESC;
-                """, (employee_id,))
+                cur.execute(MY_REQUESTS_QUERY, (employee_id,))
                 records = cur.fetchall()
+                org_tree = get_org_tree(app)
                 for rec in records:
                     row = dict(rec)
-                    if row.get('approver_display_name') is None:
+                    # Approver names come from the in-memory org tree instead of two Employees joins.
+                    if row['status'] == 'Pending':
+                        row['approver_display_name'] = org_tree.approver_display_name(employee_id) if org_tree else 'N/A'
+                    elif row.get('auto_approval_rule_id') is not None:
+                        row['approver_display_name'] = f"Auto-Approval (Rule #{row['auto_approval_rule_id']})"
+                    elif row.get('approver_id') is not None and org_tree:
+                        row['approver_display_name'] = org_tree.display_name(row['approver_id'], 'N/A')
+                    else:
                         row['approver_display_name'] = 'N/A'
                     row['request_date_str'] = format_datetime_column(row.get('request_date'))
                     row['decision_date_str'] = format_datetime_column(row.get('decision_date'))
+                    if row.get('access_expires_at'):
+                        row['access_expires_str'] = format_datetime_column(row['access_expires_at'])
+                    elif row['status'] == 'Pending' and row.get('access_duration_days'):
+                        row['access_expires_str'] = f"{format_access_duration(row['access_duration_days'])} after approval"
+                    else:
+                        row['access_expires_str'] = format_access_duration(None) if row['status'] != 'Rejected' else ''
                     data.append(row)
-                df_for_tooltip = pd.DataFrame(data)
                 app.logger.info(f"update_my_requests_table: Found {len(data)} requests for employee_id: {employee_id}")
         except Exception as e:
             app.logger.error(f"Error in update_my_requests_table: {e}")
             data = []
-            df_for_tooltip = pd.DataFrame()
         finally:
             if conn: conn.close(); app.logger.info("DB connection closed after update_my_requests_table.")
 
-        tooltip_data_generated = generate_tooltip_data(df_for_tooltip)
+        tooltip_data_generated = generate_tooltip_data(data)
         return data, columns, tooltip_data_generated, []
 
 
@@ -211,13 +496,13 @@ def register_callbacks(app):
          Output('approval-requests-table', 'tooltip_data'),
          Output('approval-requests-table', 'style_table'), Output('approval-requests-table', 'selected_rows', allow_duplicate=True),
          Output('approval-section-card', 'style')], # Keep this to hide/show the card itself
-        [Input('dashboard-load-trigger', 'n_intervals'), Input('refresh-trigger-store', 'data')],
-        [State('session-store', 'data')],
+        [Input('dashboard-load-trigger', 'n_intervals'), Input('refresh-trigger-store', 'data'),
+         Input('approval-org-scope-switch', 'value')],
         prevent_initial_call=True
     )
-    def update_approval_requests_table(n_intervals_load, refresh_trigger, session_data):
-        app.logger.info(f"update_approval_requests_table triggered by: {ctx.triggered_id}")
-        session_data = session_data or {}
+    def update_approval_requests_table(n_intervals_load, refresh_trigger, org_scope):
+        app.logger.info(f"update_approval_requests_table triggered by: {ctx.triggered_id}, org_scope={org_scope}")
+        session_data = get_current_session(app)
         is_manager = session_data.get('is_manager', False)
         card_style = {'display': 'block' if is_manager else 'none'}
 
@@ -239,52 +524,44 @@ def register_callbacks(app):
             ("Table", "table_full_name"), ("Role", "requested_role"), ("Justification", "justification"),
             ("Requested", "request_date_str"), ("Status", "status")
         ]]
-        df_for_tooltip = pd.DataFrame()
+        if org_scope:
+            columns.insert(3, {"name": "Org Level", "id": "org_depth"})
         try:
             with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
-                # Managers see PENDING requests from their direct non-manager reports.
-                cur.execute("""
-                    SELECT ar.request_id, req_emp.first_name || ' ' || req_emp.last_name AS requester_name,
-                           req_emp.email AS requester_email, dt.schema_name || '.' || dt.table_name AS table_full_name,
-                           aro.role_name AS requested_role, ar.justification, ar.request_date, ar.status
-                    FROM AccessRequests ar
-                    JOIN Employees req_emp ON ar.requester_id = req_emp.employee_id
-                    JOIN DatabaseTables dt ON ar.table_id = dt.table_id
-                    JOIN AccessRoles aro ON ar.requested_role_id = aro.role_id
-                    WHERE req_emp.manager_id = %s      -- Requester is managed by the current manager
-                      AND req_emp.is_manager = FALSE -- Requester is a non-manager
-                      -- AND ar.status = 'Pending' -- Consider if you want to show history here or only pending
-                    ORDER BY CASE ar.status WHEN 'Pending' THEN 0 ELSE 1 END, ar.request_date DESC;
-                """, (manager_id,))
+                if org_scope:
+                    # Whole org: every requester below this manager, at any depth, via one indexed closure-table join.
+                    cur.execute(ORG_APPROVAL_QUEUE_QUERY, (manager_id,))
+                else:
+                    # Managers see PENDING requests from their direct non-manager reports.
+                    cur.execute(APPROVAL_QUEUE_QUERY, (manager_id,))
                 records = cur.fetchall()
                 for rec in records:
                     row = dict(rec)
                     row['request_date_str'] = format_datetime_column(row.get('request_date'))
                     data.append(row)
-                df_for_tooltip = pd.DataFrame(data)
                 app.logger.info(f"update_approval_requests_table: Found {len(data)} requests for manager_id: {manager_id} to approve.")
         except Exception as e:
             app.logger.error(f"Error in update_approval_requests_table: {e}")
             data = []
-            df_for_tooltip = pd.DataFrame()
         finally:
             if conn: conn.close(); app.logger.info("DB conn closed after update_approval_requests_table.")
 
-        tooltip_data_generated = generate_tooltip_data(df_for_tooltip)
+        tooltip_data_generated = generate_tooltip_data(data)
         return data, columns, tooltip_data_generated, table_style_visible, [], card_style
 
     @app.callback(
         [Output('my-request-action-panel', 'children'), Output('my-request-action-panel', 'style'), Output('selected-request-id-store', 'data')],
         [Input('my-requests-table', 'selected_rows')],
-        [State('my-requests-table', 'data'), State('session-store', 'data')]
+        [State('my-requests-table', 'data')]
     )
-    def update_my_request_action_panel(selected_rows, table_data, session_data):
+    def update_my_request_action_panel(selected_rows, table_data):
         if not selected_rows or not table_data: app.logger.info("My Request Action Panel: No row selected or no data."); return [], {'display': 'none'}, None
         selected_request_idx = selected_rows[0]
         if selected_request_idx >= len(table_data):
             app.logger.warning("My Request Action Panel: Selected row index out of bounds."); return [], {'display': 'none'}, None
 
         selected_request = table_data[selected_request_idx]
+        session_data = get_current_session(app)
         request_id, request_status, requester_id_from_table, current_user_id = selected_request['request_id'], selected_request['status'], selected_request['requester_id'], session_data.get('employee_id')
         app.logger.info(f"My Request Action Panel: Selected request_id {request_id}, status {request_status}, requester {requester_id_from_table}, current_user {current_user_id}")
         if request_status == 'Pending' and requester_id_from_table == current_user_id:
@@ -293,35 +570,52 @@ def register_callbacks(app):
         return [], {'display': 'none'}, None
 
     @app.callback(
-        [Output('approval-action-panel', 'children'), Output('approval-action-panel', 'style'), Output('selected-approval-request-id-store', 'data')],
+        [Output('approval-action-panel', 'children'), Output('approval-action-panel', 'style'), Output('selected-approval-request-id-store', 'data'),
+         Output('selected-approval-request-ids-store', 'data')],
         [Input('approval-requests-table', 'selected_rows')],
-        [State('approval-requests-table', 'data'), State('session-store', 'data')]
+        [State('approval-requests-table', 'data')]
     )
-    def update_approval_action_panel(selected_rows, table_data, session_data):
-        session_data = session_data or {}
+    def update_approval_action_panel(selected_rows, table_data):
+        session_data = get_current_session(app)
         is_manager = session_data.get('is_manager', False)
 
         if not is_manager or not selected_rows or not table_data:
             app.logger.info("Approval Action Panel: Not a manager, no row selected, or no data.")
-            return [], {'display': 'none'}, None
+            return [], {'display': 'none'}, None, []
 
-        selected_request_idx = selected_rows[0]
-        if selected_request_idx >= len(table_data):
-            app.logger.warning("Approval Action Panel: Selected row index out of bounds."); return [], {'display': 'none'}, None
-        selected_request = table_data[selected_request_idx]
+        selected_requests = [table_data[idx] for idx in selected_rows if idx < len(table_data)]
+        if not selected_requests:
+            app.logger.warning("Approval Action Panel: Selected row index out of bounds."); return [], {'display': 'none'}, None, []
+
+        panel_style = {'display': 'block', 'border': '1px solid #ddd', 'padding': '15px', 'borderRadius': '5px', 'backgroundColor': '#f9f9f9'}
+
+        if len(selected_requests) > 1: # Bulk action panel
+            pending_ids = [r['request_id'] for r in selected_requests if r.get('status', 'Pending') == 'Pending']
+            skipped_count = len(selected_requests) - len(pending_ids)
+            app.logger.info(f"Approval Action Panel: {len(selected_requests)} rows selected, {len(pending_ids)} pending.")
+            panel_content = [
+                html.H5(f"Bulk Action for {len(pending_ids)} Pending Request(s)", className="mb-3"),
+                html.P(f"Request IDs: {', '.join(str(i) for i in pending_ids) if pending_ids else 'None'}"),
+                html.P(f"{skipped_count} selected request(s) already decided and will be skipped.", className="text-muted") if skipped_count else None,
+                dbc.Textarea(id="approver-comment-input", placeholder="Comments applied to every selected request (required for Reject)", className="mb-2", style={'minHeight': '80px'}),
+                dbc.Button(f"Approve Selected ({len(pending_ids)})", id="bulk-approve-request-button", color="success", className="me-2", disabled=not pending_ids),
+                dbc.Button(f"Reject Selected ({len(pending_ids)})", id="bulk-reject-request-button", color="danger", disabled=not pending_ids)
+            ]
+            return panel_content, panel_style, None, pending_ids
+
+        selected_request = selected_requests[0]
 
 
         request_id, request_status = selected_request['request_id'], selected_request.get('status', 'Pending')
         app.logger.info(f"Approval Action Panel: Selected request_id {request_id}, status {request_status}")
 
-        panel_style = {'display': 'block', 'border': '1px solid #ddd', 'padding': '15px', 'borderRadius': '5px', 'backgroundColor': '#f9f9f9'}
-
         if request_status == 'Pending': # Only show action buttons for pending requests
             panel_content = [
                 html.H5(f"Action for Request ID: {request_id}", className="mb-3"),
                 html.P(f"Requester: {selected_request['requester_name']} ({selected_request['requester_email']})"),
                 html.P(f"Table: {selected_request['table_full_name']}, Role: {selected_request['requested_role']}"),
                 html.P([html.Strong("Justification: "), selected_request['justification']]),
+                html.P(f"Access Duration: {format_access_duration(selected_request.get('access_duration_days'))}"),
                 dbc.Textarea(id="approver-comment-input", placeholder="Comments (required for Reject)", className="mb-2", style={'minHeight': '80px'}),
                 dbc.Button("Approve", id="approve-request-button", color="success", className="me-2"),
                 dbc.Button("Reject", id="reject-request-button", color="danger")
@@ -334,16 +628,14 @@ def register_callbacks(app):
             if conn:
                 try:
                     with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur_hist:
-                        cur_hist.execute("""
-                            SELECT COALESCE(e.first_name || ' ' || e.last_name, 'N/A') as approver_name,
-                                   ar.decision_date, ar.approver_comments
-                            FROM AccessRequests ar
-                            LEFT JOIN Employees e ON ar.approver_id = e.employee_id
-                            WHERE ar.request_id = %s
-                        """, (request_id,))
+                        cur_hist.execute(DECISION_DETAILS_QUERY, (request_id,))
                         hist_details = cur_hist.fetchone()
                         if hist_details:
-                            approver_name_hist = hist_details['approver_name']
+                            if hist_details['auto_approval_rule_id'] is not None:
+                                approver_name_hist = f"Auto-Approval (Rule #{hist_details['auto_approval_rule_id']})"
+                            else:
+                                org_tree = get_org_tree(app)
+                                approver_name_hist = org_tree.display_name(hist_details['approver_id'], 'N/A') if org_tree else 'N/A'
                             decision_date_hist = format_datetime_column(hist_details['decision_date'])
                             comments_hist = hist_details['approver_comments'] if hist_details['approver_comments'] else "No comments."
                 except Exception as e_hist_detail:
@@ -361,9 +653,51 @@ def register_callbacks(app):
                 html.P(f"Decision Date: {decision_date_hist}"),
                 html.P([html.Strong("Comments: "), comments_hist]),
             ]
-        return panel_content, panel_style, request_id
+        return panel_content, panel_style, request_id, [request_id]
 
     # --- SIGNUP CALLBACK ---
+    def load_activation(activation_token):
+        """The imported employee an activation link belongs to, in the form create_signup_layout expects."""
+        invalid = {'error': "This activation link is invalid, expired or already used. Ask your manager for a new one."}
+        conn = get_db_connection(app)
+        if not conn: return {'error': "Database connection error. Please try again later."}
+        try:
+            with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
+                cur.execute(ACTIVATION_TOKEN_LOOKUP_QUERY, (activation_token_hash(activation_token),))
+                row = cur.fetchone()
+            return {**dict(row), 'token': activation_token} if row else invalid
+        except psycopg2.Error as e:
+            app.logger.error(f"load_activation: Database error looking up activation token: {e}")
+            return {'error': "An error occurred. Please try again later."}
+        finally:
+            conn.close()
+
+    def activate_imported_employee(activation_token, password_hash):
+        """Consumes the token and creates the credentials in one transaction. Returns (alert, redirect)."""
+        conn = get_db_connection(app)
+        if not conn: return dbc.Alert("Database connection error. Please try again.", color="danger"), no_update
+        try:
+            with conn.cursor() as cur:
+                cur.execute(ACTIVATION_TOKEN_CONSUME, (activation_token_hash(activation_token),))
+                row = cur.fetchone()
+                if not row:
+                    conn.rollback()
+                    return dbc.Alert("This activation link is invalid, expired or already used. Ask your manager for a new one.", color="danger"), no_update
+                employee_id, email = row
+                cur.execute(CREDENTIALS_INSERT, (employee_id, email, password_hash))
+            conn.commit()
+            app.logger.info(f"Activated imported employee_id: {employee_id} for email: {email}")
+            return dbc.Alert("Account activated! Please log in.", color="success"), "/login"
+        except psycopg2.IntegrityError:
+            conn.rollback() # Already has credentials; the token stays until it expires
+            return dbc.Alert("An account with this email already exists.", color="danger"), no_update
+        except psycopg2.Error as e:
+            conn.rollback()
+            app.logger.error(f"Database error activating an imported employee: {e}")
+            return dbc.Alert("An error occurred during activation. Please try again.", color="danger"), no_update
+        finally:
+            conn.close()
+
     @app.callback(
         [Output('signup-status-message', 'children'),
          Output('url', 'pathname', allow_duplicate=True)],
@@ -371,13 +705,25 @@ def register_callbacks(app):
         [State('signup-firstname-input', 'value'), State('signup-lastname-input', 'value'),
          State('signup-email-input', 'value'), State('signup-department-dropdown', 'value'),
          State('signup-password-input', 'value'), State('signup-confirm-password-input', 'value'),
-         State('signup-manager-email-store', 'data')],
+         State('signup-manager-email-store', 'data'), State('signup-activation-token-store', 'data')],
         prevent_initial_call=True
     )
-    def handle_signup(n_clicks, first_name, last_name, email, department, password, confirm_password, inviting_manager_email):
-        app.logger.info(f"handle_signup: n_clicks={n_clicks}, email={email}, inviting_manager_email={inviting_manager_email}")
+    def handle_signup(n_clicks, first_name, last_name, email, department, password, confirm_password, inviting_manager_email, activation_token):
+        app.logger.info(f"handle_signup: n_clicks={n_clicks}, email={email}, inviting_manager_email={inviting_manager_email}, activation={bool(activation_token)}")
         if not n_clicks: return no_update, no_update
 
+        if activation_token: # Imported employee: name, email and department come from the import, only the password from the form
+            if not password or password != confirm_password:
+                return dbc.Alert("Passwords do not match." if password else "Password is required.", color="warning"), no_update
+            if len(password) < 6:
+                return dbc.Alert("Password must be at least 6 characters.", color="warning"), no_update
+            try:
+                password_hash = hash_password(password)
+            except PasswordHashingBusy:
+                app.logger.warning("handle_signup: Password hashing pool saturated; activation turned away.")
+                return dbc.Alert("The server is busy. Please try again in a moment.", color="warning"), no_update
+            return activate_imported_employee(activation_token, password_hash)
+
         if not all([first_name, last_name, email, department, password, confirm_password]):
             return dbc.Alert("All fields are required.", color="warning"), no_update
         if not re.match(r"[^@]+@[^@]+\.[^@]+", email):
@@ -386,26 +732,34 @@ def register_callbacks(app):
             return dbc.Alert("Passwords do not match.", color="warning"), no_update
         if len(password) < 6:
             return dbc.Alert("Password must be at least 6 characters.", color="warning"), no_update
+        try:
+            password_hash = hash_password(password) # Before connecting, so no connection is held while hashing
+        except PasswordHashingBusy:
+            app.logger.warning(f"handle_signup: Password hashing pool saturated; signup for {email} turned away.")
+            return dbc.Alert("The server is busy. Please try again in a moment.", color="warning"), no_update
 
         conn = get_db_connection(app)
         if not conn: return dbc.Alert("Database connection error. Please try again.", color="danger"), no_update
 
         manager_id_for_new_employee = None
         is_manager_for_new_employee = False
+        org_tree = get_org_tree(app)
 
         try:
             with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
-                cur.execute("SELECT employee_id FROM Employees WHERE email = %s", (email,))
-                if cur.fetchone():
+                cur.execute(SIGNUP_EMPLOYEE_QUERY, (email,))
+                existing = cur.fetchone()
+                if existing and existing['credential_id'] is not None:
                     return dbc.Alert("An account with this email already exists.", color="danger"), no_update
+                if existing: # Imported via CSV without credentials: only their activation link may claim the row
+                    app.logger.warning(f"handle_signup: Signup without an activation link for imported email {email} refused.")
+                    return dbc.Alert("This email was added by a manager's import. Use the activation link your manager sent you.", color="danger"), no_update
 
                 if inviting_manager_email:
-                    cur.execute("SELECT employee_id FROM Employees WHERE email = %s AND is_manager = TRUE", (inviting_manager_email,))
-                    manager_record = cur.fetchone()
-                    if not manager_record:
+                    manager_id_for_new_employee = org_tree.find_manager_by_email(inviting_manager_email) if org_tree else None
+                    if manager_id_for_new_employee is None:
                         app.logger.error(f"Inviting manager email {inviting_manager_email} not found or is not a manager.")
                         return dbc.Alert("Invalid invitation link or inviting manager not found.", color="danger"), no_update
-                    manager_id_for_new_employee = manager_record['employee_id']
                     is_manager_for_new_employee = False
                     app.logger.info(f"Subordinate signup for {email} under manager_id {manager_id_for_new_employee}")
                 else:
@@ -413,16 +767,12 @@ def register_callbacks(app):
                     manager_id_for_new_employee = None
                     app.logger.info(f"Manager signup for {email}. They will be a top-level manager.")
 
-                cur.execute(
-                    "INSERT INTO Employees (first_name, last_name, email, department, manager_id, is_manager) VALUES (%s, %s, %s, %s, %s, %s) RETURNING employee_id",
-                    (first_name, last_name, email, department, manager_id_for_new_employee, is_manager_for_new_employee)
-                )
+                cur.execute(EMPLOYEE_INSERT, (first_name, last_name, email, department, manager_id_for_new_employee, is_manager_for_new_employee))
                 new_employee_id = cur.fetchone()['employee_id']
-                cur.execute(
-                    "INSERT INTO UserCredentials (employee_id, username, password_text) VALUES (%s, %s, %s)",
-                    (new_employee_id, email, password)
-                )
+                cur.execute(CREDENTIALS_INSERT, (new_employee_id, email, password_hash))
                 conn.commit()
+                if org_tree is not None: # Visible to this worker now; other workers pick it up from the NOTIFY
+                    org_tree.apply_rows([(new_employee_id, manager_id_for_new_employee, is_manager_for_new_employee, email, first_name, last_name)])
                 app.logger.info(f"Successfully created new employee_id: {new_employee_id} for email: {email}")
                 return dbc.Alert("Sign up successful! Please log in.", color="success"), "/login"
         except psycopg2.Error as e:
@@ -436,18 +786,7 @@ def register_callbacks(app):
             if conn: conn.close()
         return no_update, no_update
 
-    @app.callback(
-        Output('invite-link-display', 'value'),
-        [Input('dashboard-load-trigger', 'n_intervals'), Input('url', 'href')],
-        [State('session-store', 'data')]
-    )
-    def generate_invite_link(n_intervals, current_url_href, session_data):
-        if not session_data or not session_data.get('is_manager'):
-            return "Not available for non-managers"
-        manager_email = session_data.get('email')
-        if not manager_email:
-            return "Error: Manager email not found in session."
-
+    def base_url_from_href(current_url_href):
         base_url = "http://127.0.0.1:8050" # Default for local dev
         if current_url_href:
             try:
@@ -456,28 +795,86 @@ def register_callbacks(app):
                     base_url = f"{parsed_url.scheme}://{parsed_url.netloc}"
             except Exception as e:
                 app.logger.warning(f"Could not parse base_url from {current_url_href}: {e}")
+        return base_url
 
+    @app.callback(
+        Output('invite-link-display', 'value'),
+        [Input('dashboard-load-trigger', 'n_intervals'), Input('url', 'href')]
+    )
+    def generate_invite_link(n_intervals, current_url_href):
+        session_data = get_current_session(app)
+        if not session_data or not session_data.get('is_manager'):
+            return "Not available for non-managers"
+        manager_email = session_data.get('email')
+        if not manager_email:
+            return "Error: Manager email not found in session."
 
+        base_url = base_url_from_href(current_url_href)
         invite_path = f"/signup?manager_email={urllib.parse.quote(manager_email)}"
         full_invite_link = f"{base_url}{invite_path}"
         app.logger.info(f"Generated invite link for manager {manager_email}: {full_invite_link}")
         return full_invite_link
 
+    @app.callback(
+        [Output('employee-import-feedback', 'children'), Output('employee-import-errors-table', 'data'),
+         Output('employee-import-errors-table', 'style_table'), Output('employee-import-upload', 'contents'),
+         Output('employee-import-activation-download', 'data')],
+        [Input('employee-import-upload', 'contents')],
+        [State('employee-import-upload', 'filename'), State('url', 'href')],
+        prevent_initial_call=True
+    )
+    def handle_employee_import(contents, filename, current_url_href):
+        if not contents: return no_update, no_update, no_update, no_update, no_update
+        session_data = get_current_session(app)
+        if not session_data.get('is_manager'):
+            app.logger.warning("handle_employee_import triggered by non-manager. Ignoring.")
+            return dbc.Alert("Only managers can import employees.", color="danger", dismissable=True), [], {'display': 'none'}, None, no_update
+        app.logger.info(f"handle_employee_import: File {filename} uploaded by {session_data.get('email')}")
+
+        try:
+            valid_df, errors = validate_employee_frame(decode_upload(contents))
+        except (ValueError, UnicodeDecodeError) as e: # pandas' ParserError/EmptyDataError are ValueErrors
+            app.logger.warning(f"handle_employee_import: Could not read {filename}: {e}")
+            return dbc.Alert(f"Could not read {filename}: {e}", color="danger", dismissable=True), [], {'display': 'none'}, None, no_update
+
+        inserted_count, activations = 0, []
+        if not valid_df.empty:
+            try:
+                inserted_count, db_errors, activations = import_employees(app, valid_df, session_data.get('email'), issued_by=session_data.get('employee_id'))
+                errors = sorted(errors + db_errors, key=lambda e: e['row'])
+            except psycopg2.Error:
+                return dbc.Alert("Database error during import. No employees were added.", color="danger", dismissable=True), [], {'display': 'none'}, None, no_update
+
+        message = f"Imported {inserted_count} employee(s) from {filename}."
+        download = no_update
+        if activations: # Only ever shown to the importing manager, once; the database keeps hashes only
+            base_url = base_url_from_href(current_url_href)
+            links_csv = "email,activation_link\n" + "".join(f"{email},{base_url}{activation_path(token)}\n" for email, token in activations)
+            download = dcc.send_string(links_csv, f"activation_links_{datetime.now():%Y%m%d_%H%M%S}.csv")
+            message += f" Send each employee their own link from the downloaded activation CSV; links expire after {ACTIVATION_TOKEN_TTL_DAYS} days."
+        if errors:
+            message += f" {len(errors)} row(s) were rejected" + (f"; showing the first {IMPORT_MAX_ERRORS_SHOWN}." if len(errors) > IMPORT_MAX_ERRORS_SHOWN else ".")
+        color = "success" if not errors else ("warning" if inserted_count else "danger")
+        errors_style = {'overflowX': 'auto', 'display': 'block' if errors else 'none'}
+        # Clear the upload so the same file can be re-submitted after fixing it
+        return dbc.Alert(message, color=color, dismissable=True), errors[:IMPORT_MAX_ERRORS_SHOWN], errors_style, None, download
+
     @app.callback(
         [Output('refresh-trigger-store', 'data', allow_duplicate=True), Output('action-feedback-alert-placeholder', 'children', allow_duplicate=True), Output('my-request-action-panel', 'style', allow_duplicate=True), Output('my-requests-table', 'selected_rows', allow_duplicate=True)],
         [Input('cancel-my-request-button', 'n_clicks')],
-        [State('selected-request-id-store', 'data'), State('session-store', 'data'), State('refresh-trigger-store', 'data')],
+        [State('selected-request-id-store', 'data'), State('refresh-trigger-store', 'data')],
         prevent_initial_call=True
     )
-    def handle_cancel_my_request(n_clicks, request_id, session_data, current_refresh_count):
+    def handle_cancel_my_request(n_clicks, request_id, current_refresh_count):
         if not n_clicks or not request_id: app.logger.info("handle_cancel_my_request: No click or no request_id."); return no_update, no_update, no_update, no_update
+        session_data = get_current_session(app)
         employee_id = session_data.get('employee_id')
         app.logger.info(f"handle_cancel_my_request: Attempting to cancel request_id {request_id} by employee_id {employee_id}")
         conn = get_db_connection(app)
         if not conn: return no_update, dbc.Alert("Database connection error.", color="danger", dismissable=True, duration=4000), no_update, no_update
         try:
             with conn.cursor() as cur:
-                cur.execute("UPDATE AccessRequests SET status = 'Rejected', approver_id = %s, decision_date = CURRENT_TIMESTAMP, approver_comments = 'Cancelled by requester.' WHERE request_id = %s AND requester_id = %s AND status = 'Pending';", (employee_id, request_id, employee_id))
+                cur.execute(CANCEL_REQUEST_UPDATE, (employee_id, request_id, employee_id))
                 conn.commit()
                 if cur.rowcount > 0:
                     app.logger.info(f"Request {request_id} cancelled successfully by employee {employee_id}.")
@@ -494,13 +891,13 @@ def register_callbacks(app):
     @app.callback(
         [Output('refresh-trigger-store', 'data', allow_duplicate=True), Output('action-feedback-alert-placeholder', 'children', allow_duplicate=True), Output('approval-action-panel', 'style', allow_duplicate=True), Output('approval-requests-table', 'selected_rows', allow_duplicate=True)],
         [Input('approve-request-button', 'n_clicks'), Input('reject-request-button', 'n_clicks')],
-        [State('selected-approval-request-id-store', 'data'), State('approver-comment-input', 'value'), State('session-store', 'data'), State('refresh-trigger-store', 'data')],
+        [State('selected-approval-request-id-store', 'data'), State('approver-comment-input', 'value'), State('refresh-trigger-store', 'data')],
         prevent_initial_call=True
     )
-    def handle_approval_decision(approve_clicks, reject_clicks, request_id, comment_text, session_data, current_refresh_count):
+    def handle_approval_decision(approve_clicks, reject_clicks, request_id, comment_text, current_refresh_count):
         triggered_prop_ids = ctx.triggered_prop_ids
         app.logger.info(f"handle_approval_decision triggered_prop_ids: {triggered_prop_ids}, approve_clicks: {approve_clicks}, reject_clicks: {reject_clicks}, request_id: {request_id}")
-        session_data = session_data or {}
+        session_data = get_current_session(app)
         if not session_data.get('is_manager'):
             app.logger.warning("handle_approval_decision triggered by non-manager. Ignoring.")
             return no_update, no_update, {'display': 'none'}, no_update
@@ -531,14 +928,7 @@ def register_callbacks(app):
         if not conn: app.logger.error("handle_approval_decision: Database connection error."); return no_update, dbc.Alert("Database connection error.", color="danger", dismissable=True, duration=4000), no_update, no_update
         try:
             with conn.cursor() as cur:
-                cur.execute("""
-                    UPDATE AccessRequests ar
-                    SET status = %s, approver_id = %s, decision_date = CURRENT_TIMESTAMP, approver_comments = %s
-                    FROM Employees req_emp
-                    WHERE ar.request_id = %s AND ar.status = 'Pending'
-                      AND ar.requester_id = req_emp.employee_id
-                      AND req_emp.manager_id = %s; 
-                """, (new_status, approver_employee_id, final_comment, request_id, approver_employee_id))
+                cur.execute(APPROVAL_DECISION_UPDATE, (new_status, approver_employee_id, final_comment, new_status == 'Approved', request_id, approver_employee_id))
                 conn.commit()
                 if cur.rowcount > 0:
                     app.logger.info(f"Request {request_id} {new_status.lower()} successfully by manager {approver_employee_id}.")
@@ -551,6 +941,70 @@ def register_callbacks(app):
             if conn: conn.close(); app.logger.info("DB conn closed after handle_approval_decision.")
         return no_update, no_update, no_update, no_update
 
+    @app.callback(
+        [Output('refresh-trigger-store', 'data', allow_duplicate=True), Output('action-feedback-alert-placeholder', 'children', allow_duplicate=True), Output('approval-action-panel', 'style', allow_duplicate=True), Output('approval-requests-table', 'selected_rows', allow_duplicate=True)],
+        [Input('bulk-approve-request-button', 'n_clicks'), Input('bulk-reject-request-button', 'n_clicks')],
+        [State('selected-approval-request-ids-store', 'data'), State('approver-comment-input', 'value'), State('refresh-trigger-store', 'data')],
+        prevent_initial_call=True
+    )
+    def handle_bulk_approval_decision(approve_clicks, reject_clicks, request_ids, comment_text, current_refresh_count):
+        triggered_id = ctx.triggered_id
+        app.logger.info(f"handle_bulk_approval_decision: triggered_id={triggered_id}, request_ids={request_ids}")
+        session_data = get_current_session(app)
+        if not session_data.get('is_manager'):
+            app.logger.warning("handle_bulk_approval_decision triggered by non-manager. Ignoring.")
+            return no_update, no_update, {'display': 'none'}, no_update
+
+        if triggered_id == 'bulk-approve-request-button' and approve_clicks:
+            action_type, new_status = "approve", "Approved"
+            final_comment = comment_text if comment_text else "Approved by manager."
+        elif triggered_id == 'bulk-reject-request-button' and reject_clicks:
+            action_type, new_status = "reject", "Rejected"
+            if not comment_text:
+                app.logger.warning("handle_bulk_approval_decision: Rejection attempted without comments."); return no_update, dbc.Alert("Comments are required for rejection.", color="warning", dismissable=True, duration=4000), no_update, no_update
+            final_comment = comment_text
+        else:
+            app.logger.info("handle_bulk_approval_decision: No relevant button click detected."); return no_update, no_update, no_update, no_update
+
+        request_ids = sorted({int(i) for i in (request_ids or [])})
+        if not request_ids: app.logger.warning("handle_bulk_approval_decision: No request_ids available."); return no_update, no_update, no_update, no_update
+
+        approver_employee_id = session_data.get('employee_id')
+        conn = get_db_connection(app)
+        if not conn: app.logger.error("handle_bulk_approval_decision: Database connection error."); return no_update, dbc.Alert("Database connection error.", color="danger", dismissable=True, duration=4000), no_update, no_update
+        try:
+            with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
+                # One set-based statement; same authorization and Pending-only guard as the single-row path.
+                cur.execute(BULK_APPROVAL_DECISION_UPDATE, (new_status, approver_employee_id, final_comment, new_status == 'Approved', request_ids, approver_employee_id))
+                updated_ids = {r['request_id'] for r in cur.fetchall()}
+                conn.commit()
+
+                failed_ids = [i for i in request_ids if i not in updated_ids]
+                failure_reasons = {}
+                if failed_ids: # Explain only the rows that were not updated
+                    cur.execute(BULK_DECISION_FAILURES_QUERY, (approver_employee_id, failed_ids))
+                    for rec in cur.fetchall():
+                        if not rec['in_org']:
+                            failure_reasons[rec['request_id']] = "requester is not in your org"
+                        else:
+                            failure_reasons[rec['request_id']] = f"already {rec['status'].lower()}"
+        except psycopg2.Error as e:
+            conn.rollback(); app.logger.error(f"DB error bulk {action_type}ing requests {request_ids}: {e}")
+            return no_update, dbc.Alert(f"Error {action_type}ing the selected requests.", color="danger", dismissable=True, duration=4000), no_update, no_update
+        finally:
+            if conn: conn.close(); app.logger.info("DB conn closed after handle_bulk_approval_decision.")
+
+        app.logger.info(f"handle_bulk_approval_decision: {len(updated_ids)}/{len(request_ids)} request(s) {new_status.lower()} by manager {approver_employee_id}.")
+        result_items = [html.Li(f"Request ID {i}: {new_status.lower()}") for i in request_ids if i in updated_ids]
+        result_items += [html.Li(f"Request ID {i}: skipped ({failure_reasons.get(i, 'not found')})") for i in failed_ids]
+        alert = dbc.Alert([
+            html.Strong(f"{len(updated_ids)} of {len(request_ids)} request(s) {new_status.lower()}."),
+            html.Ul(result_items, className="mb-0 mt-2")
+        ], color="success" if not failed_ids else "warning", dismissable=True, duration=8000)
+        if not updated_ids:
+            return no_update, alert, no_update, no_update
+        return current_refresh_count + 1, alert, {'display': 'none'}, []
+
     @app.callback(
         [Output('new-request-modal', 'is_open', allow_duplicate=True),
          Output('new-request-table-dropdown', 'options'),
@@ -558,47 +1012,146 @@ def register_callbacks(app):
          Output('new-request-table-dropdown', 'value', allow_duplicate=True),
          Output('new-request-role-dropdown', 'value', allow_duplicate=True),
          Output('new-request-justification-textarea', 'value', allow_duplicate=True),
-         Output('new-request-form-feedback', 'children', allow_duplicate=True)],
+         Output('new-request-form-feedback', 'children', allow_duplicate=True),
+         Output('new-request-items-table', 'data', allow_duplicate=True),
+         Output('new-request-items-table', 'dropdown'),
+         Output('new-request-idempotency-store', 'data'),
+         Output('new-request-table-search-input', 'value')],
         [Input('open-new-request-modal-button-sidebar', 'n_clicks'),
          Input('cancel-new-request-modal-button', 'n_clicks')],
-        [State('new-request-modal', 'is_open'),
-         State('session-store', 'data')],
+        [State('new-request-modal', 'is_open')],
         prevent_initial_call=True
     )
-    def toggle_and_populate_new_request_modal(n_open, n_cancel, is_open_state, session_data):
+    def toggle_and_populate_new_request_modal(n_open, n_cancel, is_open_state):
         triggered_id = ctx.triggered_id
         app.logger.info(f"toggle_and_populate_new_request_modal: triggered_id={triggered_id}, n_open={n_open}, n_cancel={n_cancel}, current_is_open={is_open_state}")
 
         table_options, role_options = [], []
-        reset_table_val, reset_role_val, reset_just_val = None, None, ""
+        reset_table_val, reset_role_val, reset_just_val, reset_items = [], None, "", []
         modal_specific_feedback = ""
 
         if triggered_id == 'open-new-request-modal-button-sidebar' and n_open:
             app.logger.info("toggle_and_populate_new_request_modal: Opening modal and populating dropdowns.")
+            session_data = get_current_session(app)
             conn = get_db_connection(app)
             if conn and session_data and session_data.get('logged_in'):
                 try:
                     with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
-                        cur.execute("SELECT table_id, schema_name || '.' || table_name AS full_name FROM DatabaseTables ORDER BY full_name;")
-                        table_options = [{'label': r['full_name'], 'value': r['table_id']} for r in cur.fetchall()]
-                        cur.execute("SELECT role_id, role_name FROM AccessRoles ORDER BY role_name;")
+                        cur.execute(ROLE_OPTIONS_QUERY)
                         role_options = [{'label': r['role_name'], 'value': r['role_id']} for r in cur.fetchall()]
                 except psycopg2.Error as e:
                     app.logger.error(f"DB error populating modal dropdowns: {e}")
                     modal_specific_feedback = dbc.Alert("Error loading form data. Please try again.", color="danger")
                 finally:
                     if conn: conn.close()
-                return True, table_options, role_options, reset_table_val, reset_role_val, reset_just_val, modal_specific_feedback
+                items_dropdown = {'role_id': {'options': role_options, 'clearable': False}}
+                return True, table_options, role_options, reset_table_val, reset_role_val, reset_just_val, modal_specific_feedback, reset_items, items_dropdown, str(uuid.uuid4()), ""
             else:
+                if conn: conn.close()
                 app.logger.warning("toggle_and_populate_new_request_modal: Cannot open form. Not logged in or DB unavailable.")
                 modal_specific_feedback = dbc.Alert("Cannot open form. Please ensure you are logged in and the system is available.", color="warning")
-                return False, [], [], reset_table_val, reset_role_val, reset_just_val, modal_specific_feedback
+                return False, [], [], reset_table_val, reset_role_val, reset_just_val, modal_specific_feedback, reset_items, dash.no_update, None, ""
 
         if triggered_id == 'cancel-new-request-modal-button' and n_cancel:
             app.logger.info("toggle_and_populate_new_request_modal: Closing modal via cancel button.")
-            return False, dash.no_update, dash.no_update, reset_table_val, reset_role_val, reset_just_val, ""
+            return False, dash.no_update, dash.no_update, reset_table_val, reset_role_val, reset_just_val, "", reset_items, dash.no_update, None, ""
         app.logger.debug("toggle_and_populate_new_request_modal: No relevant trigger, returning no_update.");
-        return dash.no_update, dash.no_update, dash.no_update, dash.no_update, dash.no_update, dash.no_update, dash.no_update
+        return dash.no_update, dash.no_update, dash.no_update, dash.no_update, dash.no_update, dash.no_update, dash.no_update, dash.no_update, dash.no_update, dash.no_update, dash.no_update
+
+    @app.callback(
+        Output('new-request-table-dropdown', 'options', allow_duplicate=True),
+        [Input('new-request-table-search-input', 'value')],
+        [State('new-request-table-dropdown', 'value'), State('new-request-table-dropdown', 'options')],
+        prevent_initial_call=True
+    )
+    def search_new_request_tables(search_term, selected_table_ids, current_options):
+        session_data = get_current_session(app)
+        if not session_data or not session_data.get('logged_in'): return no_update
+        # Already-selected tables stay in the options so the dropdown can keep rendering them.
+        selected_table_ids = set(selected_table_ids or [])
+        options = [opt for opt in (current_options or []) if opt['value'] in selected_table_ids]
+        options.extend(opt for opt in search_tables(app, search_term) if opt['value'] not in selected_table_ids)
+        return options
+
+    # --- Catalog Browser (children are fetched one page at a time, only when a node is expanded) ---
+    @app.callback(
+        [Output('catalog-browser-collapse', 'is_open'), Output('catalog-browser-root', 'children')],
+        [Input('catalog-browser-toggle-button', 'n_clicks')],
+        [State('catalog-browser-collapse', 'is_open')],
+        prevent_initial_call=True
+    )
+    def toggle_catalog_browser(n_clicks, is_open):
+        session_data = get_current_session(app)
+        if not n_clicks or not session_data or not session_data.get('logged_in'): return no_update, no_update
+        if is_open: return False, []
+        children, has_more = fetch_catalog_children(app, CATALOG_ROOT_NODE)
+        return True, create_catalog_children(CATALOG_ROOT_NODE, children, 0, has_more)
+
+    @app.callback(
+        Output({'type': 'catalog-children', 'node': MATCH}, 'children'),
+        [Input({'type': 'catalog-node', 'node': MATCH}, 'n_clicks')],
+        [State({'type': 'catalog-node', 'node': MATCH}, 'id')],
+        prevent_initial_call=True
+    )
+    def expand_catalog_node(n_clicks, node_id):
+        if not n_clicks: return no_update
+        if n_clicks % 2 == 0: return [] # Collapse; children are dropped and reloaded on the next expand
+        node_key = node_id['node']
+        children, has_more = fetch_catalog_children(app, node_key)
+        app.logger.info(f"expand_catalog_node: {node_key} -> {len(children)} child(ren), has_more={has_more}")
+        return create_catalog_children(node_key, children, 0, has_more)
+
+    @app.callback(
+        Output({'type': 'catalog-more-slot', 'node': MATCH, 'offset': MATCH}, 'children'),
+        [Input({'type': 'catalog-more', 'node': MATCH, 'offset': MATCH}, 'n_clicks')],
+        [State({'type': 'catalog-more', 'node': MATCH, 'offset': MATCH}, 'id')],
+        prevent_initial_call=True
+    )
+    def load_more_catalog_nodes(n_clicks, more_id):
+        if not n_clicks: return no_update
+        # The "Load more" slot is replaced by the next page (and a new slot if there are still more).
+        children, has_more = fetch_catalog_children(app, more_id['node'], offset=more_id['offset'])
+        return create_catalog_children(more_id['node'], children, more_id['offset'], has_more)
+
+    @app.callback(
+        [Output('new-request-table-dropdown', 'value', allow_duplicate=True), Output('new-request-table-dropdown', 'options', allow_duplicate=True)],
+        [Input({'type': 'catalog-table', 'table_id': ALL, 'label': ALL}, 'n_clicks')],
+        [State('new-request-table-dropdown', 'value'), State('new-request-table-dropdown', 'options')],
+        prevent_initial_call=True
+    )
+    def add_catalog_table_to_request(n_clicks_list, selected_table_ids, current_options):
+        # Newly rendered leaves also fire this callback (with n_clicks None); only real clicks count.
+        if not ctx.triggered_id or not any(t['value'] for t in ctx.triggered): return no_update, no_update
+        table_id, label = ctx.triggered_id['table_id'], ctx.triggered_id['label']
+        selected_table_ids = list(selected_table_ids or [])
+        if table_id in selected_table_ids: return no_update, no_update
+        options = list(current_options or [])
+        if not any(opt['value'] == table_id for opt in options):
+            options.append({'label': label, 'value': table_id})
+        return selected_table_ids + [table_id], options
+
+    @app.callback(
+        Output('new-request-items-table', 'data'),
+        [Input('new-request-table-dropdown', 'value'), Input('new-request-role-dropdown', 'value')],
+        [State('new-request-items-table', 'data'), State('new-request-table-dropdown', 'options')],
+        prevent_initial_call=True
+    )
+    def sync_new_request_items(selected_table_ids, default_role_id, current_items, table_options):
+        # Keeps one row per selected table. Changing the default access level re-applies it to every row;
+        # otherwise per-table choices already made are preserved.
+        selected_table_ids = selected_table_ids or []
+        labels = {opt['value']: opt['label'] for opt in (table_options or [])}
+        existing_roles = {item['table_id']: item.get('role_id') for item in (current_items or [])}
+        existing_labels = {item['table_id']: item.get('table_full_name') for item in (current_items or [])}
+        apply_default_to_all = ctx.triggered_id == 'new-request-role-dropdown'
+
+        items = []
+        for table_id in selected_table_ids:
+            role_id = existing_roles.get(table_id)
+            if apply_default_to_all or role_id is None:
+                role_id = default_role_id
+            items.append({'table_id': table_id, 'table_full_name': labels.get(table_id, existing_labels.get(table_id, str(table_id))), 'role_id': role_id})
+        return items
 
     @app.callback(
         [Output('new-request-form-feedback', 'children', allow_duplicate=True),
@@ -607,50 +1160,122 @@ def register_callbacks(app):
          Output('new-request-table-dropdown', 'value', allow_duplicate=True),
          Output('new-request-role-dropdown', 'value', allow_duplicate=True),
          Output('new-request-justification-textarea', 'value', allow_duplicate=True),
-         Output('action-feedback-alert-placeholder', 'children', allow_duplicate=True)],
+         Output('action-feedback-alert-placeholder', 'children', allow_duplicate=True),
+         Output('new-request-items-table', 'data', allow_duplicate=True)],
         [Input('submit-new-request-button', 'n_clicks')],
-        [State('new-request-table-dropdown', 'value'),
-         State('new-request-role-dropdown', 'value'),
+        [State('new-request-items-table', 'data'),
          State('new-request-justification-textarea', 'value'),
-         State('session-store', 'data'),
+         State('new-request-duration-dropdown', 'value'),
+         State('new-request-idempotency-store', 'data'),
          State('refresh-trigger-store', 'data')],
         prevent_initial_call=True
     )
-    def submit_new_request(n_clicks_submit, table_id, role_id, justification, session_data, current_refresh_count):
-        app.logger.info(f"submit_new_request: n_clicks={n_clicks_submit}, table_id={table_id}, role_id={role_id}, justification_len={len(justification or '')}")
-        if not n_clicks_submit: return no_update, no_update, no_update, no_update, no_update, no_update, no_update
+    def submit_new_request(n_clicks_submit, request_items, justification, access_duration_days, idempotency_key, current_refresh_count):
+        request_items = request_items or []
+        app.logger.info(f"submit_new_request: n_clicks={n_clicks_submit}, items={len(request_items)}, justification_len={len(justification or '')}, idempotency_key={idempotency_key}")
+        if not n_clicks_submit: return no_update, no_update, no_update, no_update, no_update, no_update, no_update, no_update
         modal_feedback, new_refresh_count, modal_is_open = no_update, no_update, True
         global_feedback = no_update
-        reset_table, reset_role, reset_justification = no_update, no_update, no_update
+        reset_table, reset_role, reset_justification, reset_items = no_update, no_update, no_update, no_update
 
-        if not all([table_id, role_id, justification]):
-            modal_feedback = dbc.Alert("All fields are required.", color="warning", dismissable=True)
-            return modal_feedback, new_refresh_count, modal_is_open, reset_table, reset_role, reset_justification, global_feedback
+        if not request_items or not justification or not all(item.get('role_id') for item in request_items):
+            modal_feedback = dbc.Alert("All fields are required. Select at least one table and an access level for each.", color="warning", dismissable=True)
+            return modal_feedback, new_refresh_count, modal_is_open, reset_table, reset_role, reset_justification, global_feedback, reset_items
         if len(justification) < 20:
             modal_feedback = dbc.Alert("Justification must be at least 20 characters long.", color="warning", dismissable=True)
-            return modal_feedback, new_refresh_count, modal_is_open, reset_table, reset_role, reset_justification, global_feedback
+            return modal_feedback, new_refresh_count, modal_is_open, reset_table, reset_role, reset_justification, global_feedback, reset_items
+        session_data = get_current_session(app)
         if not session_data or not session_data.get('logged_in'):
             modal_feedback = dbc.Alert("Authentication error. Please log in again.", color="danger", dismissable=True)
-            return modal_feedback, new_refresh_count, modal_is_open, reset_table, reset_role, reset_justification, global_feedback
+            return modal_feedback, new_refresh_count, modal_is_open, reset_table, reset_role, reset_justification, global_feedback, reset_items
+        try:
+            idempotency_key = str(uuid.UUID(str(idempotency_key)))
+        except ValueError:
+            app.logger.warning(f"submit_new_request: Missing or malformed idempotency key: {idempotency_key}")
+            modal_feedback = dbc.Alert("This form has expired. Please close and reopen it.", color="warning", dismissable=True)
+            return modal_feedback, new_refresh_count, modal_is_open, reset_table, reset_role, reset_justification, global_feedback, reset_items
 
         requester_id = session_data.get('employee_id')
         conn = get_db_connection(app)
         if not conn:
             modal_feedback = dbc.Alert("Database connection error.", color="danger", dismissable=True)
-            return modal_feedback, new_refresh_count, modal_is_open, reset_table, reset_role, reset_justification, global_feedback
+            return modal_feedback, new_refresh_count, modal_is_open, reset_table, reset_role, reset_justification, global_feedback, reset_items
         try:
             with conn.cursor() as cur:
-                cur.execute(
-                    "INSERT INTO AccessRequests (requester_id, table_id, requested_role_id, justification, request_date, status) VALUES (%s, %s, %s, %s, CURRENT_TIMESTAMP, 'Pending') RETURNING request_id;",
-                    (requester_id, table_id, role_id, justification)
-                )
-                new_request_id = cur.fetchone()[0]
+                # Claim the idempotency key first. A concurrent duplicate blocks here until the first
+                # submission commits, then finds the key taken and replays its result.
+                cur.execute(SUBMISSION_CLAIM_INSERT, (idempotency_key, requester_id))
+                if cur.fetchone() is None:
+                    cur.execute(SUBMISSION_REPLAY_QUERY, (idempotency_key,))
+                    prior_requester_id, prior_request_ids = cur.fetchone()
+                    conn.rollback()
+                    if prior_requester_id != requester_id:
+                        app.logger.warning(f"submit_new_request: Idempotency key {idempotency_key} belongs to employee {prior_requester_id}, not {requester_id}.")
+                        modal_feedback = dbc.Alert("This form has expired. Please close and reopen it.", color="warning", dismissable=True)
+                        return modal_feedback, new_refresh_count, modal_is_open, reset_table, reset_role, reset_justification, global_feedback, reset_items
+                    app.logger.info(f"submit_new_request: Duplicate submission {idempotency_key}; returning existing requests {prior_request_ids}.")
+                    global_feedback = dbc.Alert(f"This request was already submitted (ID: {', '.join(str(i) for i in prior_request_ids)}).", color="info", duration=5000, dismissable=True)
+                    new_refresh_count = current_refresh_count + 1
+                    modal_is_open = False; modal_feedback = ""
+                    reset_table, reset_role, reset_justification, reset_items = [], None, "", []
+                    return modal_feedback, new_refresh_count, modal_is_open, reset_table, reset_role, reset_justification, global_feedback, reset_items
+
+                # Tables can be removed by the catalog sync while the form is open.
+                cur.execute(REMOVED_TABLES_QUERY, ([item['table_id'] for item in request_items],))
+                removed_tables = [r[0] for r in cur.fetchall()]
+                if removed_tables:
+                    conn.rollback()
+                    modal_feedback = dbc.Alert(f"No longer available: {', '.join(removed_tables)}. Please remove them from the request.", color="warning", dismissable=True)
+                    return modal_feedback, new_refresh_count, modal_is_open, reset_table, reset_role, reset_justification, global_feedback, reset_items
+
+                # Auto-approval rules are evaluated in memory; matching rows are inserted already Approved,
+                # with the rule as the machine approver, in this same transaction.
+                rule_index = get_rule_index(app, cur)
+                matched_rules = {}
+                if rule_index:
+                    cur.execute(AUTO_APPROVAL_ATTRIBUTES_QUERY, ([item['table_id'] for item in request_items], requester_id))
+                    table_attrs = {r[0]: r[1:] for r in cur.fetchall()}
+                    for item in request_items:
+                        if item['table_id'] not in table_attrs: continue
+                        schema_name, table_name, department, requester_is_manager = table_attrs[item['table_id']]
+                        rule = match_rule(rule_index, department, bool(requester_is_manager), schema_name, table_name, item['role_id'])
+                        if rule: matched_rules[(item['table_id'], item['role_id'])] = rule
+
+                access_duration_days = access_duration_days or None # 0 = no expiry
+                rows = []
+                for item in request_items:
+                    rule = matched_rules.get((item['table_id'], item['role_id']))
+                    if rule:
+                        rows.append((requester_id, item['table_id'], item['role_id'], justification, 'Approved', rule.rule_id, True,
+                                     AUTO_APPROVAL_COMMENT.format(rule_id=rule.rule_id, description=rule.description),
+                                     access_duration_days, True, access_duration_days))
+                    else:
+                        rows.append((requester_id, item['table_id'], item['role_id'], justification, 'Pending', None, False, None,
+                                     access_duration_days, False, None))
+
+                # All tables go in with one multi-row INSERT, committed together. Tables the requester
+                # already has a Pending request for (same role) are skipped by the unique partial index.
+                inserted = psycopg2.extras.execute_values(cur, REQUESTS_INSERT, rows, template=REQUEST_ROW_TEMPLATE, page_size=len(rows), fetch=True)
+                new_request_ids = [r[0] for r in inserted]
+                auto_approved_ids = [r[0] for r in inserted if r[3] == 'Approved']
+                inserted_keys = {(r[1], r[2]) for r in inserted}
+                skipped = [(item['table_id'], item['role_id']) for item in request_items if (item['table_id'], item['role_id']) not in inserted_keys]
+                existing_request_ids = []
+                if skipped:
+                    cur.execute(EXISTING_PENDING_QUERY, ([t for t, _ in skipped], [r for _, r in skipped], requester_id))
+                    existing_request_ids = [r[0] for r in cur.fetchall()]
+                cur.execute(SUBMISSION_RECORD_UPDATE, (new_request_ids + existing_request_ids, idempotency_key))
                 conn.commit()
-                app.logger.info(f"New access request {new_request_id} submitted by employee {requester_id}.")
-                global_feedback = dbc.Alert(f"Access request (ID: {new_request_id}) submitted successfully!", color="success", duration=5000, dismissable=True)
+                app.logger.info(f"New access requests {new_request_ids} submitted by employee {requester_id}; already pending: {existing_request_ids}.")
+                message = f"{len(new_request_ids)} access request(s) (ID: {', '.join(str(i) for i in new_request_ids)}) submitted successfully!" if new_request_ids else "No new requests were created."
+                if auto_approved_ids:
+                    message += f" {len(auto_approved_ids)} auto-approved (ID: {', '.join(str(i) for i in auto_approved_ids)})."
+                if existing_request_ids:
+                    message += f" {len(existing_request_ids)} already pending (ID: {', '.join(str(i) for i in existing_request_ids)})."
+                global_feedback = dbc.Alert(message, color="success" if new_request_ids else "info", duration=5000, dismissable=True)
                 new_refresh_count = current_refresh_count + 1
                 modal_is_open = False; modal_feedback = ""
-                reset_table, reset_role, reset_justification = None, None, ""
+                reset_table, reset_role, reset_justification, reset_items = [], None, "", []
         except psycopg2.Error as e:
             conn.rollback(); app.logger.error(f"DB error submitting new request: {e}")
             modal_feedback = dbc.Alert(f"Error submitting request: {e}", color="danger", dismissable=True)
@@ -659,21 +1284,76 @@ def register_callbacks(app):
             modal_feedback = dbc.Alert("An unexpected error occurred.", color="danger", dismissable=True)
         finally:
             if conn: conn.close()
-        return modal_feedback, new_refresh_count, modal_is_open, reset_table, reset_role, reset_justification, global_feedback
+        return modal_feedback, new_refresh_count, modal_is_open, reset_table, reset_role, reset_justification, global_feedback, reset_items
 
 
+    # --- Request Search (approval history & audit views; keyset-paged, one MATCH callback per panel) ---
+    @app.callback(
+        [Output({'type': 'request-search-results', 'scope': MATCH}, 'data'), Output({'type': 'request-search-store', 'scope': MATCH}, 'data'),
+         Output({'type': 'request-search-prev', 'scope': MATCH}, 'disabled'), Output({'type': 'request-search-next', 'scope': MATCH}, 'disabled'),
+         Output({'type': 'request-search-feedback', 'scope': MATCH}, 'children')],
+        [Input({'type': 'request-search-input', 'scope': MATCH}, 'value'),
+         Input({'type': 'request-search-prev', 'scope': MATCH}, 'n_clicks'), Input({'type': 'request-search-next', 'scope': MATCH}, 'n_clicks')],
+        [State({'type': 'request-search-store', 'scope': MATCH}, 'data'), State({'type': 'request-search-input', 'scope': MATCH}, 'id'),
+         State('approval-org-scope-switch', 'value'), State('report-org-scope-switch', 'value')],
+        prevent_initial_call=True
+    )
+    def search_request_history(term, prev_clicks, next_clicks, search_state, input_id, approval_org_scope, report_org_scope):
+        session_data = get_current_session(app)
+        if not session_data or not session_data.get('is_manager'): return no_update, no_update, no_update, no_update, no_update
+        scope = input_id['scope']
+        triggered_type = ctx.triggered_id['type'] if ctx.triggered_id else 'request-search-input'
+        search_state = search_state or {}
+        if triggered_type == 'request-search-input' or search_state.get('term') != term:
+            search_state = {'term': term, 'cursors': [None], 'page': 0, 'next_cursor': None} # cursors[i] starts page i
+        elif triggered_type == 'request-search-next' and search_state.get('next_cursor'):
+            search_state['page'] += 1
+            search_state['cursors'] = search_state['cursors'][:search_state['page']] + [search_state['next_cursor']]
+        elif triggered_type == 'request-search-prev' and search_state.get('page', 0) > 0:
+            search_state['page'] -= 1
+        else:
+            return no_update, no_update, no_update, no_update, no_update
+        if not (term or '').strip():
+            return [], search_state, True, True, None
+
+        # Approval history covers direct reports (or the whole org); the audit view covers every request (or the org).
+        manager_id = session_data.get('employee_id')
+        if scope == 'approvals':
+            scope_kwargs = {'scope_manager_id': manager_id, 'scope_max_depth': None if approval_org_scope else 1}
+        else:
+            scope_kwargs = {'scope_manager_id': manager_id} if report_org_scope else {}
+        result = search_requests(app, term, cursor=search_state['cursors'][search_state['page']], **scope_kwargs)
+        if result is None:
+            return [], search_state, True, True, dbc.Alert("Search failed. Please try again.", color="danger", dismissable=True, duration=4000)
+        rows, search_state['next_cursor'] = result
+        for row in rows:
+            row['request_date_str'] = format_datetime_column(row.pop('request_date'))
+        feedback = None
+        if not rows and search_state['page'] == 0:
+            feedback = dbc.Alert("No requests match this search.", color="info", className="py-2")
+        return rows, search_state, search_state['page'] == 0, search_state['next_cursor'] is None, feedback
+
     @app.callback(
         [Output('download-csv', 'data'), Output('report-generation-feedback', 'children')],
         [Input('download-report-button', 'n_clicks')],
-        [State('report-type-dropdown', 'value'), State('session-store', 'data')],
+        [State('report-type-dropdown', 'value'), State('report-org-scope-switch', 'value')],
         prevent_initial_call=True
     )
-    def generate_report_download(n_clicks, report_type, session_data):
-        app.logger.info(f"generate_report_download: n_clicks={n_clicks}, report_type={report_type}")
+    def generate_report_download(n_clicks, report_type, org_scope):
+        app.logger.info(f"generate_report_download: n_clicks={n_clicks}, report_type={report_type}, org_scope={org_scope}")
         if not n_clicks: return no_update, no_update
         if not report_type:
             app.logger.warning("generate_report_download: No report type selected.")
             return no_update, dbc.Alert("Please select a report type.", color="warning", dismissable=True, duration=4000)
+        session_data = get_current_session(app)
+        if not (session_data.get('logged_in') and session_data.get('is_manager')):
+            app.logger.warning("generate_report_download: Refused; not logged in or not a manager.")
+            return no_update, dbc.Alert("Only managers can download reports.", color="danger", dismissable=True, duration=4000)
+        # "Include my whole org" restricts every report to requesters below the manager, via the closure table.
+        scope_join, query_params = "", None
+        if org_scope:
+            scope_join = ORG_SCOPE_REPORT_JOIN
+            query_params = {'scope_manager_id': session_data.get('employee_id')}
         conn = get_db_connection(app)
         if not conn:
             app.logger.error("generate_report_download: Database connection error.")
@@ -681,81 +1361,14 @@ def register_callbacks(app):
 
         query, filename_prefix, df = "", "", None
         try:
-            if report_type == 'audit_log':
-                filename_prefix = "access_request_audit_log"
-                query = """
-                SELECT ar.request_id AS "Request ID",
-                       req_emp_details.first_name || ' ' || req_emp_details.last_name AS "Requester Name",
-                       req_emp_details.department AS "Requester Department",
-                       dt.schema_name || '.' || dt.table_name AS "Target Table",
-                       aro.role_name AS "Requested Role",
-                       ar.justification AS "Justification",
-                       ar.request_date AS "Request Date",
-                       ar.status AS "Status",
-                       CASE
-                           WHEN ar.status = 'Pending' THEN
-                               CASE
-                                   WHEN req_emp_details.is_manager = TRUE AND req_emp_details.manager_id IS NULL THEN 'System Admin'
-                                   WHEN req_emp_details.manager_id IS NOT NULL THEN manager_of_requester.first_name || ' ' || manager_of_requester.last_name
-                                   ELSE 'N/A (Pending Config)'
-                               END
-                           WHEN ar.approver_id IS NOT NULL THEN actual_approver_emp.first_name || ' ' || actual_approver_emp.last_name
-                           ELSE 'N/A'
-                       END AS "Approver Name",
-                       ar.decision_date AS "Decision Date",
-                       ar.approver_comments AS "Approver Comments"
-                FROM AccessRequests ar
-                JOIN Employees req_emp_details ON ar.requester_id = req_emp_details.employee_id
-                JOIN DatabaseTables dt ON ar.table_id = dt.table_id
-                JOIN AccessRoles aro ON ar.requested_role_id = aro.role_id
-                LEFT JOIN Employees manager_of_requester ON req_emp_details.manager_id = manager_of_requester.employee_id
-                LEFT JOIN Employees actual_approver_emp ON ar.approver_id = actual_approver_emp.employee_id
-                ORDER BY ar.request_id DESC;
-                """
-            elif report_type == 'user_permissions':
-                filename_prefix = "user_access_permissions_report"
-                query = """
-                SELECT e.first_name || ' ' || e.last_name AS "Employee Name",
-                       e.email AS "Employee Email",
-                       e.department AS "Employee Department",
-                       dt.schema_name || '.' || dt.table_name AS "Target Table",
-                       aro.role_name AS "Approved Role",
-                       ar.decision_date AS "Approval Date",
-                       COALESCE(app_mgr.first_name || ' ' || app_mgr.last_name, 'System Admin/N/A') AS "Approved By Name"
-                FROM AccessRequests ar
-                JOIN Employees e ON ar.requester_id = e.employee_id
-                JOIN DatabaseTables dt ON ar.table_id = dt.table_id
-                JOIN AccessRoles aro ON ar.requested_role_id = aro.role_id
-                LEFT JOIN Employees app_mgr ON ar.approver_id = app_mgr.employee_id
-                WHERE ar.status = 'Approved'
-                ORDER BY "Employee Name", "Target Table";
-                """
-            elif report_type == 'pending_requests':
-                filename_prefix = "pending_access_requests_report"
-                query = """
-                SELECT ar.request_id AS "Request ID",
-                       req_emp.first_name || ' ' || req_emp.last_name AS "Requester Name",
-                       dt.schema_name || '.' || dt.table_name AS "Target Table",
-                       aro.role_name AS "Requested Role", ar.request_date AS "Request Date",
-                       ROUND(EXTRACT(EPOCH FROM (NOW() - ar.request_date)) / (60*60*24), 2) AS "Days Pending",
-                       CASE
-                           WHEN req_emp.is_manager = TRUE AND req_emp.manager_id IS NULL THEN 'System Admin'
-                           WHEN req_emp.manager_id IS NOT NULL THEN mgr_emp.first_name || ' ' || mgr_emp.last_name
-                           ELSE 'N/A (Error in Hierarchy)'
-                       END AS "Assigned Approver"
-                FROM AccessRequests ar
-                JOIN Employees req_emp ON ar.requester_id = req_emp.employee_id
-                JOIN DatabaseTables dt ON ar.table_id = dt.table_id
-                JOIN AccessRoles aro ON ar.requested_role_id = aro.role_id
-                LEFT JOIN Employees mgr_emp ON req_emp.manager_id = mgr_emp.employee_id
-                WHERE ar.status = 'Pending'
-                ORDER BY ar.request_date ASC;
-                """
-            else:
+            if report_type not in REPORT_QUERIES:
                 app.logger.warning(f"generate_report_download: Unknown report type: {report_type}")
                 return no_update, dbc.Alert(f"Unknown report type: {report_type}", color="danger", dismissable=True, duration=4000)
-
-            df = pd.read_sql_query(query, conn)
+            filename_prefix, query = REPORT_QUERIES[report_type]
+            query = query.format(scope_join=scope_join)
+            if org_scope: filename_prefix += "_my_org"
+            import pandas as pd # Deferred: pandas is only needed here and in employee imports, and dominates startup time
+            df = pd.read_sql_query(query, conn, params=query_params)
             for col in df.columns:
                 if pd.api.types.is_datetime64_any_dtype(df[col]):
                     df[col] = df[col].dt.strftime('%Y-%m-%d %H:%M:%S')
@@ -774,4 +1387,29 @@ def register_callbacks(app):
             app.logger.error(f"generate_report_download: An unexpected error occurred: {e_general}")
             return no_update, dbc.Alert(f"An unexpected error occurred: {e_general}", color="danger", dismissable=True, duration=4000)
         finally:
-            if conn: conn.close()
\ No newline at end of file
+            if conn: conn.close()
+
+
+    @app.callback(
+        [Output('analytics-volume-graph', 'figure'), Output('analytics-approval-rate-graph', 'figure'),
+         Output('analytics-decision-time-graph', 'figure'), Output('analytics-feedback', 'children')],
+        [Input('dashboard-load-trigger', 'n_intervals'), Input('refresh-trigger-store', 'data'),
+         Input('analytics-groupby-dropdown', 'value'), Input('analytics-range-dropdown', 'value')],
+        prevent_initial_call=True
+    )
+    def update_analytics_charts(n_intervals_load, refresh_trigger, group_by, days):
+        app.logger.info(f"update_analytics_charts triggered by: {ctx.triggered_id}, group_by={group_by}, days={days}")
+        session_data = get_current_session(app)
+        if not (session_data.get('logged_in') and session_data.get('is_manager')):
+            app.logger.info("update_analytics_charts: Conditions not met (not logged in or not manager).")
+            return no_update, no_update, no_update, no_update
+        group_by = group_by or 'department'
+        days = days or 30
+
+        # Read-only: the daily_rollup scheduled job keeps DailyRequestRollup current, so a page view never writes.
+        trend_rows = fetch_daily_trends(app, group_by=group_by, days=days)
+        if trend_rows is None:
+            return no_update, no_update, no_update, dbc.Alert("Error loading analytics data.", color="danger", dismissable=True, duration=4000)
+        volume_fig, approval_fig, decision_fig = build_analytics_figures(trend_rows, group_by)
+        feedback = "" if trend_rows else dbc.Alert(f"No requests in the last {days} days.", color="info", dismissable=True, duration=4000)
+        return volume_fig, approval_fig, decision_fig, feedback
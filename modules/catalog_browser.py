@@ -0,0 +1,82 @@
+# modules/catalog_browser.py
+import psycopg2
+
+from .db import get_db_connection
+
+CATALOG_BROWSER_PAGE_SIZE = 100 # Children loaded per expand / "Load more" click
+CATALOG_ROOT_NODE = 'root'
+MANUAL_SOURCE_KEY = 'manual' # Hand-entered DatabaseTables rows (source_id IS NULL)
+MANUAL_SERVER_LABEL = 'Manually registered tables'
+
+# Node keys: 'root' -> 'srv|<server_name>' -> 'db|<source_id or manual>' -> 'sch|<source_id or manual>|<schema_name>'.
+# Server, database and schema levels read CatalogSchemaSummary; only table pages touch DatabaseTables.
+CATALOG_SERVERS_QUERY = """
+    SELECT COALESCE(cs.server_name, '') AS server_name, SUM(s.table_count) AS table_count
+    FROM CatalogSchemaSummary s LEFT JOIN CatalogSources cs ON cs.source_id = s.source_id
+    GROUP BY 1 ORDER BY 1 LIMIT %(limit)s OFFSET %(offset)s;
+"""
+CATALOG_DATABASES_QUERY = """
+    SELECT s.source_id, cs.database_name, cs.source_name, SUM(s.table_count) AS table_count
+    FROM CatalogSchemaSummary s LEFT JOIN CatalogSources cs ON cs.source_id = s.source_id
+    WHERE COALESCE(cs.server_name, '') = %(server_name)s
+    GROUP BY s.source_id, cs.database_name, cs.source_name
+    ORDER BY cs.database_name NULLS FIRST LIMIT %(limit)s OFFSET %(offset)s;
+"""
+CATALOG_SCHEMAS_QUERY = """
+    SELECT schema_name, table_count FROM CatalogSchemaSummary
+    WHERE COALESCE(source_id, 0) = %(source_id)s
+    ORDER BY schema_name LIMIT %(limit)s OFFSET %(offset)s;
+"""
+CATALOG_TABLES_QUERY = """
+    SELECT table_id, table_name FROM DatabaseTables
+    WHERE {source_filter} AND schema_name = %(schema_name)s AND is_active
+    ORDER BY table_name LIMIT %(limit)s OFFSET %(offset)s;
+"""
+
+
+def _source_id_from_key(source_key):
+    return None if source_key == MANUAL_SOURCE_KEY else int(source_key)
+
+def fetch_catalog_children(app, node_key, offset=0, limit=CATALOG_BROWSER_PAGE_SIZE):
+    """
+    Returns (children, has_more) for one page of node_key's children. Each child is a dict with
+    'kind' ('node' or 'table'), 'label' and either 'key' + 'count' (nodes) or 'table_id' + 'full_name' (tables).
+    Returns ([], False) on errors or unknown keys.
+    """
+    params = {'limit': limit + 1, 'offset': offset} # One extra row tells us whether another page exists
+    level, _, rest = node_key.partition('|')
+    conn = get_db_connection(app)
+    if not conn: return [], False
+    try:
+        with conn.cursor() as cur:
+            if node_key == CATALOG_ROOT_NODE:
+                cur.execute(CATALOG_SERVERS_QUERY, params)
+                children = [{'kind': 'node', 'key': f"srv|{server}", 'label': server or MANUAL_SERVER_LABEL, 'count': count}
+                            for server, count in cur.fetchall()]
+            elif level == 'srv':
+                cur.execute(CATALOG_DATABASES_QUERY, {**params, 'server_name': rest})
+                children = [{'kind': 'node', 'key': f"db|{source_id if source_id is not None else MANUAL_SOURCE_KEY}",
+                             'label': f"{database_name} ({source_name})" if database_name else 'Hand-entered', 'count': count}
+                            for source_id, database_name, source_name, count in cur.fetchall()]
+            elif level == 'db':
+                source_id = _source_id_from_key(rest)
+                cur.execute(CATALOG_SCHEMAS_QUERY, {**params, 'source_id': source_id or 0})
+                children = [{'kind': 'node', 'key': f"sch|{rest}|{schema_name}", 'label': schema_name, 'count': count}
+                            for schema_name, count in cur.fetchall()]
+            elif level == 'sch':
+                source_key, _, schema_name = rest.partition('|')
+                source_id = _source_id_from_key(source_key)
+                # Separate predicates so each case can use its own unique index on DatabaseTables
+                source_filter = "source_id IS NULL" if source_id is None else "source_id = %(source_id)s"
+                cur.execute(CATALOG_TABLES_QUERY.format(source_filter=source_filter), {**params, 'source_id': source_id, 'schema_name': schema_name})
+                children = [{'kind': 'table', 'table_id': table_id, 'label': table_name, 'full_name': f"{schema_name}.{table_name}"}
+                            for table_id, table_name in cur.fetchall()]
+            else:
+                app.logger.warning(f"fetch_catalog_children: Unknown node key {node_key}")
+                return [], False
+        return children[:limit], len(children) > limit
+    except (psycopg2.Error, ValueError) as e:
+        app.logger.error(f"fetch_catalog_children: Error loading children of {node_key}: {e}")
+        return [], False
+    finally:
+        conn.close()
@@ -0,0 +1,91 @@
+# modules/catalog_search.py
+import threading
+import time
+from collections import OrderedDict
+
+import psycopg2
+
+from .db import get_db_connection
+
+TABLE_SEARCH_MIN_CHARS = 2
+TABLE_SEARCH_LIMIT = 50 # Options returned per search
+TABLE_SEARCH_CACHE_SIZE = 2048 # Most recently used search terms kept in memory
+TABLE_SEARCH_CACHE_TTL = 300.0 # Seconds; new tables from the catalog sync show up within this window
+
+# Prefix matches on the full name or the bare table name rank first (shortest names first), then
+# fuzzy matches by trigram word similarity. Each half numbers its rows in its own order and the
+# outer ORDER BY (tier, rank) keeps that ranking; UNION ALL alone guarantees no order. Both halves use
+# the idx_databasetables_full_name_trgm GIN index over schema_name || '.' || table_name.
+TABLE_SEARCH_QUERY = """
+    (SELECT table_id, schema_name || '.' || table_name AS full_name, 0 AS tier,
+            row_number() OVER (ORDER BY length(schema_name || '.' || table_name), schema_name || '.' || table_name) AS rank
+     FROM DatabaseTables
+     WHERE is_active
+       AND ((schema_name || '.' || table_name) ILIKE %(prefix)s OR (schema_name || '.' || table_name) ILIKE %(table_prefix)s)
+     ORDER BY rank
+     LIMIT %(limit)s)
+    UNION ALL
+    (SELECT table_id, schema_name || '.' || table_name AS full_name, 1 AS tier,
+            row_number() OVER (ORDER BY word_similarity(%(term)s, schema_name || '.' || table_name) DESC, schema_name || '.' || table_name) AS rank
+     FROM DatabaseTables
+     WHERE is_active AND %(term)s <%% (schema_name || '.' || table_name)
+     ORDER BY rank
+     LIMIT %(limit)s)
+    ORDER BY tier, rank;
+"""
+
+_search_cache = OrderedDict() # term -> (cached_at, options)
+_search_cache_lock = threading.Lock()
+
+
+def _escape_like(term):
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def normalize_search_term(term):
+    return ' '.join((term or '').split()).lower()
+
+def search_tables(app, term, limit=TABLE_SEARCH_LIMIT):
+    """
+    Returns up to `limit` dropdown options ({'label', 'value'}) for active tables matching term,
+    prefix matches first. Terms shorter than TABLE_SEARCH_MIN_CHARS return []. Results are cached
+    per normalized term for TABLE_SEARCH_CACHE_TTL seconds.
+    """
+    term = normalize_search_term(term)
+    if len(term) < TABLE_SEARCH_MIN_CHARS: return []
+    now = time.monotonic()
+    with _search_cache_lock:
+        cached = _search_cache.get(term)
+        if cached and now - cached[0] < TABLE_SEARCH_CACHE_TTL:
+            _search_cache.move_to_end(term)
+            return cached[1]
+
+    conn = get_db_connection(app)
+    if not conn: return []
+    try:
+        started = time.perf_counter()
+        with conn.cursor() as cur:
+            escaped = _escape_like(term)
+            cur.execute(TABLE_SEARCH_QUERY, {'term': term, 'prefix': f"{escaped}%", 'table_prefix': f"%.{escaped}%", 'limit': limit})
+            options, seen = [], set()
+            for table_id, full_name, _tier, _rank in cur.fetchall(): # Ranked by the outer ORDER BY; fuzzy half repeats some prefix hits
+                if table_id in seen: continue
+                seen.add(table_id)
+                options.append({'label': full_name, 'value': table_id})
+                if len(options) == limit: break
+        app.logger.info(f"search_tables: '{term}' -> {len(options)} option(s) in {(time.perf_counter() - started) * 1000.0:.1f} ms.")
+    except psycopg2.Error as e:
+        app.logger.error(f"search_tables: Database error searching tables for '{term}': {e}")
+        return []
+    finally:
+        conn.close()
+
+    with _search_cache_lock:
+        _search_cache[term] = (now, options)
+        _search_cache.move_to_end(term)
+        while len(_search_cache) > TABLE_SEARCH_CACHE_SIZE:
+            _search_cache.popitem(last=False)
+    return options
+
+def clear_table_search_cache():
+    with _search_cache_lock:
+        _search_cache.clear()
@@ -0,0 +1,177 @@
+# modules/catalog_sync.py
+import argparse
+import io
+import logging
+import time
+from types import SimpleNamespace
+
+import psycopg2
+
+from .db import get_db_connection, CATALOG_SOURCES
+from .catalog_search import clear_table_search_cache
+
+CATALOG_SYNC_LOCK_NAMESPACE = 35001 # pg_try_advisory_xact_lock(namespace, hashtext(name)): one sync per source at a time
+
+# Tables, partitioned tables, views, materialized views and foreign tables; partitions are left out
+# (access is requested on the parent). System and temp schemas are skipped.
+SOURCE_CATALOG_FILTER = """
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    LEFT JOIN pg_description d ON d.objoid = c.oid AND d.classoid = 'pg_class'::regclass AND d.objsubid = 0
+    WHERE c.relkind IN ('r', 'p', 'v', 'm', 'f') AND NOT c.relispartition
+      AND n.nspname NOT IN ('pg_catalog', 'information_schema')
+      AND n.nspname NOT LIKE 'pg\\_toast%%' AND n.nspname NOT LIKE 'pg\\_temp%%'
+      AND NOT (n.nspname = ANY(%(exclude_schemas)s))
+"""
+# Compared between the app and source connections: the same database on the same server means the source
+# is the app's own database, and its schemas (UserCredentials, UserSessions, ...) must never become requestable.
+DATABASE_IDENTITY_QUERY = "SELECT current_database(), pg_postmaster_start_time(), inet_server_port();"
+APP_SCHEMAS_QUERY = "SELECT current_schemas(false);"
+# One row back from the source: if it matches CatalogSources.catalog_fingerprint nothing is copied.
+SOURCE_FINGERPRINT_QUERY = """
+    SELECT md5(COALESCE(string_agg(n.nspname || '.' || c.relname || ':' || COALESCE(d.description, ''), ',' ORDER BY n.nspname, c.relname), '')),
+           COUNT(*)
+""" + SOURCE_CATALOG_FILTER
+SOURCE_TABLES_QUERY = "SELECT n.nspname, c.relname, d.description" + SOURCE_CATALOG_FILTER
+
+STAGING_DDL = """
+    CREATE TEMP TABLE catalog_sync_staging (
+        schema_name VARCHAR(63) NOT NULL,
+        table_name VARCHAR(63) NOT NULL,
+        description TEXT,
+        PRIMARY KEY (schema_name, table_name)
+    ) ON COMMIT DROP;
+"""
+
+# Each merge step is one set-based statement that also records its CatalogSyncEvents.
+MERGE_STATEMENTS = [
+    ('reactivated', """
+        WITH changed AS (
+            UPDATE DatabaseTables dt SET is_active = TRUE, removed_at = NULL, description = s.description
+            FROM catalog_sync_staging s
+            WHERE dt.source_id = %(source_id)s AND dt.schema_name = s.schema_name AND dt.table_name = s.table_name
+              AND NOT dt.is_active
+            RETURNING dt.table_id
+        )
+        INSERT INTO CatalogSyncEvents (source_id, table_id, event_type) SELECT %(source_id)s, table_id, 'reactivated' FROM changed;
+    """),
+    ('added', """
+        WITH changed AS (
+            INSERT INTO DatabaseTables (source_id, schema_name, table_name, description)
+            SELECT %(source_id)s, s.schema_name, s.table_name, s.description FROM catalog_sync_staging s
+            WHERE NOT EXISTS (
+                SELECT 1 FROM DatabaseTables dt
+                WHERE dt.source_id = %(source_id)s AND dt.schema_name = s.schema_name AND dt.table_name = s.table_name
+            )
+            RETURNING table_id
+        )
+        INSERT INTO CatalogSyncEvents (source_id, table_id, event_type) SELECT %(source_id)s, table_id, 'added' FROM changed;
+    """),
+    ('removed', """
+        WITH changed AS (
+            UPDATE DatabaseTables dt SET is_active = FALSE, removed_at = CURRENT_TIMESTAMP
+            WHERE dt.source_id = %(source_id)s AND dt.is_active
+              AND NOT EXISTS (SELECT 1 FROM catalog_sync_staging s WHERE s.schema_name = dt.schema_name AND s.table_name = dt.table_name)
+            RETURNING dt.table_id
+        )
+        INSERT INTO CatalogSyncEvents (source_id, table_id, event_type) SELECT %(source_id)s, table_id, 'removed' FROM changed;
+    """),
+    ('described', """
+        UPDATE DatabaseTables dt SET description = s.description
+        FROM catalog_sync_staging s
+        WHERE dt.source_id = %(source_id)s AND dt.schema_name = s.schema_name AND dt.table_name = s.table_name
+          AND dt.description IS DISTINCT FROM s.description;
+    """),
+]
+
+
+# --- Sync ---
+def _register_source(cur, source):
+    cur.execute("""
+        INSERT INTO CatalogSources (source_name, server_name, database_name) VALUES (%s, %s, %s)
+        ON CONFLICT (source_name) DO UPDATE SET server_name = EXCLUDED.server_name, database_name = EXCLUDED.database_name
+        RETURNING source_id, catalog_fingerprint;
+    """, (source['name'], source.get('server_name') or source['connection'].get('host', 'localhost'), source['connection']['dbname']))
+    return cur.fetchone()
+
+def sync_catalog_source(app, source, force=False):
+    """
+    Syncs one CATALOG_SOURCES entry into DatabaseTables. The source's catalog fingerprint is
+    checked first, so an unchanged source costs one small query. Otherwise its table list is
+    streamed with COPY into a staging table and merged with set-based statements.
+    Returns {'source', 'status', 'added', 'removed', 'reactivated', 'described', 'tables', 'elapsed_ms'} or None on error.
+    """
+    started = time.perf_counter()
+    result = {'source': source['name'], 'status': 'unchanged', 'added': 0, 'removed': 0, 'reactivated': 0, 'described': 0, 'tables': None}
+    params = {'exclude_schemas': list(source.get('exclude_schemas') or [])}
+    conn, source_conn = None, None
+    try:
+        source_conn = psycopg2.connect(**source['connection'])
+        source_conn.set_session(readonly=True)
+        conn = get_db_connection(app)
+        if not conn: return None
+        with conn.cursor() as cur, source_conn.cursor() as source_cur:
+            cur.execute("SELECT pg_try_advisory_xact_lock(%s, hashtext(%s));", (CATALOG_SYNC_LOCK_NAMESPACE, source['name']))
+            if not cur.fetchone()[0]:
+                conn.rollback()
+                app.logger.info(f"sync_catalog_source: {source['name']} is already being synced elsewhere; skipping.")
+                return {**result, 'status': 'locked', 'elapsed_ms': (time.perf_counter() - started) * 1000.0}
+            source_id, stored_fingerprint = _register_source(cur, source)
+
+            cur.execute(DATABASE_IDENTITY_QUERY)
+            source_cur.execute(DATABASE_IDENTITY_QUERY)
+            if cur.fetchone() == source_cur.fetchone():
+                cur.execute(APP_SCHEMAS_QUERY)
+                params['exclude_schemas'] = sorted(set(params['exclude_schemas']) | set(cur.fetchone()[0]))
+                app.logger.warning(f"sync_catalog_source: {source['name']} is the application database; "
+                                   f"excluding its schemas {params['exclude_schemas']}.")
+
+            source_cur.execute(SOURCE_FINGERPRINT_QUERY, params)
+            fingerprint, table_count = source_cur.fetchone()
+            result['tables'] = table_count
+            if fingerprint == stored_fingerprint and not force:
+                cur.execute("UPDATE CatalogSources SET last_checked_at = CURRENT_TIMESTAMP WHERE source_id = %s;", (source_id,))
+                conn.commit()
+                return {**result, 'elapsed_ms': (time.perf_counter() - started) * 1000.0}
+
+            buffer = io.StringIO()
+            source_cur.copy_expert(f"COPY ({source_cur.mogrify(SOURCE_TABLES_QUERY, params).decode()}) TO STDOUT", buffer)
+            buffer.seek(0)
+            cur.execute(STAGING_DDL)
+            cur.copy_expert("COPY catalog_sync_staging (schema_name, table_name, description) FROM STDIN", buffer)
+            cur.execute("ANALYZE catalog_sync_staging;")
+            for step, statement in MERGE_STATEMENTS:
+                cur.execute(statement, {'source_id': source_id})
+                result[step] = cur.rowcount
+            cur.execute("""
+                UPDATE CatalogSources
+                SET catalog_fingerprint = %s, table_count = %s, last_checked_at = CURRENT_TIMESTAMP, last_changed_at = CURRENT_TIMESTAMP
+                WHERE source_id = %s;
+            """, (fingerprint, table_count, source_id))
+        conn.commit()
+        clear_table_search_cache()
+        result['status'] = 'synced'
+        result['elapsed_ms'] = (time.perf_counter() - started) * 1000.0
+        app.logger.info(f"sync_catalog_source: {source['name']} synced {table_count} tables in {result['elapsed_ms']:.1f} ms "
+                        f"(+{result['added']} / -{result['removed']} / reactivated {result['reactivated']} / descriptions {result['described']}).")
+        return result
+    except psycopg2.Error as e:
+        if conn: conn.rollback()
+        app.logger.error(f"sync_catalog_source: Database error syncing {source['name']}: {e}")
+        return None
+    finally:
+        if conn: conn.close()
+        if source_conn: source_conn.close()
+
+def sync_all_catalog_sources(app, force=False):
+    """Syncs every configured source; returns the list of per-source results (None for failures)."""
+    return [sync_catalog_source(app, source, force=force) for source in CATALOG_SOURCES]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Sync DatabaseTables from the sources in CATALOG_SOURCES.")
+    parser.add_argument('--force', action='store_true', help="Merge even if a source's catalog fingerprint is unchanged.")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    for sync_result in sync_all_catalog_sources(SimpleNamespace(logger=logging.getLogger('catalog_sync')), force=args.force):
+        print(sync_result)
@@ -11,6 +11,19 @@ DB_CONFIG = {
     "port": "5432"
 }
 
+# --- Catalog Sync Sources ---
+# Target databases whose tables can be requested. DatabaseTables is synced from each source's
+# pg_catalog by modules/catalog_sync.py; the login only needs to read the catalog.
+# Empty by default: each deployment lists its own targets, e.g.
+#     {
+#         "name": "warehouse",
+#         "server_name": "warehouse-db-01",
+#         "exclude_schemas": ["staging"],
+#         "connection": {"dbname": "warehouse", "user": "catalog_reader", "password": "...", "host": "warehouse-db-01", "port": "5432"},
+#     },
+# If a source is this app's own database, its schemas are never synced (see catalog_sync.py).
+CATALOG_SOURCES = []
+
 # --- Helper Function for DB Connection ---
 def get_db_connection(app): # Added app parameter for logging
     """
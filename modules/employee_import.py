@@ -0,0 +1,246 @@
+# modules/employee_import.py
+import argparse
+import base64
+import hashlib
+import io
+import logging
+import secrets
+import time
+import urllib.parse
+from types import SimpleNamespace
+
+import psycopg2
+import psycopg2.extras
+
+from .db import get_db_connection
+
+# Must match the signup form's department options.
+EMPLOYEE_DEPARTMENTS = ['Finance', 'Operations', 'Marketing', 'IT', 'HR', 'Other']
+IMPORT_REQUIRED_COLUMNS = ['first_name', 'last_name', 'email', 'department']
+IMPORT_OPTIONAL_COLUMNS = ['manager_email', 'is_manager']
+IMPORT_MAX_ERRORS_SHOWN = 500
+EMAIL_PATTERN = r"^[^@\s]+@[^@\s]+\.[^@\s]+$"
+TRUE_VALUES, FALSE_VALUES = {'true', 't', 'yes', 'y', '1'}, {'false', 'f', 'no', 'n', '0', ''}
+# Imported employees prove they own their row with a single-use token from the importing manager.
+ACTIVATION_TOKEN_TTL_DAYS = 14
+
+
+# --- Parsing & Vectorized Validation ---
+def decode_upload(contents):
+    """Decodes a dcc.Upload 'data:...;base64,...' payload into a DataFrame of strings."""
+    import pandas as pd # Deferred so that importing the app does not load pandas
+    _, encoded = contents.split(',', 1)
+    return pd.read_csv(io.BytesIO(base64.b64decode(encoded)), dtype=str, keep_default_na=False, skipinitialspace=True)
+
+def validate_employee_frame(df):
+    """
+    Validates every row in one vectorized pass. Returns (valid_df, errors) where errors is a list of
+    {'row': csv_line, 'email': ..., 'error': ...}. csv_line counts the header as line 1.
+    """
+    import pandas as pd # Already loaded by decode_upload; imported here rather than at module level
+    df = df.rename(columns=lambda c: str(c).strip().lower())
+    missing = [c for c in IMPORT_REQUIRED_COLUMNS if c not in df.columns]
+    if missing:
+        raise ValueError(f"Missing required column(s): {', '.join(missing)}")
+    for column in IMPORT_OPTIONAL_COLUMNS:
+        if column not in df.columns:
+            df[column] = ''
+    df = df[IMPORT_REQUIRED_COLUMNS + IMPORT_OPTIONAL_COLUMNS].apply(lambda col: col.str.strip())
+    df.insert(0, 'row_number', df.index + 2)
+
+    is_manager_text = df['is_manager'].str.lower()
+    checks = [
+        ((df[IMPORT_REQUIRED_COLUMNS] == '').any(axis=1), "Missing required value"),
+        (~df['email'].str.match(EMAIL_PATTERN), "Invalid email format"),
+        ((df['manager_email'] != '') & ~df['manager_email'].str.match(EMAIL_PATTERN), "Invalid manager_email format"),
+        (~df['department'].isin(EMPLOYEE_DEPARTMENTS), f"Department must be one of {', '.join(EMPLOYEE_DEPARTMENTS)}"),
+        ((df['first_name'].str.len() > 50) | (df['last_name'].str.len() > 50) | (df['email'].str.len() > 100), "Value too long"),
+        (~is_manager_text.isin(TRUE_VALUES | FALSE_VALUES), "is_manager must be true/false"),
+        ((df['manager_email'] != '') & (df['manager_email'] == df['email']), "Employee cannot be their own manager"),
+        (df['email'].duplicated(keep=False) & (df['email'] != ''), "Email appears more than once in the file"),
+    ]
+    error_text = pd.Series('', index=df.index)
+    for mask, message in checks: # First failing check wins
+        error_text = error_text.mask(mask & (error_text == ''), message)
+
+    invalid = error_text != ''
+    errors = [{'row': int(r), 'email': e, 'error': m} for r, e, m in zip(df.loc[invalid, 'row_number'], df.loc[invalid, 'email'], error_text[invalid])]
+    valid_df = df.loc[~invalid].copy()
+    valid_df['is_manager'] = valid_df['is_manager'].str.lower().isin(TRUE_VALUES)
+    return valid_df, errors
+
+
+# --- Staged Load ---
+STAGING_DDL = """
+    CREATE TEMP TABLE employee_import_staging (
+        row_number INT PRIMARY KEY,
+        first_name VARCHAR(50), last_name VARCHAR(50), email VARCHAR(100), department VARCHAR(50),
+        manager_email VARCHAR(100), is_manager BOOLEAN,
+        employee_id INT, manager_id INT, level INT, error TEXT
+    ) ON COMMIT DROP;
+"""
+
+# Set-based checks against existing employees, in order; each only touches rows without an error yet.
+STAGING_CHECKS = [
+    ("Email already belongs to an existing employee", """
+        UPDATE employee_import_staging s SET error = %(message)s
+        FROM Employees e WHERE e.email = s.email AND s.error IS NULL;
+    """),
+    ("Manager email not found in Employees or in this file", """
+        UPDATE employee_import_staging s SET error = %(message)s
+        WHERE s.error IS NULL
+          AND NOT EXISTS (SELECT 1 FROM Employees e WHERE e.email = s.manager_email)
+          AND NOT EXISTS (SELECT 1 FROM employee_import_staging m WHERE m.email = s.manager_email);
+    """),
+    ("Manager email belongs to an employee who is not a manager", """
+        UPDATE employee_import_staging s SET error = %(message)s
+        FROM Employees e WHERE e.email = s.manager_email AND e.is_manager = FALSE AND s.error IS NULL;
+    """),
+]
+
+# Level 0 rows report to an existing employee; deeper rows report to a staged row one level up.
+# Employee ids are preallocated from the Employees sequence for every reached row; rows never reached
+# (their manager row failed, or the file contains a reporting cycle) are rejected.
+STAGING_LEVELS = """
+    WITH RECURSIVE levels AS (
+        SELECT s.row_number, s.email, 0 AS level
+        FROM employee_import_staging s JOIN Employees e ON e.email = s.manager_email
+        WHERE s.error IS NULL
+        UNION ALL
+        SELECT s.row_number, s.email, l.level + 1
+        FROM employee_import_staging s JOIN levels l ON s.manager_email = l.email
+        WHERE s.error IS NULL
+    )
+    UPDATE employee_import_staging s
+    SET level = l.level, employee_id = nextval(pg_get_serial_sequence('employees', 'employee_id'))
+    FROM levels l WHERE l.row_number = s.row_number;
+"""
+
+STAGING_RESOLVE = """
+    UPDATE employee_import_staging SET error = 'Manager row was rejected, or the file contains a reporting cycle'
+    WHERE error IS NULL AND level IS NULL;
+
+    -- Anyone with imported reports must be a manager for the approval queue to work.
+    UPDATE employee_import_staging s SET is_manager = TRUE
+    WHERE s.error IS NULL AND NOT s.is_manager
+      AND EXISTS (SELECT 1 FROM employee_import_staging r WHERE r.manager_email = s.email AND r.error IS NULL);
+"""
+
+# Managers resolve to an existing employee or to another accepted row's preallocated id; the
+# statement-level EmployeeHierarchy trigger handles chains of new managers within the batch.
+STAGING_INSERT = """
+    INSERT INTO Employees (employee_id, first_name, last_name, email, department, manager_id, is_manager)
+    SELECT s.employee_id, s.first_name, s.last_name, s.email, s.department, COALESCE(e.employee_id, m.employee_id), s.is_manager
+    FROM employee_import_staging s
+    LEFT JOIN Employees e ON e.email = s.manager_email
+    LEFT JOIN employee_import_staging m ON m.email = s.manager_email AND m.error IS NULL
+    WHERE s.error IS NULL
+    RETURNING employee_id, email;
+"""
+
+# --- Activation Tokens ---
+ACTIVATION_TOKENS_UPSERT = """
+    INSERT INTO EmployeeActivationTokens (employee_id, token_hash, issued_by, expires_at) VALUES %s
+    ON CONFLICT (employee_id) DO UPDATE SET token_hash = excluded.token_hash, issued_by = excluded.issued_by,
+        created_at = CURRENT_TIMESTAMP, expires_at = excluded.expires_at;
+"""
+ACTIVATION_TOKEN_TEMPLATE = f"(%s, %s, %s, CURRENT_TIMESTAMP + INTERVAL '{ACTIVATION_TOKEN_TTL_DAYS} days')"
+UNACTIVATED_EMPLOYEE_QUERY = """
+    SELECT e.employee_id FROM Employees e
+    WHERE e.email = %s AND NOT EXISTS (SELECT 1 FROM UserCredentials uc WHERE uc.employee_id = e.employee_id);
+"""
+
+def activation_token_hash(token):
+    """Only the hash is stored, so reading EmployeeActivationTokens does not yield usable links."""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+def activation_path(token):
+    return f"/signup?activation_token={urllib.parse.quote(token)}"
+
+def issue_activation_tokens(cur, employee_ids, issued_by):
+    """Creates (or replaces) a token per employee in the caller's transaction. Returns {employee_id: token}."""
+    tokens = {employee_id: secrets.token_urlsafe(32) for employee_id in employee_ids}
+    if tokens:
+        psycopg2.extras.execute_values(cur, ACTIVATION_TOKENS_UPSERT, [(employee_id, activation_token_hash(token), issued_by) for employee_id, token in tokens.items()],
+                                       template=ACTIVATION_TOKEN_TEMPLATE, page_size=1000)
+    return tokens
+
+def reissue_activation_token(app, email, issued_by=None):
+    """New activation token for an employee without credentials (e.g. the first one expired). Returns it, or None."""
+    conn = get_db_connection(app)
+    if not conn: return None
+    try:
+        with conn.cursor() as cur:
+            cur.execute(UNACTIVATED_EMPLOYEE_QUERY, (email,))
+            row = cur.fetchone()
+            if not row:
+                app.logger.warning(f"reissue_activation_token: No employee without an account has email {email}.")
+                return None
+            token = issue_activation_tokens(cur, [row[0]], issued_by)[row[0]]
+        conn.commit()
+        app.logger.info(f"reissue_activation_token: Issued a new activation token for employee_id {row[0]}.")
+        return token
+    except psycopg2.Error as e:
+        conn.rollback()
+        app.logger.error(f"reissue_activation_token: Database error: {e}")
+        return None
+    finally:
+        conn.close()
+
+def import_employees(app, valid_df, default_manager_email, issued_by=None):
+    """
+    Loads validated rows through COPY into a temp staging table, resolves manager links with
+    set-based SQL and inserts the accepted rows in one transaction. Rows with a blank
+    manager_email report to default_manager_email. Imported employees have no credentials
+    until they sign up through their activation link; a token per employee is issued in the
+    same transaction, on behalf of issued_by (the importing manager's employee_id).
+    Returns (inserted_count, errors, activations) with activations a list of (email, token);
+    raises psycopg2.Error after rolling back.
+    """
+    conn = get_db_connection(app)
+    if not conn: raise psycopg2.OperationalError("Database connection error.")
+    started = time.perf_counter()
+    try:
+        staged = valid_df.copy()
+        staged['manager_email'] = staged['manager_email'].mask(staged['manager_email'] == '', default_manager_email)
+        buffer = io.StringIO()
+        staged[['row_number', 'first_name', 'last_name', 'email', 'department', 'manager_email', 'is_manager']].to_csv(buffer, index=False, header=False)
+        buffer.seek(0)
+        with conn.cursor() as cur:
+            cur.execute(STAGING_DDL)
+            cur.copy_expert(
+                "COPY employee_import_staging (row_number, first_name, last_name, email, department, manager_email, is_manager) FROM STDIN WITH (FORMAT csv)",
+                buffer)
+            cur.execute("CREATE INDEX ON employee_import_staging (email); CREATE INDEX ON employee_import_staging (manager_email); ANALYZE employee_import_staging;")
+            for message, statement in STAGING_CHECKS:
+                cur.execute(statement, {'message': message})
+            cur.execute(STAGING_LEVELS)
+            cur.execute(STAGING_RESOLVE)
+            cur.execute(STAGING_INSERT)
+            inserted = cur.fetchall()
+            inserted_count = len(inserted)
+            tokens = issue_activation_tokens(cur, [employee_id for employee_id, _ in inserted], issued_by)
+            activations = [(email, tokens[employee_id]) for employee_id, email in inserted]
+            cur.execute("SELECT row_number, email, error FROM employee_import_staging WHERE error IS NOT NULL ORDER BY row_number;")
+            errors = [{'row': r[0], 'email': r[1], 'error': r[2]} for r in cur.fetchall()]
+        conn.commit()
+        app.logger.info(f"import_employees: Inserted {inserted_count} employee(s), rejected {len(errors)} row(s) in {(time.perf_counter() - started) * 1000.0:.1f} ms.")
+        return inserted_count, errors, activations
+    except psycopg2.Error as e:
+        conn.rollback()
+        app.logger.error(f"import_employees: Database error during import: {e}")
+        raise
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Issue a new activation link for an imported employee who has not signed up yet.")
+    parser.add_argument('emails', nargs='+', help="Employee emails.")
+    parser.add_argument('--base-url', default='http://127.0.0.1:8050', help="Prefix for the printed links.")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    cli_app = SimpleNamespace(logger=logging.getLogger('employee_import'))
+    for email in args.emails:
+        token = reissue_activation_token(cli_app, email)
+        print(f"{email}: {args.base_url.rstrip('/')}{activation_path(token)}" if token else f"{email}: no employee without an account")
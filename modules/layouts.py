@@ -1,7 +1,14 @@
 import dash_bootstrap_components as dbc
 from dash import html, dcc, dash_table
 from dash_iconify import DashIconify
+from .access_expiry import ACCESS_DURATION_OPTIONS, format_access_duration
+from .employee_import import ACTIVATION_TOKEN_TTL_DAYS
 import urllib.parse # For parsing query strings
+import functools # For memoizing the dashboard layouts
+
+# Dashboard layouts depend only on is_manager and first_name, so each distinct pair is built once per process.
+# The cached component trees are shared between renders and must not be mutated.
+LAYOUT_CACHE_SIZE = 1024
 
 # --- Login Layout ---
 login_layout = dbc.Container([
@@ -39,7 +46,7 @@ login_layout = dbc.Container([
                         ]),
                         html.Li([
                             DashIconify(icon="carbon:checkbox-checked", className="me-2 text-primary"),
-                            html.Strong("Approval Queue (Managers):"), " If you are a manager, this section will show requests from your team. Click a row to approve or reject."
+                            html.Strong("Approval Queue (Managers):"), " If you are a manager, this section will show requests from your team. Select a row to approve or reject, or select several to act on them in bulk."
                         ]),
                         html.Li([
                             DashIconify(icon="carbon:report", className="me-2 text-primary"),
@@ -85,11 +92,22 @@ login_layout = dbc.Container([
 
 
 # --- Signup Layout ---
-def create_signup_layout(app, manager_email=None, manager_name=None):
-    app.logger.info(f"Creating signup layout. Manager email: {manager_email}, Manager name: {manager_name}")
+def create_signup_layout(app, manager_email=None, manager_name=None, activation=None):
+    """
+    activation is set for /signup?activation_token=... links: the imported employee's first_name, last_name,
+    email and department plus the token, or {'error': message} when the token is unknown or expired.
+    The imported details are shown read-only; only the password is chosen here.
+    """
+    app.logger.info(f"Creating signup layout. Manager email: {manager_email}, Manager name: {manager_name}, activation: {activation is not None}")
     header_text = "Manager Sign Up"
     managed_by_info = []
-    if manager_email and manager_name:
+    activating = bool(activation and 'error' not in activation)
+    employee = activation if activating else {}
+    if activation is not None:
+        header_text = "Activate Your Account"
+        managed_by_info = [dbc.Alert(activation['error'], color="danger")] if not activating else [
+            html.P("Your manager added you to the system. Choose a password to activate your account.", className="mb-3")]
+    elif manager_email and manager_name:
         header_text = "Subordinate Sign Up"
         managed_by_info = [
             html.Div([
@@ -100,6 +118,7 @@ def create_signup_layout(app, manager_email=None, manager_name=None):
 
     return dbc.Container([
         dcc.Store(id='signup-manager-email-store', data=manager_email), # Store manager_email for the callback
+        dcc.Store(id='signup-activation-token-store', data=employee.get('token')),
         dbc.Row(dbc.Col(html.H1(header_text, className="display-5 fw-bold"), width=12), className="my-4 text-center"),
         dbc.Row(dbc.Col(dbc.Card([
             dbc.CardHeader(html.H4("Create Your Account", className="mb-0")),
@@ -109,15 +128,18 @@ def create_signup_layout(app, manager_email=None, manager_name=None):
                     dbc.Row([
                         dbc.Col([
                             dbc.Label("First Name", html_for="signup-firstname-input"),
-                            dbc.Input(id="signup-firstname-input", type="text", placeholder="Enter first name", required=True),
+                            dbc.Input(id="signup-firstname-input", type="text", placeholder="Enter first name", required=True,
+                                      value=employee.get('first_name'), disabled=activating),
                         ], md=6, className="mb-3"),
                         dbc.Col([
                             dbc.Label("Last Name", html_for="signup-lastname-input"),
-                            dbc.Input(id="signup-lastname-input", type="text", placeholder="Enter last name", required=True),
+                            dbc.Input(id="signup-lastname-input", type="text", placeholder="Enter last name", required=True,
+                                      value=employee.get('last_name'), disabled=activating),
                         ], md=6, className="mb-3"),
                     ]),
                     dbc.Label("Email", html_for="signup-email-input"),
-                    dbc.Input(id="signup-email-input", type="email", placeholder="your.email@example.com", required=True, className="mb-3"),
+                    dbc.Input(id="signup-email-input", type="email", placeholder="your.email@example.com", required=True, className="mb-3",
+                              value=employee.get('email'), disabled=activating),
 
                     dbc.Label("Department", html_for="signup-department-input"),
                     dcc.Dropdown(id="signup-department-dropdown",
@@ -130,6 +152,7 @@ def create_signup_layout(app, manager_email=None, manager_name=None):
                                      {'label': 'Other', 'value': 'Other'},
                                  ],
                                  placeholder="Select department",
+                                 value=employee.get('department'), disabled=activating,
                                  className="mb-3"),
 
                     dbc.Row([
@@ -142,7 +165,8 @@ def create_signup_layout(app, manager_email=None, manager_name=None):
                             dbc.Input(id="signup-confirm-password-input", type="password", placeholder="Confirm password", required=True),
                         ], md=6, className="mb-3"),
                     ]),
-                    dbc.Button("Sign Up", id="signup-button", color="success", className="w-100 mt-3 py-2", n_clicks=0, size="lg"),
+                    dbc.Button("Activate Account" if activating else "Sign Up", id="signup-button", color="success", className="w-100 mt-3 py-2", n_clicks=0, size="lg",
+                               disabled=activation is not None and not activating),
                     html.Div(id="signup-status-message", className="mt-3 text-center"),
                     html.Div(dcc.Link("Back to Login", href="/login"), className="mt-3 text-center"),
                 ])
@@ -151,12 +175,65 @@ def create_signup_layout(app, manager_email=None, manager_name=None):
     ], className="py-5")
 
 
+# --- Request Search Panel (shared by the approval history and audit views; scope picks the result set) ---
+def create_request_search_panel(scope):
+    markdown_columns = ['justification', 'approver_comments']
+    return html.Div([
+        dcc.Store(id={'type': 'request-search-store', 'scope': scope}),
+        dcc.Input(id={'type': 'request-search-input', 'scope': scope}, type="search", debounce=True, className="form-control mb-2",
+                  placeholder='Search justifications and comments, e.g. JIRA-1234 or "month end" -test'),
+        html.Div(id={'type': 'request-search-feedback', 'scope': scope}),
+        dash_table.DataTable(
+            id={'type': 'request-search-results', 'scope': scope},
+            columns=[{'name': 'ID', 'id': 'request_id'}, {'name': 'Requester', 'id': 'requester_name'},
+                     {'name': 'Table', 'id': 'table_full_name'}, {'name': 'Status', 'id': 'status'},
+                     {'name': 'Requested', 'id': 'request_date_str'}] +
+                    [{'name': name, 'id': column, 'presentation': 'markdown'} for name, column in zip(['Justification', 'Approver Comments'], markdown_columns)],
+            data=[],
+            style_cell={'textAlign': 'left', 'padding': '8px', 'whiteSpace': 'normal', 'height': 'auto', 'minWidth': '80px', 'maxWidth': '300px'},
+            style_header={'fontWeight': '600', 'backgroundColor': '#e9ecef'},
+            style_table={'overflowX': 'auto'},
+            markdown_options={'html': False},
+        ),
+        html.Div([
+            dbc.Button("Previous", id={'type': 'request-search-prev', 'scope': scope}, color="secondary", outline=True, size="sm", disabled=True),
+            dbc.Button("Next", id={'type': 'request-search-next', 'scope': scope}, color="secondary", outline=True, size="sm", disabled=True, className="ms-1"),
+        ], className="mt-2"),
+    ], className="mb-3")
+
+# --- Catalog Browser Nodes (rendered lazily by the expand / load-more callbacks) ---
+def create_catalog_children(node_key, children, offset, has_more):
+    items = []
+    for child in children:
+        if child['kind'] == 'table':
+            items.append(html.Div(dbc.Button([DashIconify(icon="carbon:add", className="me-1"), child['label']],
+                                             id={'type': 'catalog-table', 'table_id': child['table_id'], 'label': child['full_name']},
+                                             color="link", size="sm", className="p-0 text-start", title="Add to this request")))
+        else:
+            items.append(html.Div([
+                dbc.Button([DashIconify(icon="carbon:chevron-right", className="me-1"), child['label'],
+                            dbc.Badge(f"{child['count']:,}", color="light", text_color="dark", className="ms-2")],
+                           id={'type': 'catalog-node', 'node': child['key']}, color="link", size="sm", className="p-0 text-start"),
+                html.Div(id={'type': 'catalog-children', 'node': child['key']}, style={'marginLeft': '1.25rem'}),
+            ]))
+    if has_more:
+        next_offset = offset + len(children)
+        items.append(html.Div(
+            dbc.Button("Load more...", id={'type': 'catalog-more', 'node': node_key, 'offset': next_offset}, color="link", size="sm", className="p-0"),
+            id={'type': 'catalog-more-slot', 'node': node_key, 'offset': next_offset}))
+    if not items and offset == 0:
+        items.append(html.Div("Nothing here yet.", className="text-muted small"))
+    return items
+
 # --- Sidebar Layout ---
 def create_sidebar(app, session_data):
     user_first_name = session_data.get('first_name', 'User')
-    is_manager = session_data.get('is_manager', False) # Get manager status
+    is_manager = bool(session_data.get('is_manager', False)) # Get manager status
     app.logger.info(f"Creating sidebar for {user_first_name}. Is manager: {is_manager}")
+    return _build_sidebar(user_first_name, is_manager)
 
+@functools.lru_cache(maxsize=LAYOUT_CACHE_SIZE)
+def _build_sidebar(user_first_name, is_manager):
     nav_items = [
         dbc.NavLink([DashIconify(icon="carbon:table-of-contents", className="me-2"), "My Requests"], href="/dashboard?section=my-requests", id="navlink-my-requests", className="mb-1"),
     ]
@@ -165,7 +242,9 @@ def create_sidebar(app, session_data):
         nav_items.extend([
             dbc.NavLink([DashIconify(icon="carbon:checkbox-checked", className="me-2"), "Approval Queue"], href="/dashboard?section=approvals", id="navlink-approvals", className="mb-1"),
             dbc.NavLink([DashIconify(icon="carbon:report", className="me-2"), "Generate Reports"], href="/dashboard?section=reports", id="navlink-reports", className="mb-1"),
+            dbc.NavLink([DashIconify(icon="carbon:chart-line", className="me-2"), "Analytics"], href="/dashboard?section=analytics", id="navlink-analytics", className="mb-1"),
             dbc.NavLink([DashIconify(icon="carbon:link", className="me-2"), "Invite Subordinate"], href="/dashboard?section=invite", id="navlink-invite", className="mb-1"),
+            dbc.NavLink([DashIconify(icon="carbon:document-import", className="me-2"), "Import Employees"], href="/dashboard?section=import", id="navlink-import", className="mb-1"),
         ])
 
     return dbc.Col([
@@ -186,18 +265,43 @@ def create_sidebar(app, session_data):
 
 # --- Main Content Area Layout (for the dashboard) ---
 def create_main_content_area(app, session_data, section=None):
-    is_manager = session_data.get('is_manager', False)
+    is_manager = bool(session_data.get('is_manager', False))
     app.logger.info(f"Creating main content area. Is manager: {is_manager}. Requested section (for scroll/highlight): {section}")
+    # Only the section store varies per render; everything below it is memoized per is_manager.
+    return dbc.Col([dcc.Store(id='dashboard-active-section-store', data=section)] + list(_build_main_content_children(is_manager)), id="page-content")
 
+@functools.lru_cache(maxsize=2)
+def _build_main_content_children(is_manager):
     new_request_modal = dbc.Modal(
         [
             dbc.ModalHeader(dbc.ModalTitle("Submit New Access Request")),
             dbc.ModalBody([
                 dbc.Form([
-                    dbc.Row([dbc.Col(dbc.Label("Target Database Table", html_for="new-request-table-dropdown")),], className="mb-1"),
-                    dbc.Row([dbc.Col(dcc.Dropdown(id="new-request-table-dropdown", placeholder="Select Table..."),width=12)], className="mb-3"),
-                    dbc.Row([dbc.Col(dbc.Label("Required Access Level", html_for="new-request-role-dropdown")),], className="mb-1"),
+                    dbc.Row([dbc.Col(dbc.Label("Target Database Tables", html_for="new-request-table-dropdown")),], className="mb-1"),
+                    # Options come from a server-side search (debounced) instead of loading every table
+                    dbc.Row([dbc.Col(dcc.Input(id="new-request-table-search-input", type="search", debounce=0.3, className="form-control",
+                                               placeholder="Search tables by name (at least 2 characters)..."), width=12)], className="mb-2"),
+                    dbc.Row([dbc.Col(dcc.Dropdown(id="new-request-table-dropdown", placeholder="Select one or more tables from the search results...", multi=True),width=12)], className="mb-1"),
+                    dbc.Row([dbc.Col([
+                        dbc.Button([DashIconify(icon="carbon:tree-view", className="me-1"), "Browse catalog"], id="catalog-browser-toggle-button", color="link", size="sm", className="p-0"),
+                        dbc.Collapse(html.Div(id="catalog-browser-root", className="border rounded p-2 mt-1", style={'maxHeight': '300px', 'overflowY': 'auto'}),
+                                     id="catalog-browser-collapse", is_open=False),
+                    ], width=12)], className="mb-3"),
+                    dbc.Row([dbc.Col(dbc.Label("Default Access Level (applied to all selected tables)", html_for="new-request-role-dropdown")),], className="mb-1"),
                     dbc.Row([dbc.Col(dcc.Dropdown(id="new-request-role-dropdown", placeholder="Select Role..."), width=12)], className="mb-3"),
+                    # One row per selected table; the access level can be changed per table
+                    dbc.Row([dbc.Col(dash_table.DataTable(
+                        id='new-request-items-table',
+                        columns=[{'name': 'Table', 'id': 'table_full_name', 'editable': False},
+                                 {'name': 'Access Level', 'id': 'role_id', 'presentation': 'dropdown', 'editable': True}],
+                        data=[], editable=True, dropdown={},
+                        style_cell={'textAlign': 'left', 'padding': '8px'},
+                        style_header={'fontWeight': '600', 'backgroundColor': '#e9ecef'},
+                        css=[{'selector': '.Select-menu-outer', 'rule': 'display: block !important'}],
+                    ), width=12)], className="mb-3"),
+                    dbc.Row([dbc.Col(dbc.Label("Access Duration", html_for="new-request-duration-dropdown")),], className="mb-1"),
+                    dbc.Row([dbc.Col(dcc.Dropdown(id="new-request-duration-dropdown", clearable=False, value=90, # 0 = no expiry
+                                                  options=[{'label': format_access_duration(d), 'value': d} for d in ACCESS_DURATION_OPTIONS + [0]]), width=12)], className="mb-3"),
                     dbc.Row([dbc.Col(dbc.Label("Justification", html_for="new-request-justification-textarea")),], className="mb-1"),
                     dbc.Row([dbc.Col(dbc.Textarea(id="new-request-justification-textarea", placeholder="Explain why you need this access (min 20 characters)", style={'minHeight': '100px'}), width=12)], className="mb-3"),
                     html.Div(id="new-request-form-feedback", className="mt-2")
@@ -235,12 +339,13 @@ def create_main_content_area(app, session_data, section=None):
     approval_section_ui = dbc.Card([
         dbc.CardHeader(html.H4("Requests Requiring My Action / History", className="mb-0"), id="approvals-header"),
         dbc.CardBody([
+            dbc.Switch(id="approval-org-scope-switch", label="Include my whole org (skip-level reports)", value=False, className="mb-2"),
             dash_table.DataTable(
                 id='approval-requests-table',
                 style_cell={'textAlign': 'left', 'padding': '10px', 'whiteSpace': 'normal', 'height': 'auto', 'minWidth': '100px', 'maxWidth': '200px', 'overflow': 'hidden', 'textOverflow': 'ellipsis'},
                 style_header={'fontWeight': '600', 'backgroundColor': '#e9ecef'},
                 style_table={'overflowX': 'auto'},
-                page_size=5, row_selectable='single', selected_rows=[],
+                page_size=5, row_selectable='multi', selected_rows=[],
                 tooltip_data=[
                     {
                         column: {'value': str(value), 'type': 'markdown'}
@@ -249,7 +354,9 @@ def create_main_content_area(app, session_data, section=None):
                 ],
                 tooltip_duration=None,
             ),
-            html.Div(id='approval-action-panel', className="mt-3 p-3 border rounded", style={'display': 'none'})
+            html.Div(id='approval-action-panel', className="mt-3 p-3 border rounded", style={'display': 'none'}),
+            html.H5("Search Approval History", className="mt-4"),
+            create_request_search_panel('approvals'),
         ])
     ], id="approval-section-card", style={'display': 'block' if is_manager else 'none'})
 
@@ -268,6 +375,33 @@ def create_main_content_area(app, session_data, section=None):
         ])
     ], id="invite-section-card", style={'display': 'block' if is_manager else 'none'})
 
+    # Bulk onboarding: rows with a blank manager_email are placed under the importing manager
+    import_section_ui = dbc.Card([
+        dbc.CardHeader(html.H4("Import Employees (CSV)", className="mb-0"), id="import-header"),
+        dbc.CardBody([
+            html.P(["Columns: ", html.Code("first_name, last_name, email, department"), " and optionally ",
+                    html.Code("manager_email, is_manager"), ". A blank manager_email places the employee under you. "
+                    "You get a CSV of single-use activation links, one per imported employee; send each employee their own link. "
+                    f"Links expire after {ACTIVATION_TOKEN_TTL_DAYS} days. Imported employees cannot sign up without one."]),
+            dcc.Upload(
+                id='employee-import-upload',
+                children=html.Div([DashIconify(icon="carbon:upload", className="me-2"), "Drag and drop or ", html.A("select a CSV file")]),
+                accept='.csv,text/csv', max_size=50 * 1024 * 1024, multiple=False,
+                style={'borderWidth': '1px', 'borderStyle': 'dashed', 'borderRadius': '5px', 'textAlign': 'center', 'padding': '20px'},
+            ),
+            dcc.Loading(html.Div(id="employee-import-feedback", className="mt-2")),
+            dcc.Download(id="employee-import-activation-download"),
+            dash_table.DataTable(
+                id='employee-import-errors-table',
+                columns=[{'name': 'CSV Line', 'id': 'row'}, {'name': 'Email', 'id': 'email'}, {'name': 'Error', 'id': 'error'}],
+                data=[], page_size=10,
+                style_cell={'textAlign': 'left', 'padding': '8px'},
+                style_header={'fontWeight': '600', 'backgroundColor': '#e9ecef'},
+                style_table={'overflowX': 'auto', 'display': 'none'},
+            ),
+        ])
+    ], id="import-section-card")
+
 
     content_to_display = [my_requests_section_ui] # My Requests is always visible
     if is_manager:
@@ -280,24 +414,62 @@ def create_main_content_area(app, session_data, section=None):
                     dbc.Col(dcc.Dropdown(id='report-type-dropdown',
                         options=[ {'label': 'Access Request Audit Log', 'value': 'audit_log'},
                                   {'label': 'User Access Permissions Report', 'value': 'user_permissions'},
-                                  {'label': 'Pending Access Requests Report', 'value': 'pending_requests'}, ],
+                                  {'label': 'Pending Access Requests Report', 'value': 'pending_requests'},
+                                  {'label': 'Approval Latency Percentiles (SLA) Report', 'value': 'approval_latency'}, ],
                         placeholder="Select a report type...", className="mb-2"
                     ), md=7),
                     dbc.Col(dbc.Button([DashIconify(icon="carbon:download", className="me-2"),"Download Report (CSV)"], id="download-report-button", color="info", className="w-100"), md=5),
                 ], className="mb-3 align-items-center"),
+                dbc.Switch(id="report-org-scope-switch", label="Only requests from my whole org", value=False, className="mb-2"),
                 dcc.Download(id="download-csv"),
-                html.Div(id="report-generation-feedback", className="mt-2")
+                html.Div(id="report-generation-feedback", className="mt-2"),
+                html.H5("Search Audit Log", className="mt-4"),
+                create_request_search_panel('audit'),
             ])
         ], id="reports-section-card")
         content_to_display.append(reports_section_ui)
+        # Analytics charts read the pre-aggregated DailyRequestRollup, never raw AccessRequests
+        analytics_section_ui = dbc.Card([
+            dbc.CardHeader(html.H4("Analytics", className="mb-0"), id="analytics-header"),
+            dbc.CardBody([
+                dbc.Row([
+                    dbc.Col(dcc.Dropdown(id='analytics-groupby-dropdown',
+                        options=[ {'label': 'By Department', 'value': 'department'},
+                                  {'label': 'By Table', 'value': 'table'},
+                                  {'label': 'By Role', 'value': 'role'}, ],
+                        value='department', clearable=False, className="mb-2"
+                    ), md=6),
+                    dbc.Col(dcc.Dropdown(id='analytics-range-dropdown',
+                        options=[ {'label': 'Last 30 days', 'value': 30},
+                                  {'label': 'Last 90 days', 'value': 90},
+                                  {'label': 'Last 365 days', 'value': 365}, ],
+                        value=30, clearable=False, className="mb-2"
+                    ), md=6),
+                ], className="mb-3"),
+                dcc.Graph(id='analytics-volume-graph', config={'displayModeBar': False}),
+                dbc.Row([
+                    dbc.Col(dcc.Graph(id='analytics-approval-rate-graph', config={'displayModeBar': False}), md=6),
+                    dbc.Col(dcc.Graph(id='analytics-decision-time-graph', config={'displayModeBar': False}), md=6),
+                ]),
+                html.Div(id="analytics-feedback", className="mt-2")
+            ])
+        ], id="analytics-section-card")
+        content_to_display.append(analytics_section_ui)
         content_to_display.append(invite_section_ui)
+        content_to_display.append(import_section_ui)
 
 
-    return dbc.Col([
-        dcc.Store(id='dashboard-active-section-store', data=section),
+    return tuple([
         dcc.Interval(id='dashboard-load-trigger', interval=100, n_intervals=0, max_intervals=1),
         dcc.Store(id='selected-request-id-store'),
         dcc.Store(id='selected-approval-request-id-store'),
+        dcc.Store(id='selected-approval-request-ids-store'), # All selected request IDs, for bulk actions
+        dcc.Store(id='new-request-idempotency-store'), # Fresh token per modal open; makes submit retries safe
         html.Div(id='action-feedback-alert-placeholder', className="mb-3 sticky-top", style={'zIndex': 1050}),
         new_request_modal,
-    ] + content_to_display, id="page-content")
\ No newline at end of file
+    ] + content_to_display)
+
+def clear_layout_caches():
+    """Drops the memoized dashboard layouts (benchmarks use this to time cold builds)."""
+    _build_sidebar.cache_clear()
+    _build_main_content_children.cache_clear()
\ No newline at end of file
@@ -0,0 +1,229 @@
+# modules/org_tree.py
+import threading
+import time
+from array import array
+
+import psycopg2
+import psycopg2.extensions
+
+from .db import get_db_connection
+
+ORG_CHANGE_CHANNEL = 'employees_changed' # NOTIFY channel fed by the trg_employees_notify_* triggers
+ORG_CHANGE_RELOAD_PAYLOAD = '*' # Sent instead of ids for large bulk changes
+ORG_TREE_LOAD_BATCH = 10000 # Rows per round trip when bulk-loading the snapshot
+# Without a LISTEN connection the snapshot cannot see other workers' changes; reload it this often (seconds).
+# LISTEN is retried at the same interval.
+ORG_TREE_FALLBACK_RELOAD_INTERVAL = 60.0
+# More pending change events than this are cheaper to handle with a full reload.
+ORG_TREE_MAX_INCREMENTAL_IDS = 5000
+
+NO_MANAGER = -1
+
+
+class OrgTree:
+    """
+    Compact in-process snapshot of the org chart: manager_id and is_manager are arrays
+    indexed by employee_id, with email -> id and id -> display name maps, so manager checks
+    and name rendering are O(1) without touching the database.
+    """
+
+    def __init__(self):
+        self.manager_of = array('i')
+        self.manager_flags = bytearray()
+        self.email_to_id = {}
+        self.display_names = {}
+        self.emails = {}
+        self._lock = threading.Lock()
+
+    # --- Building ---
+    def _ensure_capacity(self, employee_id):
+        missing = employee_id + 1 - len(self.manager_of)
+        if missing > 0:
+            self.manager_of.extend([NO_MANAGER] * missing)
+            self.manager_flags.extend(bytes(missing))
+
+    def apply_rows(self, rows):
+        """Upserts (employee_id, manager_id, is_manager, email, first_name, last_name) rows."""
+        with self._lock:
+            for employee_id, manager_id, is_manager, email, first_name, last_name in rows:
+                self._ensure_capacity(employee_id)
+                old_email = self.emails.get(employee_id)
+                if old_email is not None and old_email != email:
+                    self.email_to_id.pop(old_email, None)
+                self.manager_of[employee_id] = NO_MANAGER if manager_id is None else manager_id
+                self.manager_flags[employee_id] = 1 if is_manager else 0
+                self.email_to_id[email] = employee_id
+                self.emails[employee_id] = email
+                self.display_names[employee_id] = f"{first_name} {last_name}"
+
+    def remove(self, employee_ids):
+        with self._lock:
+            for employee_id in employee_ids:
+                email = self.emails.pop(employee_id, None)
+                if email is not None:
+                    self.email_to_id.pop(email, None)
+                self.display_names.pop(employee_id, None)
+                if employee_id < len(self.manager_of):
+                    self.manager_of[employee_id] = NO_MANAGER
+                    self.manager_flags[employee_id] = 0
+
+    # --- Lookups ---
+    def manager_id(self, employee_id):
+        if employee_id is None or not 0 <= employee_id < len(self.manager_of): return None
+        manager_id = self.manager_of[employee_id]
+        return None if manager_id == NO_MANAGER else manager_id
+
+    def is_manager(self, employee_id):
+        return employee_id is not None and 0 <= employee_id < len(self.manager_flags) and self.manager_flags[employee_id] == 1
+
+    def display_name(self, employee_id, default=None):
+        return self.display_names.get(employee_id, default)
+
+    def find_manager_by_email(self, email):
+        """Returns the employee_id for email if that employee is a manager, else None."""
+        employee_id = self.email_to_id.get(email)
+        return employee_id if self.is_manager(employee_id) else None
+
+    def approver_display_name(self, employee_id):
+        """Designated approver for a Pending request: direct manager, or System Admin for top-level managers."""
+        manager_id = self.manager_id(employee_id)
+        if manager_id is not None:
+            return self.display_name(manager_id, 'N/A')
+        return 'System Admin' if self.is_manager(employee_id) else 'N/A (Pending Config)'
+
+    def __len__(self):
+        return len(self.display_names)
+
+
+# --- Snapshot Lifecycle ---
+_org_tree_state = {'tree': None, 'listen_conn': None, 'loaded_at': 0.0, 'listen_attempted_at': 0.0}
+# Held by the one thread that syncs the snapshot (LISTEN, incremental refresh, reload); readers never wait on it
+# once a snapshot exists, they keep using the current one until the new one is swapped in.
+_org_tree_loader_lock = threading.Lock()
+
+EMPLOYEE_SNAPSHOT_QUERY = "SELECT employee_id, manager_id, is_manager, email, first_name, last_name FROM Employees"
+
+def load_org_tree(app):
+    """Bulk-loads a fresh OrgTree through a server-side cursor. Returns None on database errors."""
+    conn = get_db_connection(app)
+    if not conn: return None
+    try:
+        tree = OrgTree()
+        started = time.perf_counter()
+        with conn.cursor(name='org_tree_snapshot') as cur:
+            cur.itersize = ORG_TREE_LOAD_BATCH
+            cur.execute(EMPLOYEE_SNAPSHOT_QUERY + ";")
+            while True:
+                rows = cur.fetchmany(ORG_TREE_LOAD_BATCH)
+                if not rows: break
+                tree.apply_rows(rows)
+        conn.rollback()
+        app.logger.info(f"load_org_tree: Loaded {len(tree)} employees in {(time.perf_counter() - started) * 1000.0:.1f} ms.")
+        return tree
+    except psycopg2.Error as e:
+        app.logger.error(f"load_org_tree: Database error loading org tree: {e}")
+        return None
+    finally:
+        if conn: conn.close()
+
+def _open_listen_connection(app):
+    conn = get_db_connection(app)
+    if not conn: return None
+    try:
+        conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        with conn.cursor() as cur:
+            cur.execute(f"LISTEN {ORG_CHANGE_CHANNEL};")
+        return conn
+    except psycopg2.Error as e:
+        app.logger.error(f"org_tree: Could not LISTEN on {ORG_CHANGE_CHANNEL}: {e}")
+        conn.close()
+        return None
+
+def _drain_change_events(app, listen_conn):
+    """Returns the set of changed employee_ids (may include ORG_CHANGE_RELOAD_PAYLOAD), or None if the LISTEN connection is broken."""
+    try:
+        listen_conn.poll()
+    except psycopg2.Error as e:
+        app.logger.warning(f"org_tree: LISTEN connection lost: {e}")
+        return None
+    changed_ids = set()
+    while listen_conn.notifies:
+        payload = listen_conn.notifies.pop(0).payload
+        if payload == ORG_CHANGE_RELOAD_PAYLOAD:
+            changed_ids.add(payload)
+        elif payload.isdigit():
+            changed_ids.add(int(payload))
+    return changed_ids
+
+def refresh_org_tree_rows(app, tree, employee_ids):
+    """Re-reads the given employees and applies them to tree; ids no longer in Employees are removed."""
+    conn = get_db_connection(app)
+    if not conn: return False
+    try:
+        with conn.cursor() as cur:
+            cur.execute(EMPLOYEE_SNAPSHOT_QUERY + " WHERE employee_id = ANY(%s);", (list(employee_ids),))
+            rows = cur.fetchall()
+        tree.apply_rows(rows)
+        tree.remove(set(employee_ids) - {r[0] for r in rows})
+        app.logger.info(f"refresh_org_tree_rows: Applied {len(employee_ids)} employee change(s).")
+        return True
+    except psycopg2.Error as e:
+        app.logger.error(f"refresh_org_tree_rows: Database error refreshing org tree: {e}")
+        return False
+    finally:
+        conn.close()
+
+def _relisten(app):
+    """(Re)opens the LISTEN connection and records the attempt; returns whether it is open."""
+    _org_tree_state['listen_attempted_at'] = time.monotonic()
+    _org_tree_state['listen_conn'] = _open_listen_connection(app)
+    return _org_tree_state['listen_conn'] is not None
+
+def _sync_org_tree(app):
+    """Applies pending change events or reloads the snapshot. Caller holds _org_tree_loader_lock."""
+    tree, listen_conn = _org_tree_state['tree'], _org_tree_state['listen_conn']
+    if listen_conn is not None and listen_conn.closed:
+        # Events may have been missed while it was down. LISTEN before loading so no change between load and subscribe is missed.
+        _relisten(app)
+        tree = None
+    elif listen_conn is None:
+        # LISTEN unavailable: keep the snapshot (the interval check below reloads it) and retry at that interval.
+        if (tree is None or time.monotonic() - _org_tree_state['listen_attempted_at'] > ORG_TREE_FALLBACK_RELOAD_INTERVAL) \
+                and _relisten(app):
+            tree = None # Subscribed now; changes made before it are only in a fresh load
+    elif tree is not None:
+        changed_ids = _drain_change_events(app, listen_conn)
+        if changed_ids is None:
+            listen_conn.close()
+            _relisten(app)
+            tree = None
+        elif ORG_CHANGE_RELOAD_PAYLOAD in changed_ids or len(changed_ids) > ORG_TREE_MAX_INCREMENTAL_IDS:
+            tree = None
+        elif changed_ids and not refresh_org_tree_rows(app, tree, changed_ids):
+            tree = None
+
+    if tree is not None and _org_tree_state['listen_conn'] is None \
+            and time.monotonic() - _org_tree_state['loaded_at'] > ORG_TREE_FALLBACK_RELOAD_INTERVAL:
+        tree = None
+    if tree is None:
+        fresh_tree = load_org_tree(app) # Built aside; readers keep the old snapshot meanwhile
+        if fresh_tree is not None:
+            _org_tree_state['tree'], _org_tree_state['loaded_at'] = fresh_tree, time.monotonic()
+
+def get_org_tree(app):
+    """
+    Returns the process-wide OrgTree, loading it on first use. Pending NOTIFY events from
+    Employees changes (any worker) are applied incrementally before returning. While another
+    thread is syncing, the current snapshot is returned as is; only the very first load waits.
+    Returns None only if the snapshot has never loaded and the database is unavailable.
+    """
+    if _org_tree_state['tree'] is None:
+        with _org_tree_loader_lock:
+            if _org_tree_state['tree'] is None: # Double-checked: another thread may have loaded it while we waited
+                _sync_org_tree(app)
+    elif _org_tree_loader_lock.acquire(blocking=False):
+        try:
+            _sync_org_tree(app)
+        finally:
+            _org_tree_loader_lock.release()
+    return _org_tree_state['tree']
@@ -0,0 +1,99 @@
+# modules/passwords.py
+import base64
+import binascii
+import hashlib
+import hmac
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# scrypt work factor: each hash needs 128 * N * r bytes of memory (16 MiB at N=2**14, r=8) and tens of
+# milliseconds of CPU. Raising it only affects new hashes; existing ones are upgraded on the next login.
+# benchmarks/bench_login_throughput.py shows the per-login cost and throughput of each N.
+PASSWORD_SCRYPT_N = 2 ** 14
+PASSWORD_SCRYPT_R = 8
+PASSWORD_SCRYPT_P = 1
+PASSWORD_SALT_BYTES = 16
+PASSWORD_HASH_BYTES = 32
+# Hashing runs on a small thread pool (hashlib.scrypt releases the GIL), so at most PASSWORD_HASH_WORKERS
+# hashes per process use CPU and memory at once while other callbacks keep running. Logins beyond
+# PASSWORD_HASH_MAX_PENDING waiting ones are turned away instead of queueing without bound.
+PASSWORD_HASH_WORKERS = 2
+PASSWORD_HASH_MAX_PENDING = 32
+PASSWORD_HASH_SCHEME = 'scrypt'
+
+_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix='password-hash')
+_hash_slots = threading.BoundedSemaphore(PASSWORD_HASH_WORKERS + PASSWORD_HASH_MAX_PENDING)
+_dummy_hash = None # Verified against for unknown usernames, so they take as long as a wrong password
+_logger = logging.getLogger(__name__)
+
+
+class PasswordHashingBusy(Exception):
+    """Raised when more logins or sign-ups are waiting for a hashing thread than PASSWORD_HASH_MAX_PENDING."""
+
+
+# --- Hash Format ---
+# scrypt$N$r$p$salt$hash, with salt and hash base64-encoded.
+def _scrypt(password, salt, n, r, p):
+    return hashlib.scrypt(password.encode('utf-8'), salt=salt, n=n, r=r, p=p,
+                          maxmem=2 * 128 * n * r * p + (1 << 20), dklen=PASSWORD_HASH_BYTES)
+
+def hash_password_sync(password, n=PASSWORD_SCRYPT_N, r=PASSWORD_SCRYPT_R, p=PASSWORD_SCRYPT_P, salt=None):
+    """
+    Hashes password in the calling thread with a random salt. Callbacks should use hash_password instead.
+    Only reproducible fixtures (scripts/generate_synthetic_data.py) pass their own salt.
+    """
+    salt = salt if salt is not None else os.urandom(PASSWORD_SALT_BYTES)
+    digest = _scrypt(password, salt, n, r, p)
+    return f"{PASSWORD_HASH_SCHEME}${n}${r}${p}${base64.b64encode(salt).decode()}${base64.b64encode(digest).decode()}"
+
+def verify_password_sync(password, password_hash, legacy_password=None):
+    """
+    Checks password against a stored hash, or against a legacy plain-text password when there is no hash
+    yet. Returns (ok, needs_rehash); needs_rehash is True for legacy passwords and for hashes made with
+    other work factors, so the caller can store hash_password(password) once the login succeeded.
+    A malformed or unknown-scheme hash is logged and treated as a wrong password.
+    Runs in the calling thread; callbacks should use verify_password instead.
+    """
+    global _dummy_hash
+    if password_hash:
+        try:
+            scheme, n, r, p, salt, digest = password_hash.split('$')
+            if scheme != PASSWORD_HASH_SCHEME:
+                raise ValueError(f"Unknown password hash scheme: {scheme}")
+            n, r, p = int(n), int(r), int(p)
+            ok = hmac.compare_digest(_scrypt(password, base64.b64decode(salt, validate=True), n, r, p),
+                                     base64.b64decode(digest, validate=True))
+        except (ValueError, binascii.Error) as e:
+            _logger.warning(f"verify_password_sync: Malformed password hash: {e}")
+            return False, False
+        return ok, ok and (n, r, p) != (PASSWORD_SCRYPT_N, PASSWORD_SCRYPT_R, PASSWORD_SCRYPT_P)
+    if legacy_password is not None:
+        ok = hmac.compare_digest(password.encode('utf-8'), legacy_password.encode('utf-8'))
+        return ok, ok
+    if _dummy_hash is None:
+        _dummy_hash = hash_password_sync(os.urandom(16).hex())
+    verify_password_sync(password, _dummy_hash)
+    return False, False
+
+
+# --- Offloaded Hashing ---
+def _run_in_hash_pool(func, *args):
+    if not _hash_slots.acquire(blocking=False):
+        raise PasswordHashingBusy("Too many logins are waiting for password verification")
+    try:
+        future = _hash_executor.submit(func, *args)
+    except BaseException:
+        _hash_slots.release()
+        raise
+    future.add_done_callback(lambda _: _hash_slots.release())
+    return future.result()
+
+def hash_password(password):
+    """hash_password_sync on the hashing pool. Raises PasswordHashingBusy when the pool is saturated."""
+    return _run_in_hash_pool(hash_password_sync, password)
+
+def verify_password(password, password_hash, legacy_password=None):
+    """verify_password_sync on the hashing pool. Raises PasswordHashingBusy when the pool is saturated."""
+    return _run_in_hash_pool(verify_password_sync, password, password_hash, legacy_password)
@@ -0,0 +1,248 @@
+# modules/rate_limit.py
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from flask import request, has_request_context
+
+# Login attempts are throttled with token buckets, one per client IP and one per username: each attempt
+# takes a token from both, and tokens come back at a steady rate up to the burst size. handle_login checks
+# the buckets before it touches the database, so a credential-stuffing burst costs no queries.
+LOGIN_RATE_LIMIT_ENABLED = os.environ.get('LOGIN_RATE_LIMIT_ENABLED', '1') != '0' # '0' for load tests, where every virtual user shares one IP
+LOGIN_USERNAME_BURST = 5
+LOGIN_USERNAME_PER_MINUTE = 1.0
+LOGIN_IP_BURST = 30
+LOGIN_IP_PER_MINUTE = 20.0
+LOGIN_RATE_LIMIT_TRUST_FORWARDED_FOR = False # Set True behind exactly one reverse proxy that appends X-Forwarded-For
+# Buckets live in a SQLite file so all workers on the host share them; under /dev/shm it never touches disk.
+# An empty path keeps buckets per worker (each worker then allows the full burst).
+_DEFAULT_STORE_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+RATE_LIMIT_STORE_PATH = os.environ.get('RATE_LIMIT_STORE_PATH', os.path.join(_DEFAULT_STORE_DIR, 'access_request_rate_limit.sqlite3'))
+RATE_LIMIT_MEMORY_KEYS = 100000 # Buckets kept in memory per worker; least recently used ones are dropped
+RATE_LIMIT_PRUNE_EVERY = 1000 # Attempts between deletions of buckets that have refilled completely
+
+BUCKETS_TABLE_CREATE = """
+    CREATE TABLE IF NOT EXISTS LoginBuckets (
+        bucket_key TEXT PRIMARY KEY,
+        kind TEXT NOT NULL,
+        tokens REAL NOT NULL,
+        rate REAL NOT NULL, -- Tokens per second
+        updated_at REAL NOT NULL, -- Unix time; shared by processes, so not the monotonic clock
+        full_at REAL NOT NULL -- When the bucket is full again and the row can be pruned
+    );
+"""
+BUCKETS_SELECT = "SELECT bucket_key, tokens, updated_at FROM LoginBuckets WHERE bucket_key IN ({placeholders});"
+BUCKET_UPSERT = """
+    INSERT INTO LoginBuckets (bucket_key, kind, tokens, rate, updated_at, full_at) VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (bucket_key) DO UPDATE SET tokens = excluded.tokens, rate = excluded.rate,
+        updated_at = excluded.updated_at, full_at = excluded.full_at;
+"""
+BUCKETS_PRUNE = "DELETE FROM LoginBuckets WHERE full_at <= ?;"
+BUCKETS_STATE_QUERY = """
+    SELECT kind, COUNT(*), SUM(tokens + (? - updated_at) * rate < 1) FROM LoginBuckets WHERE full_at > ? GROUP BY kind;
+"""
+BUCKET_DELETE = "DELETE FROM LoginBuckets WHERE bucket_key = ?;"
+
+_metrics = {'allowed': 0, 'rejected_ip': 0, 'rejected_username': 0, 'store_errors': 0}
+_metrics_lock = threading.Lock()
+_store = None
+_store_lock = threading.Lock()
+
+
+def _bucket_limits():
+    """kind -> (burst, tokens per second), read at call time so the constants can be changed at runtime."""
+    return {'ip': (LOGIN_IP_BURST, LOGIN_IP_PER_MINUTE / 60.0), 'username': (LOGIN_USERNAME_BURST, LOGIN_USERNAME_PER_MINUTE / 60.0)}
+
+def _bucket_key(kind, value):
+    """Buckets are keyed by a hash, so the store does not list which usernames were attacked."""
+    return f"{kind}:{hashlib.sha256(value.encode('utf-8')).hexdigest()[:32]}"
+
+def _take(buckets, levels, now):
+    """
+    The token bucket step shared by both stores. buckets is [(kind, key, burst, rate)] and levels maps
+    key -> (tokens, updated_at) as stored. Takes one token from every bucket, or from none if any is
+    empty. Returns (rejected_kind, retry_after, new_levels, exhausted_kinds).
+    """
+    current = {}
+    for kind, key, burst, rate in buckets:
+        tokens, updated_at = levels.get(key, (burst, now))
+        tokens = min(burst, tokens + max(0.0, now - updated_at) * rate)
+        if tokens < 1:
+            return kind, (1 - tokens) / rate, {}, []
+        current[key] = tokens
+    new_levels = {key: current[key] - 1 for _, key, _, _ in buckets}
+    exhausted = [kind for kind, key, _, _ in buckets if new_levels[key] < 1]
+    return None, 0.0, new_levels, exhausted
+
+
+# --- Stores ---
+class MemoryBucketStore:
+    """Buckets in this process only; used when RATE_LIMIT_STORE_PATH is empty or the SQLite store fails."""
+
+    def __init__(self, max_keys=RATE_LIMIT_MEMORY_KEYS):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict() # key -> (kind, tokens, updated_at)
+        self._lock = threading.Lock()
+
+    def take(self, buckets, now):
+        with self._lock:
+            levels = {key: self._buckets[key][1:] for _, key, _, _ in buckets if key in self._buckets}
+            rejected_kind, retry_after, new_levels, exhausted = _take(buckets, levels, now)
+            for kind, key, _, _ in buckets:
+                if key in new_levels:
+                    self._buckets[key] = (kind, new_levels[key], now)
+                if key in self._buckets:
+                    self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return rejected_kind, retry_after, exhausted
+
+    def state(self, now):
+        limits = _bucket_limits()
+        with self._lock:
+            buckets = list(self._buckets.values())
+        state = {'store': 'memory', 'tracked_buckets': {}, 'empty_buckets': {}}
+        for kind, tokens, updated_at in buckets:
+            burst, rate = limits[kind]
+            if tokens + (now - updated_at) * rate >= burst: continue # Refilled; same as no bucket
+            state['tracked_buckets'][kind] = state['tracked_buckets'].get(kind, 0) + 1
+            state['empty_buckets'][kind] = state['empty_buckets'].get(kind, 0) + (tokens + (now - updated_at) * rate < 1)
+        return state
+
+    def reset(self, key):
+        with self._lock:
+            return self._buckets.pop(key, None) is not None
+
+class SqliteBucketStore:
+    """
+    Buckets in a SQLite file shared by every worker on the host. Each take is one short write transaction
+    (BEGIN IMMEDIATE), so concurrent workers cannot both spend the last token. Durability is not needed:
+    the file runs without fsync, and losing it only resets the limits.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._attempts = 0 # Takes by this process; every RATE_LIMIT_PRUNE_EVERY-th one also prunes
+        self._attempts_lock = threading.Lock()
+
+    def _connect(self):
+        # One connection per thread and process; a connection inherited across fork must not be reused.
+        conn, pid = getattr(self._local, 'conn', None), getattr(self._local, 'pid', None)
+        if conn is None or pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL;")
+            conn.execute("PRAGMA synchronous=OFF;")
+            conn.execute(BUCKETS_TABLE_CREATE)
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def take(self, buckets, now):
+        conn = self._connect()
+        with self._attempts_lock:
+            self._attempts += 1
+            prune = self._attempts % RATE_LIMIT_PRUNE_EVERY == 0
+        conn.execute("BEGIN IMMEDIATE;")
+        try:
+            keys = [key for _, key, _, _ in buckets]
+            rows = conn.execute(BUCKETS_SELECT.format(placeholders=', '.join('?' * len(keys))), keys).fetchall()
+            rejected_kind, retry_after, new_levels, exhausted = _take(buckets, {key: (tokens, updated_at) for key, tokens, updated_at in rows}, now)
+            if new_levels:
+                conn.executemany(BUCKET_UPSERT, [(key, kind, new_levels[key], rate, now, now + (burst - new_levels[key]) / rate)
+                                                 for kind, key, burst, rate in buckets])
+            if prune:
+                conn.execute(BUCKETS_PRUNE, (now,))
+            conn.execute("COMMIT;")
+        except BaseException:
+            conn.execute("ROLLBACK;")
+            raise
+        return rejected_kind, retry_after, exhausted
+
+    def state(self, now):
+        rows = self._connect().execute(BUCKETS_STATE_QUERY, (now, now)).fetchall()
+        return {'store': 'sqlite', 'path': self.path, 'tracked_buckets': {kind: count for kind, count, _ in rows},
+                'empty_buckets': {kind: empty for kind, _, empty in rows}}
+
+    def reset(self, key):
+        return self._connect().execute(BUCKET_DELETE, (key,)).rowcount > 0
+
+def get_bucket_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = SqliteBucketStore(RATE_LIMIT_STORE_PATH) if RATE_LIMIT_STORE_PATH else MemoryBucketStore()
+    return _store
+
+_fallback_store = MemoryBucketStore()
+
+
+# --- Login Attempts ---
+def client_ip():
+    """The address login attempts are counted against, or None outside a request."""
+    if not has_request_context(): return None
+    forwarded_for = request.headers.get('X-Forwarded-For')
+    if LOGIN_RATE_LIMIT_TRUST_FORWARDED_FOR and forwarded_for:
+        return forwarded_for.split(',')[-1].strip() # Appended by our proxy; earlier entries are client-supplied
+    return request.remote_addr
+
+def check_login_attempt(app, username):
+    """
+    Takes a token from the client IP's and the username's bucket. Returns (allowed, retry_after_seconds).
+    A rejected attempt takes no token, so retrying early does not extend the wait. If the shared store
+    fails, this worker's in-memory buckets are used for the attempt instead of letting it through unchecked.
+    """
+    if not LOGIN_RATE_LIMIT_ENABLED: return True, 0.0
+    limits = _bucket_limits()
+    values = [('ip', client_ip()), ('username', username.strip().lower())]
+    buckets = [(kind, _bucket_key(kind, value), *limits[kind]) for kind, value in values if value]
+    now = time.time()
+    try:
+        rejected_kind, retry_after, exhausted = get_bucket_store().take(buckets, now)
+    except sqlite3.Error as e:
+        with _metrics_lock:
+            _metrics['store_errors'] += 1
+            errors = _metrics['store_errors']
+        if errors % 1000 == 1: # A broken store during a burst would otherwise log every attempt
+            app.logger.error(f"check_login_attempt: Rate limit store error ({errors} so far), using this worker's buckets: {e}")
+        rejected_kind, retry_after, exhausted = _fallback_store.take(buckets, now)
+    with _metrics_lock:
+        _metrics[f"rejected_{rejected_kind}" if rejected_kind else 'allowed'] += 1
+    for kind in exhausted: # Logged once per lockout, not for every rejected attempt of a burst
+        app.logger.warning(f"check_login_attempt: Login attempts for {kind} {dict(values)[kind]} exhausted; further attempts are rejected until tokens refill.")
+    return rejected_kind is None, retry_after
+
+def reset_login_attempts(username=None, ip=None):
+    """Clears the buckets of a username and/or an IP in the shared store. Returns the number cleared."""
+    store = get_bucket_store()
+    return sum(store.reset(_bucket_key(kind, value)) for kind, value in (('username', (username or '').strip().lower()), ('ip', ip)) if value)
+
+def login_rate_limit_snapshot():
+    """Limiter configuration, bucket state (shared by all workers) and this process's attempt counters."""
+    with _metrics_lock:
+        counters = dict(_metrics)
+    try:
+        state = get_bucket_store().state(time.time())
+    except sqlite3.Error as e:
+        state = {'error': str(e)}
+    return {'enabled': LOGIN_RATE_LIMIT_ENABLED, 'limits': {kind: {'burst': burst, 'per_minute': rate * 60.0} for kind, (burst, rate) in _bucket_limits().items()},
+            **counters, **state}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Show login rate limit buckets or clear them for a locked-out user.")
+    parser.add_argument('--reset-username', nargs='+', default=[], metavar='USERNAME', help="Clear these usernames' buckets.")
+    parser.add_argument('--reset-ip', nargs='+', default=[], metavar='IP', help="Clear these client IPs' buckets.")
+    args = parser.parse_args()
+    for username in args.reset_username:
+        print(f"username {username}: {reset_login_attempts(username=username)} bucket(s) cleared")
+    for ip in args.reset_ip:
+        print(f"ip {ip}: {reset_login_attempts(ip=ip)} bucket(s) cleared")
+    if not args.reset_username and not args.reset_ip:
+        print(json.dumps(login_rate_limit_snapshot(), indent=2))
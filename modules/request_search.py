@@ -0,0 +1,102 @@
+# modules/request_search.py
+import re
+import time
+
+import psycopg2
+import psycopg2.extras
+
+from .db import get_db_connection
+
+REQUEST_SEARCH_PAGE_SIZE = 25
+REQUEST_SEARCH_MAX_TERM_LENGTH = 200
+# Control characters mark highlighted words so the text can be Markdown-escaped before they become bold.
+HIGHLIGHT_START, HIGHLIGHT_STOP = '\x02', '\x03'
+HEADLINE_OPTIONS = f"StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_STOP}, MaxWords=30, MinWords=10, MaxFragments=2, FragmentDelimiter=\" ... \""
+MARKDOWN_SPECIAL = re.compile(r'([\\`*_\[\]#|<>~])')
+
+# Requests below scope_manager_id in the closure table, down to scope_max_depth levels (1 = direct reports).
+SEARCH_SCOPE_JOIN = """
+    JOIN EmployeeHierarchy scope_h ON scope_h.descendant_id = ar.requester_id
+     AND scope_h.ancestor_id = %(scope_manager_id)s AND scope_h.depth BETWEEN 1 AND %(scope_max_depth)s
+"""
+# Keyset cursor: the (rank, request_id) of the last row on the previous page.
+SEARCH_KEYSET_FILTER = "WHERE (m.rank, m.request_id) < (%(after_rank)s::REAL, %(after_id)s)"
+
+# The inner query uses idx_accessrequests_search_document to find matches and ranks only those;
+# ts_headline (the expensive part) runs on the page rows alone.
+REQUEST_SEARCH_QUERY = """
+    WITH q AS (SELECT websearch_to_tsquery('english', %(term)s) AS query),
+    page AS (
+        SELECT m.request_id, m.rank
+        FROM (
+            SELECT ar.request_id, ts_rank(ar.search_document, q.query) AS rank
+            FROM AccessRequests ar CROSS JOIN q
+            {scope_join}
+            WHERE ar.search_document @@ q.query
+        ) m
+        {keyset_filter}
+        ORDER BY m.rank DESC, m.request_id DESC
+        LIMIT %(limit)s
+    )
+    SELECT ar.request_id, page.rank, ar.status, ar.request_date,
+           req_emp.first_name || ' ' || req_emp.last_name AS requester_name,
+           dt.schema_name || '.' || dt.table_name AS table_full_name,
+           ts_headline('english', ar.justification, q.query, %(headline_options)s) AS justification_headline,
+           ts_headline('english', COALESCE(ar.approver_comments, ''), q.query, %(headline_options)s) AS comments_headline
+    FROM page
+    CROSS JOIN q
+    JOIN AccessRequests ar ON ar.request_id = page.request_id
+    JOIN Employees req_emp ON req_emp.employee_id = ar.requester_id
+    JOIN DatabaseTables dt ON dt.table_id = ar.table_id
+    ORDER BY page.rank DESC, page.request_id DESC;
+"""
+
+
+def headline_to_markdown(headline):
+    """Escapes Markdown in a ts_headline fragment and turns the highlight markers into bold text."""
+    escaped = MARKDOWN_SPECIAL.sub(r'\\\1', headline or '')
+    # Adjacent highlighted tokens (e.g. JIRA and -142) form one bold run
+    escaped = escaped.replace(HIGHLIGHT_STOP + HIGHLIGHT_START, '')
+    return escaped.replace(HIGHLIGHT_START, '**').replace(HIGHLIGHT_STOP, '**')
+
+def search_requests(app, term, scope_manager_id=None, scope_max_depth=None, cursor=None, limit=REQUEST_SEARCH_PAGE_SIZE):
+    """
+    Full-text search over AccessRequests justifications and approver comments using
+    websearch_to_tsquery syntax ("quoted phrases", OR, -excluded). Results are ranked by ts_rank,
+    newest request first on ties, and carry highlighted Markdown fragments.
+    With scope_manager_id, only requests from that manager's org (to scope_max_depth levels) match.
+    cursor is the [rank, request_id] pair returned for the previous page, or None for the first.
+    Returns (rows, next_cursor), next_cursor None on the last page; returns None on database errors.
+    """
+    term = ' '.join((term or '').split())[:REQUEST_SEARCH_MAX_TERM_LENGTH]
+    if not term: return [], None
+    params = {'term': term, 'limit': limit + 1, 'headline_options': HEADLINE_OPTIONS} # One extra row tells us whether another page exists
+    scope_join, keyset_filter = "", ""
+    if scope_manager_id is not None:
+        scope_join = SEARCH_SCOPE_JOIN
+        params.update(scope_manager_id=scope_manager_id, scope_max_depth=scope_max_depth or 2147483647)
+    if cursor:
+        keyset_filter = SEARCH_KEYSET_FILTER
+        params.update(after_rank=cursor[0], after_id=cursor[1])
+
+    conn = get_db_connection(app)
+    if not conn: return None
+    try:
+        started = time.perf_counter()
+        with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
+            cur.execute(REQUEST_SEARCH_QUERY.format(scope_join=scope_join, keyset_filter=keyset_filter), params)
+            records = cur.fetchall()
+        rows = [{
+            'request_id': rec['request_id'], 'requester_name': rec['requester_name'], 'table_full_name': rec['table_full_name'],
+            'status': rec['status'], 'request_date': rec['request_date'], 'rank': rec['rank'],
+            'justification': headline_to_markdown(rec['justification_headline']),
+            'approver_comments': headline_to_markdown(rec['comments_headline']),
+        } for rec in records[:limit]]
+        next_cursor = [rows[-1]['rank'], rows[-1]['request_id']] if len(records) > limit else None
+        app.logger.info(f"search_requests: '{term}' -> {len(rows)} row(s){' (more)' if next_cursor else ''} in {(time.perf_counter() - started) * 1000.0:.1f} ms.")
+        return rows, next_cursor
+    except psycopg2.Error as e:
+        app.logger.error(f"search_requests: Database error searching requests for '{term}': {e}")
+        return None
+    finally:
+        conn.close()
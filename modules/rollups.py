@@ -0,0 +1,187 @@
+# modules/rollups.py
+import psycopg2
+import psycopg2.extras # For dictionary cursor
+
+from .db import get_db_connection
+
+DAILY_ROLLUP_NAME = 'daily_requests'
+# Re-scan this far behind the watermark so rows committed late with an older
+# CURRENT_TIMESTAMP (long transactions) are still folded in.
+ROLLUP_WATERMARK_OVERLAP = '5 minutes'
+
+# --- Rollup Maintenance SQL ---
+# Revoked requests were approved (their time-bound grant has since expired) and count as approved.
+# Days whose buckets need rebuilding: any request submitted or decided since the watermark.
+CHANGED_DAYS_QUERY = """
+    SELECT DISTINCT ar.request_date::date AS bucket_date
+    FROM AccessRequests ar
+    WHERE ar.request_date > %(since)s
+    UNION
+    SELECT DISTINCT ar.request_date::date
+    FROM AccessRequests ar
+    WHERE ar.decision_date > %(since)s;
+"""
+
+NEW_WATERMARK_QUERY = """
+    SELECT GREATEST(
+        (SELECT MAX(request_date) FROM AccessRequests),
+        (SELECT MAX(decision_date) FROM AccessRequests)
+    ) AS watermark;
+"""
+
+# Aggregates whole days at a time so a re-run for the same day is idempotent.
+ROLLUP_DAYS_INSERT = """
+    INSERT INTO DailyRequestRollup (bucket_date, department, table_id, requested_role_id,
+                                    requests_submitted, requests_approved, requests_rejected, requests_pending,
+                                    decision_seconds_total, decision_seconds_max)
+    SELECT d.day, COALESCE(e.department, 'Unassigned'), ar.table_id, ar.requested_role_id,
+           COUNT(*),
+           COUNT(*) FILTER (WHERE ar.status IN ('Approved', 'Revoked')),
+           COUNT(*) FILTER (WHERE ar.status = 'Rejected'),
+           COUNT(*) FILTER (WHERE ar.status = 'Pending'),
+           COALESCE(SUM(EXTRACT(EPOCH FROM (ar.decision_date - ar.request_date))) FILTER (WHERE ar.decision_date IS NOT NULL), 0),
+           MAX(EXTRACT(EPOCH FROM (ar.decision_date - ar.request_date))) FILTER (WHERE ar.decision_date IS NOT NULL)
+    FROM unnest(%(days)s::date[]) AS d(day)
+    JOIN AccessRequests ar ON ar.request_date >= d.day AND ar.request_date < d.day + 1
+    JOIN Employees e ON ar.requester_id = e.employee_id
+    GROUP BY d.day, COALESCE(e.department, 'Unassigned'), ar.table_id, ar.requested_role_id;
+"""
+
+ROLLUP_FULL_INSERT = """
+    INSERT INTO DailyRequestRollup (bucket_date, department, table_id, requested_role_id,
+                                    requests_submitted, requests_approved, requests_rejected, requests_pending,
+                                    decision_seconds_total, decision_seconds_max)
+    SELECT ar.request_date::date, COALESCE(e.department, 'Unassigned'), ar.table_id, ar.requested_role_id,
+           COUNT(*),
+           COUNT(*) FILTER (WHERE ar.status IN ('Approved', 'Revoked')),
+           COUNT(*) FILTER (WHERE ar.status = 'Rejected'),
+           COUNT(*) FILTER (WHERE ar.status = 'Pending'),
+           COALESCE(SUM(EXTRACT(EPOCH FROM (ar.decision_date - ar.request_date))) FILTER (WHERE ar.decision_date IS NOT NULL), 0),
+           MAX(EXTRACT(EPOCH FROM (ar.decision_date - ar.request_date))) FILTER (WHERE ar.decision_date IS NOT NULL)
+    FROM AccessRequests ar
+    JOIN Employees e ON ar.requester_id = e.employee_id
+    GROUP BY 1, 2, 3, 4;
+"""
+
+# --- Trend Queries (rollup reads and the equivalent raw aggregation) ---
+# Whitelisted grouping expressions; never interpolate user input into these queries.
+ROLLUP_GROUP_EXPRESSIONS = {
+    'department': "r.department",
+    'table': "dt.schema_name || '.' || dt.table_name",
+    'role': "aro.role_name",
+}
+RAW_GROUP_EXPRESSIONS = {
+    'department': "COALESCE(e.department, 'Unassigned')",
+    'table': "dt.schema_name || '.' || dt.table_name",
+    'role': "aro.role_name",
+}
+
+ROLLUP_TREND_QUERY = """
+    SELECT r.bucket_date, {group_expr} AS group_label,
+           SUM(r.requests_submitted) AS submitted, SUM(r.requests_approved) AS approved,
+           SUM(r.requests_rejected) AS rejected, SUM(r.requests_pending) AS pending,
+           SUM(r.decision_seconds_total) AS decision_seconds_total
+    FROM DailyRequestRollup r
+    JOIN DatabaseTables dt ON r.table_id = dt.table_id
+    JOIN AccessRoles aro ON r.requested_role_id = aro.role_id
+    WHERE r.bucket_date >= CURRENT_DATE - %(days)s
+    GROUP BY 1, 2
+    ORDER BY 1, 2;
+"""
+
+RAW_TREND_QUERY = """
+    SELECT ar.request_date::date AS bucket_date, {group_expr} AS group_label,
+           COUNT(*) AS submitted,
+           COUNT(*) FILTER (WHERE ar.status IN ('Approved', 'Revoked')) AS approved,
+           COUNT(*) FILTER (WHERE ar.status = 'Rejected') AS rejected,
+           COUNT(*) FILTER (WHERE ar.status = 'Pending') AS pending,
+           COALESCE(SUM(EXTRACT(EPOCH FROM (ar.decision_date - ar.request_date))) FILTER (WHERE ar.decision_date IS NOT NULL), 0) AS decision_seconds_total
+    FROM AccessRequests ar
+    JOIN Employees e ON ar.requester_id = e.employee_id
+    JOIN DatabaseTables dt ON ar.table_id = dt.table_id
+    JOIN AccessRoles aro ON ar.requested_role_id = aro.role_id
+    WHERE ar.request_date >= CURRENT_DATE - %(days)s
+    GROUP BY 1, 2
+    ORDER BY 1, 2;
+"""
+
+
+def build_trend_query(group_by, use_rollup=True):
+    """Returns the trend query for a whitelisted grouping, read from the rollup or from raw AccessRequests."""
+    if use_rollup:
+        return ROLLUP_TREND_QUERY.format(group_expr=ROLLUP_GROUP_EXPRESSIONS[group_by])
+    return RAW_TREND_QUERY.format(group_expr=RAW_GROUP_EXPRESSIONS[group_by])
+
+
+def refresh_daily_rollup(app, full_rebuild=False):
+    """
+    Folds requests submitted or decided since the stored watermark into DailyRequestRollup.
+    Affected days are recomputed wholesale, so the refresh is safe to repeat. With
+    full_rebuild=True the rollup is truncated and rebuilt from AccessRequests.
+    Returns the number of day buckets refreshed, or None on error.
+    """
+    conn = get_db_connection(app)
+    if not conn: return None
+    try:
+        with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
+            # Serialize concurrent refreshers on the watermark row.
+            cur.execute(
+                "INSERT INTO RollupWatermarks (rollup_name, watermark) VALUES (%s, '-infinity') ON CONFLICT (rollup_name) DO NOTHING;",
+                (DAILY_ROLLUP_NAME,)
+            )
+            # The initial '-infinity' watermark is clamped in SQL; psycopg2 cannot represent it as a datetime.
+            cur.execute(
+                f"SELECT GREATEST(watermark - INTERVAL '{ROLLUP_WATERMARK_OVERLAP}', '0001-01-01'::timestamp) AS since FROM RollupWatermarks WHERE rollup_name = %s FOR UPDATE;",
+                (DAILY_ROLLUP_NAME,)
+            )
+            since = cur.fetchone()['since']
+            cur.execute(NEW_WATERMARK_QUERY)
+            new_watermark = cur.fetchone()['watermark']
+
+            if full_rebuild:
+                cur.execute("TRUNCATE DailyRequestRollup;")
+                cur.execute(ROLLUP_FULL_INSERT)
+                cur.execute("SELECT COUNT(DISTINCT bucket_date) AS days FROM DailyRequestRollup;")
+                days_refreshed = cur.fetchone()['days']
+            else:
+                cur.execute(CHANGED_DAYS_QUERY, {'since': since})
+                changed_days = [r['bucket_date'] for r in cur.fetchall()]
+                if changed_days:
+                    cur.execute("DELETE FROM DailyRequestRollup WHERE bucket_date = ANY(%s::date[]);", (changed_days,))
+                    cur.execute(ROLLUP_DAYS_INSERT, {'days': changed_days})
+                days_refreshed = len(changed_days)
+
+            if new_watermark is not None:
+                cur.execute(
+                    "UPDATE RollupWatermarks SET watermark = GREATEST(watermark, %s), refreshed_at = CURRENT_TIMESTAMP WHERE rollup_name = %s;",
+                    (new_watermark, DAILY_ROLLUP_NAME)
+                )
+            conn.commit()
+            app.logger.info(f"refresh_daily_rollup: Refreshed {days_refreshed} day bucket(s) (full_rebuild={full_rebuild}). Watermark: {new_watermark}")
+            return days_refreshed
+    except psycopg2.Error as e:
+        conn.rollback()
+        app.logger.error(f"refresh_daily_rollup: Database error refreshing rollup: {e}")
+        return None
+    finally:
+        if conn: conn.close()
+
+
+def rebuild_daily_rollup(app):
+    """Discards and recomputes the whole rollup (e.g. after department changes or data fixes)."""
+    return refresh_daily_rollup(app, full_rebuild=True)
+
+
+def fetch_daily_trends(app, group_by='department', days=30):
+    """Reads daily trend rows from the rollup. Returns a list of dicts, or None on error."""
+    conn = get_db_connection(app)
+    if not conn: return None
+    try:
+        with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
+            cur.execute(build_trend_query(group_by), {'days': days})
+            return [dict(r) for r in cur.fetchall()]
+    except psycopg2.Error as e:
+        app.logger.error(f"fetch_daily_trends: Database error reading rollup: {e}")
+        return None
+    finally:
+        if conn: conn.close()
@@ -0,0 +1,295 @@
+# modules/scheduler.py
+import argparse
+import logging
+import os
+import random
+import socket
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import psycopg2
+
+from .db import get_db_connection
+from .rollups import refresh_daily_rollup
+from .access_expiry import sweep_expired_grants
+from .catalog_sync import sync_all_catalog_sources
+from .sessions import purge_expired_sessions
+
+SCHEDULER_ENABLED = True # Set False to run maintenance jobs only from an external cron (python -m modules.scheduler JOB)
+SCHEDULER_LOCK_NAMESPACE = 40001 # pg_try_advisory_lock(namespace, hashtext(job_name)): at most one run of a job at a time
+SCHEDULER_MAX_SLEEP = 30.0 # Seconds; upper bound between checks for due jobs
+SCHEDULER_RUN_HISTORY_DAYS = 30
+REQUEST_SUBMISSION_RETENTION_DAYS = 7 # Idempotency keys only matter while a form can still be retried
+
+ScheduledJob = namedtuple('ScheduledJob', ['name', 'cron', 'func', 'jitter_seconds', 'description'])
+
+
+# --- Cron Schedules ---
+CRON_FIELDS = [('minute', 0, 59), ('hour', 0, 23), ('day', 1, 31), ('month', 1, 12), ('weekday', 0, 7)] # Weekday 0 and 7 are Sunday
+
+def _parse_cron_field(text, low, high):
+    values = set()
+    for part in text.split(','):
+        expr, _, step = part.partition('/')
+        step = int(step) if step else 1
+        if expr == '*':
+            start, end = low, high
+        elif '-' in expr:
+            start, end = (int(v) for v in expr.split('-', 1))
+        else:
+            start = int(expr)
+            end = high if step > 1 else start
+        if step < 1 or start < low or end > high or start > end:
+            raise ValueError(f"Cron field '{text}' is out of range {low}-{high}")
+        values.update(range(start, end + 1, step))
+    return frozenset(values)
+
+class CronSchedule:
+    """Five-field cron expression (minute hour day month weekday) with *, lists, ranges and /steps."""
+
+    def __init__(self, expression):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression '{expression}' must have 5 fields")
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, self.weekdays = (
+            _parse_cron_field(text, low, high) for text, (_, low, high) in zip(fields, CRON_FIELDS))
+        self.weekdays = frozenset(v % 7 for v in self.weekdays)
+        # As in cron, a restricted day-of-month and day-of-week match when either one does.
+        self._any_day, self._any_weekday = fields[2] == '*', fields[4] == '*'
+
+    def _day_matches(self, moment):
+        day_ok, weekday_ok = moment.day in self.days, (moment.weekday() + 1) % 7 in self.weekdays
+        if self._any_day or self._any_weekday:
+            return day_ok and weekday_ok
+        return day_ok or weekday_ok
+
+    def next_after(self, moment):
+        """Returns the first matching minute strictly after moment (naive local time)."""
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=366 * 5)
+        while candidate < limit:
+            if candidate.month not in self.months:
+                candidate = (candidate.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(candidate):
+                candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+            elif candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        raise ValueError(f"Cron expression '{self.expression}' never matches")
+
+
+# --- Jobs ---
+def cleanup_old_rows(app):
+    """Deletes expired idempotency keys and old scheduler run history. Returns rows deleted, or None on error."""
+    conn = get_db_connection(app)
+    if not conn: return None
+    try:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM RequestSubmissions WHERE submitted_at < CURRENT_TIMESTAMP - make_interval(days => %s);",
+                        (REQUEST_SUBMISSION_RETENTION_DAYS,))
+            deleted = cur.rowcount
+            cur.execute("DELETE FROM ScheduledJobRuns WHERE started_at < CURRENT_TIMESTAMP - make_interval(days => %s);",
+                        (SCHEDULER_RUN_HISTORY_DAYS,))
+            deleted += cur.rowcount
+        conn.commit()
+        return deleted
+    except psycopg2.Error as e:
+        conn.rollback()
+        app.logger.error(f"cleanup_old_rows: Database error: {e}")
+        return None
+    finally:
+        conn.close()
+
+def sync_catalog_sources_job(app):
+    """sync_all_catalog_sources, but None (a failed run) when any source failed, so partial failures count in the job metrics."""
+    results = sync_all_catalog_sources(app)
+    failed = sum(result is None for result in results)
+    if failed:
+        app.logger.error(f"sync_catalog_sources_job: {failed} of {len(results)} catalog source(s) failed to sync.")
+        return None
+    return results
+
+SCHEDULED_JOBS = [
+    ScheduledJob('access_expiry_sweep', '* * * * *', sweep_expired_grants, 5, "Revoke expired time-bound grants"),
+    ScheduledJob('daily_rollup', '*/5 * * * *', refresh_daily_rollup, 20, "Fold new requests and decisions into DailyRequestRollup"),
+    ScheduledJob('catalog_sync', '*/15 * * * *', sync_catalog_sources_job, 60, "Sync DatabaseTables from CATALOG_SOURCES"),
+    ScheduledJob('session_cleanup', '41 * * * *', purge_expired_sessions, 60, "Delete expired login sessions"),
+    ScheduledJob('maintenance_cleanup', '17 3 * * *', cleanup_old_rows, 300, "Delete old idempotency keys and job run history"),
+]
+
+
+# --- Leader Election & Run Bookkeeping ---
+# A run needs both: the advisory lock (no overlap with a still-running previous slot) and the slot
+# claim (no second run of the same slot by a worker that got the lock after the first finished).
+CLAIM_SLOT_QUERY = """
+    INSERT INTO ScheduledJobs (job_name, last_scheduled_for) VALUES (%(job_name)s, %(scheduled_for)s)
+    ON CONFLICT (job_name) DO UPDATE SET last_scheduled_for = EXCLUDED.last_scheduled_for
+    WHERE ScheduledJobs.last_scheduled_for IS NULL OR ScheduledJobs.last_scheduled_for < EXCLUDED.last_scheduled_for
+    RETURNING job_name;
+"""
+RUN_STARTED_QUERY = """
+    INSERT INTO ScheduledJobRuns (job_name, scheduled_for, worker) VALUES (%(job_name)s, %(scheduled_for)s, %(worker)s) RETURNING run_id;
+"""
+RUN_FINISHED_QUERY = """
+    UPDATE ScheduledJobRuns SET finished_at = CURRENT_TIMESTAMP, status = %(status)s, duration_ms = %(duration_ms)s, result = %(result)s
+    WHERE run_id = %(run_id)s;
+    UPDATE ScheduledJobs
+    SET last_started_at = %(started_at)s, last_finished_at = CURRENT_TIMESTAMP, last_status = %(status)s,
+        last_duration_ms = %(duration_ms)s, run_count = run_count + 1,
+        failure_count = failure_count + CASE WHEN %(status)s = 'failed' THEN 1 ELSE 0 END,
+        total_duration_ms = total_duration_ms + %(duration_ms)s, max_duration_ms = GREATEST(max_duration_ms, %(duration_ms)s)
+    WHERE job_name = %(job_name)s;
+"""
+
+def run_scheduled_job(app, job, scheduled_for, worker=None):
+    """
+    Runs job for the scheduled_for slot if this process wins it. Returns 'succeeded', 'failed',
+    'locked' (a previous run still holds the job's lock), 'claimed' (another worker already ran
+    this slot) or None when the database is unavailable.
+    """
+    conn = get_db_connection(app)
+    if not conn: return None
+    conn.autocommit = True # Bookkeeping is visible to other workers immediately; the lock is session-level
+    params = {'job_name': job.name, 'scheduled_for': scheduled_for, 'worker': worker or f"{socket.gethostname()}:{os.getpid()}"}
+    locked = False
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_try_advisory_lock(%s, hashtext(%s));", (SCHEDULER_LOCK_NAMESPACE, job.name))
+            locked = cur.fetchone()[0]
+            if not locked: return 'locked'
+            cur.execute(CLAIM_SLOT_QUERY, params)
+            if cur.fetchone() is None: return 'claimed'
+            cur.execute(RUN_STARTED_QUERY, params)
+            run_id = cur.fetchone()[0]
+
+            started_at, started = datetime.now(), time.perf_counter()
+            try:
+                result = job.func(app)
+                status = 'failed' if result is None else 'succeeded' # Job functions return None on error
+            except Exception as e:
+                app.logger.error(f"run_scheduled_job: {job.name} raised: {e}")
+                result, status = f"{type(e).__name__}: {e}", 'failed'
+            duration_ms = (time.perf_counter() - started) * 1000.0
+            cur.execute(RUN_FINISHED_QUERY, {**params, 'run_id': run_id, 'status': status, 'duration_ms': duration_ms,
+                                             'started_at': started_at, 'result': str(result)[:1000]})
+            app.logger.info(f"run_scheduled_job: {job.name} ({scheduled_for:%Y-%m-%d %H:%M}) {status} in {duration_ms:.1f} ms.")
+            return status
+    except psycopg2.Error as e:
+        app.logger.error(f"run_scheduled_job: Database error running {job.name}: {e}")
+        return None
+    finally:
+        if locked:
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT pg_advisory_unlock(%s, hashtext(%s));", (SCHEDULER_LOCK_NAMESPACE, job.name))
+            except psycopg2.Error:
+                pass # Closing the session releases the lock anyway
+        conn.close()
+
+
+# --- In-Process Scheduler ---
+class JobScheduler:
+    """
+    Daemon thread that wakes for each job's next cron slot, waits a random 0..jitter_seconds so
+    workers do not stampede the database, and runs the job in its own thread if it wins the slot.
+    Keeps per-job timing metrics for this process.
+    """
+
+    def __init__(self, app, jobs):
+        self.app = app
+        self.jobs = {job.name: job for job in jobs}
+        self.schedules = {job.name: CronSchedule(job.cron) for job in jobs}
+        now = datetime.now()
+        self.next_run = {name: schedule.next_after(now) for name, schedule in self.schedules.items()}
+        self.metrics = {name: {'runs': 0, 'failures': 0, 'skipped_locked': 0, 'skipped_claimed': 0, 'skipped_overlap': 0,
+                               'last_status': None, 'last_run_at': None, 'last_duration_ms': None,
+                               'total_duration_ms': 0.0, 'max_duration_ms': 0.0} for name in self.jobs}
+        self._running = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name='job-scheduler', daemon=True)
+        self._thread.start()
+        self.app.logger.info(f"JobScheduler: Started with jobs {', '.join(sorted(self.jobs))}.")
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            now = datetime.now()
+            for name, scheduled_for in list(self.next_run.items()):
+                if scheduled_for <= now:
+                    self.next_run[name] = self.schedules[name].next_after(now)
+                    threading.Thread(target=self._run, args=(self.jobs[name], scheduled_for), name=f"job-{name}", daemon=True).start()
+            wait = (min(self.next_run.values()) - datetime.now()).total_seconds()
+            self._stop.wait(min(max(wait, 0.5), SCHEDULER_MAX_SLEEP))
+
+    def _run(self, job, scheduled_for):
+        with self._lock:
+            if job.name in self._running: # Previous slot still running in this process
+                self.metrics[job.name]['skipped_overlap'] += 1
+                return
+            self._running.add(job.name)
+        try:
+            if job.jitter_seconds: time.sleep(random.uniform(0, job.jitter_seconds))
+            started = time.perf_counter()
+            status = run_scheduled_job(self.app, job, scheduled_for)
+            duration_ms = (time.perf_counter() - started) * 1000.0
+            with self._lock:
+                m = self.metrics[job.name]
+                if status in ('succeeded', 'failed'):
+                    m['runs'] += 1
+                    m['failures'] += status == 'failed'
+                    m['last_status'], m['last_run_at'], m['last_duration_ms'] = status, scheduled_for, duration_ms
+                    m['total_duration_ms'] += duration_ms
+                    m['max_duration_ms'] = max(m['max_duration_ms'], duration_ms)
+                elif status in ('locked', 'claimed'):
+                    m[f"skipped_{status}"] += 1
+        finally:
+            with self._lock:
+                self._running.discard(job.name)
+
+    def snapshot(self):
+        """Per-job metrics for this process plus the next scheduled slot."""
+        with self._lock:
+            return {name: {**m, 'next_run_at': self.next_run[name], 'cron': self.jobs[name].cron} for name, m in self.metrics.items()}
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+def start_scheduler(app, jobs=None):
+    """Starts this process's scheduler once (safe to call on every request); returns it, or None if disabled."""
+    global _scheduler
+    if not SCHEDULER_ENABLED: return None
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                scheduler = JobScheduler(app, SCHEDULED_JOBS if jobs is None else jobs)
+                scheduler.start()
+                _scheduler = scheduler
+    return _scheduler
+
+def get_scheduler():
+    return _scheduler
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run scheduled maintenance jobs once, with the same locking as the in-app scheduler.")
+    parser.add_argument('jobs', nargs='*', help=f"Job names (default: all). Known: {', '.join(job.name for job in SCHEDULED_JOBS)}")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    cli_app = SimpleNamespace(logger=logging.getLogger('scheduler'))
+    slot = datetime.now().replace(second=0, microsecond=0)
+    for job in SCHEDULED_JOBS:
+        if not args.jobs or job.name in args.jobs:
+            print(f"{job.name}: {run_scheduled_job(cli_app, job, slot, worker=f'cli:{os.getpid()}')}")
@@ -0,0 +1,206 @@
+# modules/sessions.py
+import argparse
+import hashlib
+import logging
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from types import SimpleNamespace
+
+import psycopg2
+import psycopg2.extras
+from flask import request, has_request_context
+from itsdangerous import URLSafeSerializer, BadSignature
+
+from .db import get_db_connection
+
+# The browser only holds a signed, opaque session ID cookie; who is logged in lives in UserSessions.
+SESSION_COOKIE_NAME = 'access_session'
+SESSION_COOKIE_SECURE = False # Set True when the app is served over HTTPS
+SESSION_TTL_HOURS = 12 # Absolute lifetime; the user logs in again after this
+SESSION_CACHE_SIZE = 4096 # Sessions kept in memory per worker
+SESSION_CACHE_TTL = 30.0 # Seconds; a session revoked by another worker (or the CLI) stops working here within this window
+_DEFAULT_SECRET_KEY = 'dev-only-insecure-session-key'
+SESSION_SECRET_KEY = os.environ.get('SESSION_SECRET_KEY', _DEFAULT_SECRET_KEY) # Must be the same for every worker
+
+SESSION_INSERT = """
+    INSERT INTO UserSessions (session_key, employee_id, session_data, expires_at)
+    VALUES (%s, %s, %s, CURRENT_TIMESTAMP + make_interval(hours => %s));
+"""
+SESSION_LOOKUP_QUERY = """
+    SELECT session_data, EXTRACT(EPOCH FROM expires_at - CURRENT_TIMESTAMP) AS expires_in
+    FROM UserSessions WHERE session_key = %s AND expires_at > CURRENT_TIMESTAMP;
+"""
+SESSION_DELETE = "DELETE FROM UserSessions WHERE session_key = %s;"
+EMPLOYEE_SESSIONS_DELETE = "DELETE FROM UserSessions WHERE employee_id = %s;"
+EXPIRED_SESSIONS_DELETE = "DELETE FROM UserSessions WHERE expires_at <= CURRENT_TIMESTAMP;"
+
+_session_cache = OrderedDict() # session_key -> (cached_at, expires_at, session); both times on the monotonic clock
+_session_cache_lock = threading.Lock()
+_serializer = URLSafeSerializer(SESSION_SECRET_KEY, salt='access-session')
+_default_key_warned = False
+
+
+def _session_key(session_id):
+    """UserSessions stores a hash of the session ID, so reading the table does not hand out usable sessions."""
+    return hashlib.sha256(session_id.encode()).hexdigest()
+
+def sign_session_id(session_id):
+    return _serializer.dumps(session_id)
+
+def unsign_session_id(cookie_value):
+    """Returns the session ID in a cookie value, or None if the signature does not match."""
+    try:
+        return _serializer.loads(cookie_value)
+    except BadSignature:
+        return None
+
+def _cache_put(key, session, expires_in):
+    now = time.monotonic()
+    with _session_cache_lock:
+        _session_cache[key] = (now, now + expires_in, session)
+        _session_cache.move_to_end(key)
+        while len(_session_cache) > SESSION_CACHE_SIZE:
+            _session_cache.popitem(last=False)
+
+def _cache_evict(key=None, employee_id=None):
+    with _session_cache_lock:
+        if key is not None:
+            _session_cache.pop(key, None)
+        if employee_id is not None:
+            for k in [k for k, (_, _, s) in _session_cache.items() if s.get('employee_id') == employee_id]:
+                del _session_cache[k]
+
+def clear_session_cache():
+    with _session_cache_lock:
+        _session_cache.clear()
+
+
+# --- Create & Look Up ---
+def create_session(app, session_data):
+    """
+    Stores session_data (must include employee_id) for SESSION_TTL_HOURS and returns the new session ID,
+    or None on a database error. The caller hands the ID to the browser with set_session_cookie.
+    """
+    global _default_key_warned
+    if SESSION_SECRET_KEY == _DEFAULT_SECRET_KEY and not _default_key_warned:
+        _default_key_warned = True
+        app.logger.warning("create_session: SESSION_SECRET_KEY is not set; session cookies are signed with the insecure development key.")
+    session_id = secrets.token_urlsafe(32)
+    key = _session_key(session_id)
+    conn = get_db_connection(app)
+    if not conn: return None
+    try:
+        with conn.cursor() as cur:
+            cur.execute(SESSION_INSERT, (key, session_data['employee_id'], psycopg2.extras.Json(session_data), SESSION_TTL_HOURS))
+        conn.commit()
+    except psycopg2.Error as e:
+        conn.rollback()
+        app.logger.error(f"create_session: Database error creating session for employee_id {session_data['employee_id']}: {e}")
+        return None
+    finally:
+        conn.close()
+    _cache_put(key, dict(session_data), SESSION_TTL_HOURS * 3600.0)
+    app.logger.info(f"create_session: Session created for employee_id {session_data['employee_id']}.")
+    return session_id
+
+def get_session(app, session_id):
+    """Returns the session data for session_id, or None if it is unknown, expired or revoked."""
+    key = _session_key(session_id)
+    now = time.monotonic()
+    with _session_cache_lock:
+        cached = _session_cache.get(key)
+        if cached and now - cached[0] < SESSION_CACHE_TTL and now < cached[1]:
+            _session_cache.move_to_end(key)
+            return cached[2]
+
+    conn = get_db_connection(app)
+    if not conn: return None
+    try:
+        with conn.cursor() as cur:
+            cur.execute(SESSION_LOOKUP_QUERY, (key,))
+            row = cur.fetchone()
+    except psycopg2.Error as e:
+        app.logger.error(f"get_session: Database error looking up session: {e}")
+        return None
+    finally:
+        conn.close()
+    if not row:
+        _cache_evict(key)
+        return None
+    session_data, expires_in = row
+    _cache_put(key, session_data, float(expires_in))
+    return session_data
+
+def get_current_session(app):
+    """
+    The logged-in user of the current request, as the dict handle_login stored ('logged_in',
+    'employee_id', 'first_name', 'last_name', 'email', 'is_manager'), or {} when there is none.
+    """
+    if not has_request_context(): return {}
+    session_id = unsign_session_id(request.cookies.get(SESSION_COOKIE_NAME, ''))
+    if not session_id: return {}
+    return get_session(app, session_id) or {}
+
+
+# --- Cookies ---
+def set_session_cookie(response, session_id):
+    response.set_cookie(SESSION_COOKIE_NAME, sign_session_id(session_id), max_age=SESSION_TTL_HOURS * 3600,
+                        httponly=True, samesite='Lax', secure=SESSION_COOKIE_SECURE)
+
+def end_current_session(app, response):
+    """Logs out the current request's session: revokes it and clears the cookie on response."""
+    session_id = unsign_session_id(request.cookies.get(SESSION_COOKIE_NAME, '')) if has_request_context() else None
+    if session_id:
+        revoke_session(app, session_id)
+    response.delete_cookie(SESSION_COOKIE_NAME, httponly=True, samesite='Lax', secure=SESSION_COOKIE_SECURE)
+
+
+# --- Revocation & Expiry ---
+def _delete_sessions(app, statement, params, caller):
+    conn = get_db_connection(app)
+    if not conn: return None
+    try:
+        with conn.cursor() as cur:
+            cur.execute(statement, params)
+            deleted = cur.rowcount
+        conn.commit()
+        return deleted
+    except psycopg2.Error as e:
+        conn.rollback()
+        app.logger.error(f"{caller}: Database error: {e}")
+        return None
+    finally:
+        conn.close()
+
+def revoke_session(app, session_id):
+    """Deletes one session. Returns the number of rows deleted (0 or 1), or None on error."""
+    key = _session_key(session_id)
+    _cache_evict(key)
+    return _delete_sessions(app, SESSION_DELETE, (key,), 'revoke_session')
+
+def revoke_employee_sessions(app, employee_id):
+    """Logs an employee out everywhere. Returns the number of sessions deleted, or None on error."""
+    _cache_evict(employee_id=employee_id)
+    deleted = _delete_sessions(app, EMPLOYEE_SESSIONS_DELETE, (employee_id,), 'revoke_employee_sessions')
+    app.logger.info(f"revoke_employee_sessions: {deleted} session(s) revoked for employee_id {employee_id}.")
+    return deleted
+
+def purge_expired_sessions(app):
+    """Deletes expired sessions (lookups already ignore them). Returns rows deleted, or None on error."""
+    return _delete_sessions(app, EXPIRED_SESSIONS_DELETE, None, 'purge_expired_sessions')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Revoke login sessions or delete expired ones.")
+    parser.add_argument('--revoke-employee', type=int, nargs='+', metavar='EMPLOYEE_ID', help="Log these employees out everywhere.")
+    parser.add_argument('--purge-expired', action='store_true', help="Delete expired sessions.")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    cli_app = SimpleNamespace(logger=logging.getLogger('sessions'))
+    for employee_id in args.revoke_employee or []:
+        print(f"employee_id {employee_id}: {revoke_employee_sessions(cli_app, employee_id)} session(s) revoked")
+    if args.purge_expired:
+        print(f"Expired sessions deleted: {purge_expired_sessions(cli_app)}")
@@ -0,0 +1,345 @@
+# scripts/generate_synthetic_data.py
+"""
+Generates a reproducible synthetic dataset at any scale and bulk-loads it with COPY:
+N employees in a multi-level org chart, M catalog tables and R access requests with
+realistic status, timing and table-popularity distributions. Every employee can log in
+with --password (username = email); all of them share one scrypt hash of it, since hashing
+per employee would take longer than the rest of the load.
+
+Same --seed, sizes and --anchor (the end of the request history, a fixed date by default)
+produce the same rows. The target tables must be empty unless --truncate is given (which
+wipes employees, tables, requests and derived data; roles and auto-approval rules are kept).
+
+Usage (from the project root, against the database in modules/db.py):
+    python -m scripts.generate_synthetic_data --employees 100000 --tables 20000 --requests 10000000 --truncate
+"""
+import argparse
+import io
+import logging
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+from modules.db import get_db_connection
+from modules.employee_import import EMPLOYEE_DEPARTMENTS
+from modules.access_expiry import ACCESS_DURATION_OPTIONS
+from modules.passwords import hash_password_sync, PASSWORD_SALT_BYTES
+from modules.rollups import rebuild_daily_rollup
+
+REQUEST_CHUNK_ROWS = 250_000 # Requests generated and streamed per chunk; part of what makes a seed reproducible
+# "Now" for the generated history: request dates, weekday dips, which requests are still pending and which
+# grants have expired are all relative to it. Fixed so a seed reproduces the same rows on any day; --anchor now
+# dates the history up to the present instead.
+DEFAULT_ANCHOR = datetime(2025, 6, 30, 17, 0, 0)
+MANAGER_PROBABILITY = 0.75 # Chance that an employee on a not-yet-full level gets reports
+ROLE_WEIGHTS = [0.70, 0.10, 0.20] # AccessRoles 1..3: Read, Write, Read-Write
+APPROVAL_RATE = 0.80
+TIME_BOUND_SHARE = 0.60 # Requests that ask for an access duration
+STALE_PENDING_SHARE = 0.005 # Requests nobody has decided yet, regardless of age
+DECISION_MEDIAN_HOURS, DECISION_SIGMA = 4.0, 1.3 # Lognormal time-to-decision
+
+FIRST_NAMES = ['Juan', 'Maria', 'Jose', 'Ana', 'Carlos', 'Sofia', 'Pedro', 'Isabella', 'Miguel', 'Bea', 'Luis', 'Katrina',
+               'Andres', 'Bianca', 'Rafael', 'Paolo', 'Camille', 'Gabriel', 'Patricia', 'Marco', 'Angela', 'Daniel', 'Nicole',
+               'Enrique', 'Teresa', 'Ramon', 'Clara', 'Victor', 'Elena', 'Antonio', 'Lucia', 'Jorge', 'Carmen', 'Manuel', 'Rosa']
+LAST_NAMES = ['Santos', 'Reyes', 'Garcia', 'Cruz', 'Bautista', 'Dela Cruz', 'Ramos', 'Villanueva', 'Fernandez', 'Torres',
+              'Gonzales', 'Flores', 'Mercado', 'Lim', 'Chua', 'Aquino', 'Navarro', 'Mendoza', 'Castillo', 'Domingo', 'Salazar',
+              'Rivera', 'Tan', 'Lopez', 'Morales', 'Pascual', 'Valdez', 'Soriano', 'Manalo', 'Ocampo']
+SCHEMA_WORDS = ['finance', 'sales', 'marketing', 'hr', 'ops', 'logistics', 'risk', 'billing', 'crm', 'inventory', 'payments',
+                'analytics', 'audit', 'support', 'product', 'security', 'procurement', 'legal', 'treasury', 'growth']
+TABLE_WORDS = ['customers', 'orders', 'invoices', 'payments', 'accounts', 'transactions', 'ledger', 'shipments', 'tickets',
+               'events', 'sessions', 'contracts', 'vendors', 'products', 'prices', 'claims', 'balances', 'refunds', 'leads',
+               'campaigns', 'employees', 'assets', 'budgets', 'forecasts', 'audits', 'alerts', 'subscriptions', 'usage']
+JUSTIFICATIONS = ['Need read access for the monthly reconciliation.', 'Building the quarterly revenue dashboard.',
+                  'Investigating a customer escalation.', 'Data quality checks for the migration project.',
+                  'Required for the annual audit sample.', 'Supporting the month-end close.',
+                  'Backfilling a reporting pipeline after a schema change.', 'Ad hoc analysis requested by leadership.',
+                  'On-call support for production incidents.', 'Validating figures for the board deck.']
+TICKET_PREFIXES = ['JIRA', 'OPS', 'FIN', 'INC', 'CHG']
+APPROVAL_COMMENTS = ['Approved.', 'Approved for the stated purpose.', 'Approved. Handle customer data with care.', 'Approved; please revoke when done.']
+REJECTION_COMMENTS = ['Rejected. Please use the reporting replica.', 'Rejected. Justification is too vague.',
+                      'Rejected. Write access requires a change ticket.', 'Rejected. Request a narrower role.']
+CANCELLED_COMMENT = 'Cancelled by requester.' # Same text as the My Requests cancel action
+DEFAULT_PASSWORD = 'LoadTest123!'
+
+
+class CsvChunkStream:
+    """File-like object that renders DataFrames to CSV lazily, so COPY streams chunks without holding all rows."""
+
+    def __init__(self, frames):
+        self._frames = iter(frames)
+        self._current = io.StringIO()
+        self.rows = 0
+
+    def read(self, size=-1):
+        while True:
+            data = self._current.read(size)
+            if data: return data
+            frame = next(self._frames, None)
+            if frame is None: return ''
+            self.rows += len(frame)
+            self._current = io.StringIO(frame.to_csv(index=False, header=False))
+
+def copy_frames(cur, table, columns, frames):
+    stream = CsvChunkStream(frames)
+    cur.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", stream)
+    return stream.rows
+
+
+# --- Generators ---
+def _timestamp_text(values, present=None):
+    """ISO text for datetime64[s] values (None where present is False); much faster than letting to_csv format datetimes."""
+    text = np.datetime_as_string(values, unit='s').astype(object)
+    if present is not None: text[~present] = None
+    return text
+
+def generate_employees(rng, n_employees, n_roots, mean_span):
+    """
+    Builds the org chart breadth-first, so every manager_id is smaller than its reports' ids.
+    Returns a DataFrame with employee_id 1..n_employees.
+    """
+    departments = np.array([d for d in EMPLOYEE_DEPARTMENTS if d != 'Other'])
+    n_roots = max(1, min(n_roots, n_employees))
+    manager_of = np.full(n_employees, -1, dtype=np.int64)
+    department = np.empty(n_employees, dtype=np.int64)
+    department[:n_roots] = np.arange(n_roots) % len(departments)
+
+    frontier, next_index = np.arange(n_roots), n_roots
+    while next_index < n_employees:
+        has_reports = rng.random(len(frontier)) < MANAGER_PROBABILITY
+        if not has_reports.any(): has_reports[0] = True
+        spans = 1 + rng.poisson(mean_span - 1, size=int(has_reports.sum()))
+        parents = np.repeat(frontier[has_reports], spans)[:n_employees - next_index]
+        children = np.arange(next_index, next_index + len(parents))
+        manager_of[children] = parents
+        # Most people sit in their manager's department
+        moved = rng.random(len(children)) > 0.92
+        department[children] = np.where(moved, rng.integers(len(departments), size=len(children)), department[parents])
+        frontier, next_index = children, next_index + len(children)
+
+    is_manager = np.bincount(manager_of[manager_of >= 0], minlength=n_employees) > 0
+    is_manager[:n_roots] = True
+    employee_id = np.arange(1, n_employees + 1)
+    first = np.array(FIRST_NAMES)[rng.integers(len(FIRST_NAMES), size=n_employees)]
+    last = np.array(LAST_NAMES)[rng.integers(len(LAST_NAMES), size=n_employees)]
+    email = (pd.Series(first).str.lower() + '.' + pd.Series(last).str.lower().str.replace(' ', '', regex=False)
+             + '.' + pd.Series(employee_id).astype(str) + '@example.com')
+    return pd.DataFrame({
+        'employee_id': employee_id, 'first_name': first, 'last_name': last, 'email': email,
+        'department': departments[department],
+        'manager_id': pd.Series(manager_of + 1, dtype='Int64').mask(manager_of < 0),
+        'is_manager': is_manager,
+    })
+
+def generate_tables(rng, n_tables):
+    n_schemas = max(1, int(np.sqrt(n_tables)))
+    schema_names = [SCHEMA_WORDS[i % len(SCHEMA_WORDS)] + (f"_{i // len(SCHEMA_WORDS)}" if i >= len(SCHEMA_WORDS) else '')
+                    for i in range(n_schemas)]
+    schema_index = rng.integers(n_schemas, size=n_tables)
+    words = np.array(TABLE_WORDS)[rng.integers(len(TABLE_WORDS), size=n_tables)]
+    table_id = np.arange(1, n_tables + 1)
+    table_name = pd.Series(words) + '_' + pd.Series(table_id).astype(str) # Unique per schema
+    schema = pd.Series(np.array(schema_names)[schema_index])
+    return pd.DataFrame({
+        'table_id': table_id, 'schema_name': schema, 'table_name': table_name,
+        'description': 'Synthetic ' + pd.Series(words) + ' data for ' + schema + '.',
+    })
+
+def generate_request_chunks(seed, n_requests, employees, n_tables, days, now):
+    """
+    Yields request DataFrames of REQUEST_CHUNK_ROWS rows. Request volume grows over the window and
+    dips at weekends; submissions cluster in business hours; table popularity is Zipf-like. Old
+    requests are decided (lognormal latency, by the requester's manager); expired time-bound grants
+    are Revoked. A requester never has two Pending requests for the same table and role.
+    """
+    manager_of = employees['manager_id'].fillna(0).to_numpy(dtype=np.int64) # Indexed by employee_id - 1
+    requesters = employees.loc[employees['manager_id'].notna(), 'employee_id'].to_numpy()
+    popularity = 1.0 / np.arange(1, n_tables + 1) ** 1.1
+    table_cdf = np.cumsum(popularity) / popularity.sum()
+    midnight = np.datetime64(now.replace(hour=0, minute=0, second=0, microsecond=0), 's')
+    now64 = np.datetime64(now, 's')
+    ages = np.arange(days)
+    weekday = (np.asarray(midnight - ages * np.timedelta64(1, 'D'), dtype='datetime64[D]').astype(np.int64) + 3) % 7 # 0 = Monday
+    day_weights = (2.0 - ages / days) * np.where(weekday >= 5, 0.15, 1.0)
+    day_weights /= day_weights.sum()
+    durations = np.array(ACCESS_DURATION_OPTIONS)
+    justifications, approvals, rejections = np.array(JUSTIFICATIONS), np.array(APPROVAL_COMMENTS), np.array(REJECTION_COMMENTS)
+    seen_pending = set()
+
+    for chunk_index, start in enumerate(range(0, n_requests, REQUEST_CHUNK_ROWS)):
+        rng = np.random.default_rng([seed, 4, chunk_index])
+        size = min(REQUEST_CHUNK_ROWS, n_requests - start)
+        requester = requesters[rng.integers(len(requesters), size=size)]
+        table_id = np.searchsorted(table_cdf, rng.random(size)) + 1
+        role_id = rng.choice(3, size=size, p=ROLE_WEIGHTS) + 1
+
+        age = rng.choice(days, size=size, p=day_weights)
+        second_of_day = (np.clip(rng.normal(13.0, 2.5, size), 7.0, 20.0) * 3600).astype(np.int64)
+        request_date = midnight - age * np.timedelta64(1, 'D') + second_of_day.astype('timedelta64[s]')
+        request_date = np.where(request_date > now64, request_date - np.timedelta64(1, 'D'), request_date)
+        latency = (rng.lognormal(np.log(DECISION_MEDIAN_HOURS * 3600), DECISION_SIGMA, size)).astype(np.int64)
+        decision_date = request_date + latency.astype('timedelta64[s]')
+
+        pending = (decision_date > now64) | (rng.random(size) < STALE_PENDING_SHARE)
+        approved = ~pending & (rng.random(size) < APPROVAL_RATE)
+        duration = np.where(rng.random(size) < TIME_BOUND_SHARE, durations[rng.integers(len(durations), size=size)], 0)
+        expires = decision_date + (duration * 86400).astype('timedelta64[s]')
+        time_bound = approved & (duration > 0)
+        revoked = time_bound & (expires <= now64)
+        status = np.where(pending, 'Pending', np.where(revoked, 'Revoked', np.where(approved, 'Approved', 'Rejected')))
+        approver = np.where(pending, 0, manager_of[requester - 1])
+        comments = np.where(approved, approvals[rng.integers(len(approvals), size=size)], rejections[rng.integers(len(rejections), size=size)])
+
+        # Repeat Pending requests (same requester, table and role) become cancellations, as the unique index requires.
+        keys = (requester.astype(np.int64) * (n_tables + 1) + table_id) * 4 + role_id
+        cancelled = np.zeros(size, dtype=bool)
+        for i in np.flatnonzero(pending):
+            if keys[i] in seen_pending: cancelled[i] = True
+            else: seen_pending.add(keys[i])
+        status[cancelled], approver[cancelled], comments[cancelled] = 'Rejected', requester[cancelled], CANCELLED_COMMENT
+        decision_date[cancelled] = np.minimum(request_date[cancelled] + np.timedelta64(3600, 's'), now64)
+        pending &= ~cancelled
+
+        ticket = pd.Series(np.array(TICKET_PREFIXES)[rng.integers(len(TICKET_PREFIXES), size=size)]) + '-' + pd.Series(rng.integers(100, 99999, size=size)).astype(str)
+        comments = comments.astype(object)
+        comments[pending] = None
+        yield pd.DataFrame({
+            'request_id': np.arange(start + 1, start + size + 1),
+            'requester_id': requester, 'table_id': table_id, 'requested_role_id': role_id,
+            'justification': pd.Series(justifications[rng.integers(len(justifications), size=size)]) + ' Ticket ' + ticket + '.',
+            'request_date': _timestamp_text(request_date), 'status': status,
+            'approver_id': pd.Series(approver, dtype='Int64').where(approver > 0), # Top-level requesters have no manager
+            'decision_date': _timestamp_text(decision_date, ~pending), 'approver_comments': comments,
+            'access_duration_days': pd.Series(duration, dtype='Int64').where(duration > 0),
+            'access_expires_at': _timestamp_text(expires, time_bound),
+            'revoked_at': _timestamp_text(expires + rng.integers(0, 120, size).astype('timedelta64[s]'), revoked),
+        })
+
+
+# --- Load ---
+REQUEST_COLUMNS = ['request_id', 'requester_id', 'table_id', 'requested_role_id', 'justification', 'request_date', 'status',
+                   'approver_id', 'decision_date', 'approver_comments', 'access_duration_days', 'access_expires_at', 'revoked_at']
+TRUNCATE_SQL = """
+    TRUNCATE Employees, DatabaseTables, CatalogSources, CatalogSchemaSummary, DailyRequestRollup, RollupWatermarks
+    RESTART IDENTITY CASCADE;
+"""
+# Derived data that the disabled triggers would have maintained
+POST_LOAD_SQL = """
+    SELECT rebuild_employee_hierarchy();
+    INSERT INTO CatalogSchemaSummary (source_id, schema_name, table_count)
+    SELECT source_id, schema_name, COUNT(*) FROM DatabaseTables WHERE is_active GROUP BY source_id, schema_name;
+    INSERT INTO AccessRevocationEvents (request_id, requester_id, table_id, requested_role_id, access_expires_at, revoked_at)
+    SELECT request_id, requester_id, table_id, requested_role_id, access_expires_at, revoked_at FROM AccessRequests WHERE status = 'Revoked';
+    SELECT setval(pg_get_serial_sequence('employees', 'employee_id'), GREATEST(MAX(employee_id), 1)) FROM Employees;
+    SELECT setval(pg_get_serial_sequence('databasetables', 'table_id'), GREATEST(MAX(table_id), 1)) FROM DatabaseTables;
+    SELECT setval(pg_get_serial_sequence('accessrequests', 'request_id'), GREATEST(MAX(request_id), 1)) FROM AccessRequests;
+"""
+
+def _phase(label, started):
+    print(f"{label:<32}{time.perf_counter() - started:>8.1f} s")
+    return time.perf_counter()
+
+def load_synthetic_data(app, n_employees, n_tables, n_requests, seed=42, days=365, roots=5, span=8.0,
+                        password=DEFAULT_PASSWORD, truncate=False, anchor=DEFAULT_ANCHOR):
+    """
+    Generates and loads the dataset into the database from modules/db.py, printing per-phase timings.
+    The request history ends at anchor (a datetime).
+    Returns the total load time in seconds. Raises SystemExit if the database is unreachable,
+    or not empty and truncate is False.
+    """
+    now = anchor.replace(microsecond=0)
+    started = total_started = time.perf_counter()
+
+    employees = generate_employees(np.random.default_rng([seed, 1]), n_employees, roots, span)
+    tables = generate_tables(np.random.default_rng([seed, 2]), n_tables)
+    started = _phase(f"Generated {len(employees):,} employees", started)
+
+    conn = get_db_connection(app)
+    if not conn:
+        raise SystemExit("Could not connect to the database.")
+    try:
+        with conn.cursor() as cur:
+            if truncate:
+                cur.execute(TRUNCATE_SQL)
+            else:
+                cur.execute("SELECT EXISTS (SELECT 1 FROM Employees) OR EXISTS (SELECT 1 FROM DatabaseTables) OR EXISTS (SELECT 1 FROM AccessRequests);")
+                if cur.fetchone()[0]:
+                    raise SystemExit("Target tables are not empty; rerun with --truncate to replace their contents.")
+
+            # Triggers (closure table, NOTIFY, catalog summary) would run per statement over millions of
+            # rows; their results are rebuilt once in POST_LOAD_SQL. Superusers also skip FK checks.
+            cur.execute("SELECT rolsuper FROM pg_roles WHERE rolname = current_user;")
+            is_superuser = cur.fetchone()[0]
+            if is_superuser:
+                cur.execute("SET LOCAL session_replication_role = replica;")
+            else:
+                cur.execute("ALTER TABLE Employees DISABLE TRIGGER USER; ALTER TABLE DatabaseTables DISABLE TRIGGER USER;")
+            # Secondary indexes are built once after the load instead of row by row.
+            cur.execute("""
+                SELECT indexname, indexdef FROM pg_indexes
+                WHERE schemaname = current_schema() AND tablename = 'accessrequests'
+                  AND indexname NOT IN (SELECT conname FROM pg_constraint WHERE conrelid = 'accessrequests'::regclass);
+            """)
+            deferred_indexes = cur.fetchall()
+            for index_name, _ in deferred_indexes:
+                cur.execute(f'DROP INDEX "{index_name}";')
+
+            # One shared hash whose salt comes from the seed, so the same --seed reproduces UserCredentials too.
+            password_hash = hash_password_sync(password, salt=np.random.default_rng([seed, 3]).bytes(PASSWORD_SALT_BYTES))
+            copy_frames(cur, 'Employees', list(employees.columns), [employees])
+            copy_frames(cur, 'UserCredentials', ['employee_id', 'username', 'password_hash'],
+                        [pd.DataFrame({'employee_id': employees['employee_id'], 'username': employees['email'], 'password_hash': password_hash})])
+            copy_frames(cur, 'DatabaseTables', list(tables.columns), [tables])
+            started = _phase("Loaded employees and tables", started)
+
+            loaded = copy_frames(cur, 'AccessRequests', REQUEST_COLUMNS,
+                                 generate_request_chunks(seed, n_requests, employees, n_tables, days, now))
+            started = _phase(f"Loaded {loaded:,} requests", started)
+
+            for _, index_def in deferred_indexes:
+                cur.execute(index_def)
+            started = _phase(f"Rebuilt {len(deferred_indexes)} request indexes", started)
+            cur.execute(POST_LOAD_SQL)
+            if not is_superuser:
+                cur.execute("ALTER TABLE Employees ENABLE TRIGGER USER; ALTER TABLE DatabaseTables ENABLE TRIGGER USER;")
+            cur.execute("SELECT pg_notify('employees_changed', '*');") # Running app workers reload their org tree
+        conn.commit()
+        started = _phase("Rebuilt hierarchy and summaries", started)
+
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute("ANALYZE Employees; ANALYZE EmployeeHierarchy; ANALYZE DatabaseTables; ANALYZE AccessRequests; ANALYZE UserCredentials;")
+    finally:
+        conn.close()
+    rebuild_daily_rollup(app)
+    _phase("Analyzed and rebuilt rollup", started)
+    total_seconds = time.perf_counter() - total_started
+    print(f"{'Total':<32}{total_seconds:>8.1f} s")
+    return total_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--employees', type=int, default=10_000)
+    parser.add_argument('--tables', type=int, default=2_000)
+    parser.add_argument('--requests', type=int, default=100_000)
+    parser.add_argument('--days', type=int, default=365, help="History window for request dates.")
+    parser.add_argument('--roots', type=int, default=5, help="Top-level managers (no manager of their own).")
+    parser.add_argument('--span', type=float, default=8.0, help="Mean number of direct reports per manager.")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--anchor', type=lambda v: datetime.now() if v == 'now' else datetime.fromisoformat(v), default=DEFAULT_ANCHOR,
+                        help=f"End of the request history, ISO date/time or 'now' (default {DEFAULT_ANCHOR.isoformat(' ')}).")
+    parser.add_argument('--password', default=DEFAULT_PASSWORD, help="Login password for every generated employee.")
+    parser.add_argument('--truncate', action='store_true', help="Delete existing employees, tables and requests first.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    app = SimpleNamespace(logger=logging.getLogger('generate_synthetic_data'))
+    load_synthetic_data(app, args.employees, args.tables, args.requests, seed=args.seed, days=args.days, roots=args.roots,
+                        span=args.span, password=args.password, truncate=args.truncate, anchor=args.anchor)
+
+
+if __name__ == '__main__':
+    main()
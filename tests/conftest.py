@@ -0,0 +1,36 @@
+# tests/conftest.py
+import logging
+import os
+from types import SimpleNamespace
+
+import psycopg2
+import pytest
+
+from modules.db import DB_CONFIG
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEST_DATABASE = 'access_request_test'
+# Schema files loaded into the scratch database, separated by os.pathsep. Override when the server
+# lacks pg_trgm, e.g. with an emulation script followed by a copy of data/schema.sql without it.
+TEST_SCHEMA_FILES = os.environ.get('TEST_SCHEMA_FILES', os.path.join(PROJECT_ROOT, 'data', 'schema.sql')).split(os.pathsep)
+
+
+@pytest.fixture
+def app():
+    return SimpleNamespace(logger=logging.getLogger('tests'))
+
+@pytest.fixture
+def scratch_db():
+    """Recreates TEST_DATABASE from the schema and points DB_CONFIG at it; skips when PostgreSQL is unreachable."""
+    from benchmarks.bench_callbacks import recreate_database, drop_database
+    try:
+        recreate_database(TEST_DATABASE, TEST_SCHEMA_FILES)
+    except psycopg2.OperationalError as e:
+        pytest.skip(f"PostgreSQL is not available: {e}")
+    original_dbname = DB_CONFIG['dbname']
+    DB_CONFIG['dbname'] = TEST_DATABASE
+    try:
+        yield {**DB_CONFIG}
+    finally:
+        DB_CONFIG['dbname'] = original_dbname
+        drop_database(TEST_DATABASE)
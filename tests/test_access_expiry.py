@@ -0,0 +1,46 @@
+# tests/test_access_expiry.py
+import select
+
+import psycopg2
+
+from modules.access_expiry import ACCESS_REVOKED_CHANNEL, ACCESS_REVOKED_PAYLOAD_MAX_BYTES, sweep_expired_grants
+
+GRANTS = 3000 # Enough request_ids that one comma-joined payload would exceed PostgreSQL's 8000-byte limit
+
+
+def _insert_expired_grants(connection, count):
+    conn = psycopg2.connect(**connection)
+    try:
+        with conn.cursor() as cur:
+            cur.execute("INSERT INTO Employees (first_name, last_name, email) VALUES ('Ada', 'Lovelace', 'ada@example.com') RETURNING employee_id;")
+            employee_id = cur.fetchone()[0]
+            cur.execute("INSERT INTO DatabaseTables (schema_name, table_name) VALUES ('sales', 'orders') RETURNING table_id;")
+            table_id = cur.fetchone()[0]
+            cur.execute("""
+                INSERT INTO AccessRequests (requester_id, table_id, requested_role_id, justification, status, access_expires_at)
+                SELECT %s, %s, (SELECT MIN(role_id) FROM AccessRoles), 'Expired grant', 'Approved', CURRENT_TIMESTAMP - INTERVAL '1 day'
+                FROM generate_series(1, %s);
+            """, (employee_id, table_id, count))
+        conn.commit()
+    finally:
+        conn.close()
+
+def test_large_batch_is_notified_in_chunks(app, scratch_db):
+    _insert_expired_grants(scratch_db, GRANTS)
+    listener = psycopg2.connect(**scratch_db)
+    listener.autocommit = True
+    try:
+        with listener.cursor() as cur:
+            cur.execute(f"LISTEN {ACCESS_REVOKED_CHANNEL};")
+
+        assert sweep_expired_grants(app, batch_size=GRANTS) == GRANTS
+
+        select.select([listener], [], [], 5.0)
+        listener.poll()
+        payloads = [n.payload for n in listener.notifies]
+    finally:
+        listener.close()
+    assert len(payloads) > 1
+    assert all(len(payload) <= ACCESS_REVOKED_PAYLOAD_MAX_BYTES for payload in payloads)
+    notified = [int(i) for payload in payloads for i in payload.split(',')]
+    assert len(notified) == len(set(notified)) == GRANTS
@@ -0,0 +1,29 @@
+# tests/test_catalog_search.py
+import psycopg2
+
+from modules.catalog_search import search_tables, clear_table_search_cache
+
+# Fuzzy-only names sort before the prefix matches alphabetically and outnumber them, so the test
+# fails unless the query itself ranks prefix matches first.
+FUZZY_TABLES = [('archive', f'a_order_history_{i}') for i in range(20)]
+PREFIX_TABLES = [('sales', 'orders'), ('sales', 'orders_daily'), ('orders', 'line_items')]
+
+
+def _insert_tables(connection, tables):
+    conn = psycopg2.connect(**connection)
+    try:
+        with conn.cursor() as cur:
+            cur.executemany("INSERT INTO DatabaseTables (schema_name, table_name) VALUES (%s, %s);", tables)
+        conn.commit()
+    finally:
+        conn.close()
+
+def test_prefix_matches_come_first(app, scratch_db):
+    _insert_tables(scratch_db, FUZZY_TABLES + PREFIX_TABLES)
+    clear_table_search_cache()
+
+    labels = [option['label'] for option in search_tables(app, 'order')]
+
+    assert len(labels) == len(set(labels))
+    assert labels[:3] == ['sales.orders', 'orders.line_items', 'sales.orders_daily']
+    assert set(labels[3:]) <= {f'{schema}.{table}' for schema, table in FUZZY_TABLES}
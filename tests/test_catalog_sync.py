@@ -0,0 +1,38 @@
+# tests/test_catalog_sync.py
+import psycopg2
+
+from modules.catalog_sync import sync_catalog_source
+from modules.db import CATALOG_SOURCES
+
+APP_TABLES = {'employees', 'usercredentials', 'usersessions', 'accessrequests', 'databasetables', 'employeeactivationtokens'}
+
+
+def _synced_tables(connection):
+    conn = psycopg2.connect(**connection)
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT schema_name, lower(table_name) FROM DatabaseTables WHERE is_active;")
+            return set(cur.fetchall())
+    finally:
+        conn.close()
+
+def test_catalog_sources_ship_empty():
+    assert CATALOG_SOURCES == []
+
+def test_app_tables_never_synced_from_app_database(app, scratch_db):
+    conn = psycopg2.connect(**scratch_db)
+    try:
+        with conn.cursor() as cur:
+            cur.execute("CREATE SCHEMA sales; CREATE TABLE sales.orders (order_id INT);")
+        conn.commit()
+    finally:
+        conn.close()
+    source = {'name': 'self', 'server_name': 'localhost', 'exclude_schemas': [], 'connection': scratch_db}
+
+    result = sync_catalog_source(app, source, force=True)
+
+    assert result['status'] == 'synced'
+    synced = _synced_tables(scratch_db)
+    assert ('sales', 'orders') in synced
+    assert not {table for _, table in synced} & APP_TABLES
+    assert {schema for schema, _ in synced} == {'sales'}
@@ -0,0 +1,34 @@
+# tests/test_org_tree.py
+import pytest
+
+from modules import org_tree
+from modules.org_tree import OrgTree, get_org_tree
+
+
+@pytest.fixture
+def no_listen(monkeypatch):
+    """Org tree state with LISTEN unavailable; counts snapshot loads and LISTEN attempts."""
+    calls = {'load': 0, 'listen': 0}
+    def load(app):
+        calls['load'] += 1
+        return OrgTree()
+    def listen(app):
+        calls['listen'] += 1
+        return None
+    monkeypatch.setattr(org_tree, 'load_org_tree', load)
+    monkeypatch.setattr(org_tree, '_open_listen_connection', listen)
+    monkeypatch.setattr(org_tree, '_org_tree_state', {'tree': None, 'listen_conn': None, 'loaded_at': 0.0, 'listen_attempted_at': 0.0})
+    return calls
+
+def test_without_listen_snapshot_is_kept_until_the_fallback_interval(app, no_listen, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(org_tree.time, 'monotonic', lambda: clock[0])
+
+    first = get_org_tree(app)
+    for _ in range(10):
+        assert get_org_tree(app) is first
+    assert no_listen == {'load': 1, 'listen': 1}
+
+    clock[0] += org_tree.ORG_TREE_FALLBACK_RELOAD_INTERVAL + 1
+    assert get_org_tree(app) is not first
+    assert no_listen == {'load': 2, 'listen': 2}
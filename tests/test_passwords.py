@@ -0,0 +1,28 @@
+# tests/test_passwords.py
+import pytest
+
+from modules.passwords import hash_password_sync, verify_password_sync
+
+TEST_N = 2 ** 10 # Keeps the tests fast; the format is the same at any work factor
+
+
+def test_round_trip():
+    password_hash = hash_password_sync('s3cret', n=TEST_N)
+    assert verify_password_sync('s3cret', password_hash) == (True, True) # Non-default N asks for a rehash
+    assert verify_password_sync('wrong', password_hash) == (False, False)
+
+@pytest.mark.parametrize('corrupt_hash', [
+    'not-a-hash',
+    'scrypt$16384$8$1$c2FsdA==',
+    'scrypt$lots$8$1$c2FsdA==$ZGlnZXN0',
+    'scrypt$16384$8$1$%%%$ZGlnZXN0',
+    'scrypt$1000$8$1$c2FsdA==$ZGlnZXN0',
+    'bcrypt$16384$8$1$c2FsdA==$ZGlnZXN0',
+])
+def test_corrupt_hash_is_a_failed_login(corrupt_hash):
+    assert verify_password_sync('s3cret', corrupt_hash) == (False, False)
+
+def test_given_salt_is_reproducible():
+    salt = bytes(16)
+    assert hash_password_sync('s3cret', n=TEST_N, salt=salt) == hash_password_sync('s3cret', n=TEST_N, salt=salt)
+    assert hash_password_sync('s3cret', n=TEST_N) != hash_password_sync('s3cret', n=TEST_N)
@@ -0,0 +1,28 @@
+# tests/test_scheduler.py
+from datetime import datetime
+
+import psycopg2
+
+from modules import scheduler
+from modules.scheduler import SCHEDULED_JOBS, run_scheduled_job
+
+CATALOG_SYNC_JOB = next(job for job in SCHEDULED_JOBS if job.name == 'catalog_sync')
+
+
+def test_catalog_sync_with_a_failed_source_is_a_failed_run(app, scratch_db, monkeypatch):
+    monkeypatch.setattr(scheduler, 'sync_all_catalog_sources', lambda app: [{'source': 'ok', 'status': 'synced'}, None])
+
+    assert run_scheduled_job(app, CATALOG_SYNC_JOB, datetime(2025, 1, 1, 0, 15)) == 'failed'
+
+    conn = psycopg2.connect(**scratch_db)
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT last_status, failure_count FROM ScheduledJobs WHERE job_name = 'catalog_sync';")
+            assert cur.fetchone() == ('failed', 1)
+    finally:
+        conn.close()
+
+def test_catalog_sync_with_no_sources_succeeds(app, scratch_db, monkeypatch):
+    monkeypatch.setattr(scheduler, 'sync_all_catalog_sources', lambda app: [])
+
+    assert run_scheduled_job(app, CATALOG_SYNC_JOB, datetime(2025, 1, 1, 0, 15)) == 'succeeded'